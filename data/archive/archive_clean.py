@@ -1,36 +1,76 @@
 import os
-import shutil
-from datetime import datetime
+import sys
+import json
+import argparse
 
 # Current folder = archive directory
 ARCHIVE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Clean folder is 1 level up → clean/
 CLEAN_DIR = os.path.join(os.path.dirname(ARCHIVE_DIR), "clean")
+BASE_DIR = os.path.dirname(os.path.dirname(ARCHIVE_DIR))
 
+# Archive store (blobs/, runs/) and locking live in scripts/
+sys.path.insert(0, os.path.join(BASE_DIR, "scripts"))
+from archive_store import apply_retention, archive_run, archive_settings, update_archive_index
+from run_coordinator import file_lock
+
+# Held while archiving / pruning, so retention never removes the blobs of a
+# run whose manifest is still being written
+ARCHIVE_LOCK = os.path.join(ARCHIVE_DIR, "archive.lock")
+
+
+def load_etl_config():
+    cfg_path = os.path.join(BASE_DIR, "config", "etl_config.json")
+    try:
+        with open(cfg_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-def archive_clean_files():
-    print("==== ARCHIVE STARTED ====")
 
-    # Timestamp for file naming
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+def archive_clean_files(prune_only=False):
+    print("==== ARCHIVE STARTED ====")
 
     # Ensure clean folder exists
     if not os.path.exists(CLEAN_DIR):
         print(f"❌ Clean folder not found: {CLEAN_DIR}")
         return
 
-    # Archive all CSVs from clean folder
-    for file_name in os.listdir(CLEAN_DIR):
-        if file_name.endswith(".csv"):
-            src = os.path.join(CLEAN_DIR, file_name)
-            dst = os.path.join(ARCHIVE_DIR, f"{timestamp}_{file_name}")
+    settings = archive_settings(load_etl_config())
+    with file_lock(ARCHIVE_LOCK, owner="archive_clean", timeout=60):
+        if not prune_only:
+            # Archive all CSVs from clean folder (compressed, unchanged ones deduplicated)
+            paths = sorted(os.path.join(CLEAN_DIR, name) for name in os.listdir(CLEAN_DIR) if name.endswith(".csv"))
+            manifest = archive_run(paths, settings)
+            for file_name, entry in manifest["files"].items():
+                if entry["reused"]:
+                    print(f"✔ Unchanged: {file_name}")
+                elif entry.get("format") == "delta":
+                    print(f"✔ Archived: {file_name} as delta #{len(entry['deltas'])} "
+                          f"(+{entry['inserted']} ~{entry['updated']} -{entry['deleted']} rows, "
+                          f"{entry['stored_bytes'] / 1e6:.2f} MB)")
+                else:
+                    print(f"✔ Archived: {file_name} → {entry['blob']} "
+                          f"({entry['bytes'] / 1e6:.1f} MB → {entry['stored_bytes'] / 1e6:.1f} MB)")
+            print(f"Run manifest: {manifest['run_id']}")
+
+        removed, freed = apply_retention(settings)
+        if removed:
+            print(f"✔ Retention: removed {len(removed)} run(s), freed {freed / 1e6:.1f} MB")
 
-            shutil.copy2(src, dst)
-            print(f"✔ Archived: {file_name} → {dst}")
+        # index.json: every run (legacy copies included) for the dashboard's run selector
+        index = update_archive_index()
+        print(f"✔ Archive index: {len(index['runs'])} run(s)")
 
     print("==== ARCHIVE COMPLETED ====")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archive the clean CSVs (compressed, deduplicated)")
+    parser.add_argument("--prune-only", action="store_true", help="apply the retention policy without archiving")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    archive_clean_files()
+    archive_clean_files(prune_only=parse_args().prune_only)
@@ -0,0 +1,514 @@
+# scripts/archive_store.py
+
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from snapshot_delta import (
+    SNAPSHOT_KEY, apply_delta, decode_deletes, detect_order, encode_delta, encode_deletes, join_rows, split_rows,
+)
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip always works
+    zstandard = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLEAN_DIR = os.path.join(BASE_DIR, "data", "clean")
+ARCHIVE_DIR = os.path.join(BASE_DIR, "data", "archive")
+# Compressed file contents, named by the sha256 of the uncompressed file, so
+# an unchanged file is stored once however many runs archive it
+BLOB_DIR = os.path.join(ARCHIVE_DIR, "blobs")
+# One manifest per archive run (runs/<run_id>.json): file -> blob, hash, sizes
+RUN_DIR = os.path.join(ARCHIVE_DIR, "runs")
+# Row-hash index of the last archived version of each delta file
+# (runs/<file>.rows.pkl), so the next run diffs without rebuilding it
+ROW_INDEX_SUFFIX = ".rows.pkl"
+# Archived files restored for reading (cache/<run_id>/<file>), rebuilt on demand
+CACHE_DIR = os.path.join(ARCHIVE_DIR, "cache")
+# Every run (manifests and legacy copies) with per-file hash, rows and date range
+INDEX_FILE = os.path.join(ARCHIVE_DIR, "index.json")
+# Copies written by the old archiver: <YYYYmmdd_HHMMSS>_<file>.csv
+LEGACY_FILE = re.compile(r"^(\d{8}_\d{6})_(.+\.csv)$")
+DATE_COLUMNS = ("sale_date", "feature_date")
+
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+# Keyed (store, dept, sale_date) files archived as deltas against the previous run
+DELTA_FILES = ["full_dataset_clean.csv", "sales_clean.csv"]
+# Deltas on top of one base before a fresh full copy is stored
+MAX_DELTA_CHAIN = 10
+COPY_BUFFER_BYTES = 8 * 1024 * 1024
+RUN_ID_FORMAT = "%Y%m%d_%H%M%S"
+
+# ========== SETTINGS ==========
+def archive_settings(etl_cfg):
+    """The "archive" section of etl_config.json, with defaults.
+
+    compression: "gzip" | "zstd" (falls back to gzip without zstandard)
+    keep_runs / max_age_days / max_bytes: retention limits, None = unlimited
+    delta_files / max_chain: files stored as deltas, and deltas per base
+    """
+    cfg = etl_cfg.get("archive", {})
+    compression = cfg.get("compression", "gzip")
+    if compression not in COMPRESSIONS or (compression == "zstd" and zstandard is None):
+        compression = "gzip"
+    return {
+        "compression": compression,
+        "level": cfg.get("level"),
+        "workers": int(cfg.get("workers", 4)),
+        "keep_runs": cfg.get("keep_runs"),
+        "max_age_days": cfg.get("max_age_days"),
+        "max_bytes": cfg.get("max_bytes"),
+        "delta_files": cfg.get("delta_files", DELTA_FILES),
+        "max_chain": int(cfg.get("max_chain", MAX_DELTA_CHAIN)),
+    }
+
+# ========== BLOBS ==========
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def blob_name(digest, compression, suffix=".csv"):
+    return f"{digest}{suffix}{COMPRESSIONS[compression]}"
+
+def find_blob(digest, suffix=".csv"):
+    """Name of an existing blob holding `digest`, in any compression, or None."""
+    for compression in COMPRESSIONS:
+        name = blob_name(digest, compression, suffix)
+        if os.path.exists(os.path.join(BLOB_DIR, name)):
+            return name
+    return None
+
+def compress_file(src, name, compression="gzip", level=None):
+    """Compress `src` into BLOB_DIR/`name`; returns the stored size in bytes."""
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    dst = os.path.join(BLOB_DIR, name)
+    tmp_path = f"{dst}.{uuid.uuid4().hex}.tmp"
+    with open(src, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+        if compression == "zstd":
+            writer = zstandard.ZstdCompressor(level=level or 3, threads=-1).stream_writer(fdst, closefd=False)
+        else:
+            writer = gzip.GzipFile(fileobj=fdst, mode="wb", compresslevel=level or 6, mtime=0)
+        with writer:
+            shutil.copyfileobj(fsrc, writer, COPY_BUFFER_BYTES)
+    # blobs are immutable once named, so replacing a concurrent writer's copy is harmless
+    os.replace(tmp_path, dst)
+    return os.path.getsize(dst)
+
+def store_data(data, compression="gzip", level=None, suffix=".csv"):
+    """Store in-memory bytes as a blob. Returns (name, bytes written; 0 if already stored)."""
+    digest = hashlib.sha256(data).hexdigest()
+    existing = find_blob(digest, suffix)
+    if existing is not None:
+        return existing, 0
+    if compression == "zstd":
+        packed = zstandard.ZstdCompressor(level=level or 3).compress(data)
+    else:
+        packed = gzip.compress(data, compresslevel=level or 6, mtime=0)
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    name = blob_name(digest, compression, suffix)
+    tmp_path = os.path.join(BLOB_DIR, f"{name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(packed)
+    os.replace(tmp_path, os.path.join(BLOB_DIR, name))
+    return name, len(packed)
+
+def open_blob(name):
+    """Binary, decompressing reader over a blob."""
+    path = os.path.join(BLOB_DIR, name)
+    if name.endswith(COMPRESSIONS["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"{name} is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return gzip.open(path, "rb")
+
+def read_blob(name):
+    with open_blob(name) as f:
+        return f.read()
+
+def extract_blob(name, out_path):
+    """Decompress a blob to `out_path` (written beside and replaced)."""
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = f"{out_path}.{uuid.uuid4().hex}.tmp"
+    with open_blob(name) as src, open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER_BYTES)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+def archive_file(path, compression="gzip", level=None):
+    """Store one file as a blob unless identical content is already stored."""
+    digest = file_sha256(path)
+    entry = {"sha256": digest, "bytes": os.path.getsize(path)}
+    existing = find_blob(digest)
+    if existing is not None:
+        entry.update(blob=existing, stored_bytes=os.path.getsize(os.path.join(BLOB_DIR, existing)), reused=True)
+        return entry
+    name = blob_name(digest, compression)
+    entry.update(blob=name, stored_bytes=compress_file(path, name, compression, level), reused=False)
+    return entry
+
+# ========== DELTA SNAPSHOTS ==========
+# A delta entry is self-contained: its base blob plus every delta since, in
+# order, so any run can be rebuilt without the manifests of earlier runs.
+#   {"format": "delta", "key": [...], "order": [...], "base": blob,
+#    "deltas": [{"upserts": blob, "deletes": blob}, ...], "sha256": ..., ...}
+
+def reconstruct(entry):
+    """Exact contents (bytes) of an archived file, rebuilt from base + deltas when delta-encoded."""
+    if entry.get("format") != "delta":
+        return read_blob(entry["blob"])
+    key = entry["key"]
+    header, rows = split_rows(read_blob(entry["base"]), key)
+    for delta in entry["deltas"]:
+        _, upserts = split_rows(read_blob(delta["upserts"]), key)
+        rows = apply_delta(rows, upserts, decode_deletes(read_blob(delta["deletes"]), key))
+    return join_rows(header, rows, entry["order"])
+
+def row_hashes(rows):
+    """64-bit hash of each raw line, indexed by key like the rows."""
+    return pd.Series(pd.util.hash_array(rows.to_numpy()), index=rows.index)
+
+def row_index_path(name):
+    return os.path.join(RUN_DIR, name + ROW_INDEX_SUFFIX)
+
+def save_row_index(name, digest, header, hashes):
+    """Record the row hashes of the version of `name` with sha256 `digest`."""
+    os.makedirs(RUN_DIR, exist_ok=True)
+    path = row_index_path(name)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    pd.to_pickle({"sha256": digest, "header": header, "hashes": hashes}, tmp_path)
+    os.replace(tmp_path, path)
+
+def load_row_index(name):
+    """The saved row index of `name`, or None if there is none or it cannot be read."""
+    try:
+        return pd.read_pickle(row_index_path(name))
+    except Exception:
+        return None
+
+def previous_row_index(entry, saved):
+    """(header, row hashes) of the archived `entry`: the `saved` index when it is that version, else rebuilt."""
+    if saved is not None and saved["sha256"] == entry["sha256"]:
+        return saved["header"], saved["hashes"]
+    header, rows = split_rows(reconstruct(entry))
+    return header, row_hashes(rows)
+
+def archive_snapshot(path, previous, compression="gzip", level=None, max_chain=MAX_DELTA_CHAIN):
+    """Archive a keyed snapshot as a delta on `previous` (its entry in the last run).
+
+    Rows are compared by hash against the row index saved by the last run
+    (rebuilt from the archive only when missing or stale). Falls back to a
+    full blob (a new base) when there is nothing to diff against, the chain
+    is at `max_chain`, the delta would not be smaller, or the rows do not
+    rebuild the file byte for byte.
+    """
+    digest = file_sha256(path)
+    if previous is not None and previous["sha256"] == digest:
+        return dict(previous, stored_bytes=0, reused=True)
+
+    name = os.path.basename(path)
+    saved = load_row_index(name)
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        header, new_rows = split_rows(data)
+    except ValueError:
+        return archive_file(path, compression, level)
+    new_hashes = row_hashes(new_rows)
+    # for the next run, whichever way this version is stored (the previous
+    # version's index was loaded above)
+    save_row_index(name, digest, header, new_hashes)
+
+    if find_blob(digest) is not None or previous is None:
+        return archive_file(path, compression, level)
+    if previous.get("format") == "delta":
+        base, chain = previous["base"], previous["deltas"]
+    else:
+        base, chain = previous["blob"], []
+    if len(chain) >= max_chain:
+        return archive_file(path, compression, level)
+
+    try:
+        order = detect_order(new_rows)
+        old_header, old_hashes = previous_row_index(previous, saved)
+        if order is None or header != old_header:
+            return archive_file(path, compression, level)
+        changed, deleted, counts = encode_delta(old_hashes, new_hashes)
+        if len(changed) + len(deleted) > len(new_rows) // 2:
+            return archive_file(path, compression, level)
+        # the delta must turn the previous rows into exactly these, and these
+        # rows must rebuild the file
+        rebuilt = apply_delta(old_hashes, changed, deleted)
+        if not rebuilt.sort_index().equals(new_hashes.sort_index()) or join_rows(header, new_rows, order) != data:
+            return archive_file(path, compression, level)
+    except ValueError:
+        return archive_file(path, compression, level)
+    upserts = new_rows[new_hashes.index.isin(changed.index)]
+
+    upserts_blob, upserts_size = store_data(header + b"".join(upserts.to_numpy()), compression, level)
+    deletes_blob, deletes_size = store_data(encode_deletes(deleted), compression, level)
+    return {
+        "sha256": digest,
+        "bytes": len(data),
+        "format": "delta",
+        "key": SNAPSHOT_KEY,
+        "order": order,
+        "base": base,
+        "deltas": chain + [{"upserts": upserts_blob, "deletes": deletes_blob}],
+        "stored_bytes": upserts_size + deletes_size,
+        "reused": False,
+        **counts,
+    }
+
+def restore_file(entry, out_path):
+    """Write an archived file back out (byte-identical to the original)."""
+    if entry.get("format") != "delta":
+        return extract_blob(entry["blob"], out_path)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = f"{out_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(reconstruct(entry))
+    os.replace(tmp_path, out_path)
+    return out_path
+
+# ========== FILE SUMMARIES ==========
+def describe_csv(path):
+    """Row count and date range of a clean CSV (only its date column is parsed)."""
+    try:
+        header = list(pd.read_csv(path, nrows=0).columns)
+        date_column = next((c for c in DATE_COLUMNS if c in header), None)
+        column = pd.read_csv(path, usecols=[date_column or header[0]]).iloc[:, 0]
+    except Exception:
+        return {"rows": None, "date_column": None, "date_min": None, "date_max": None}
+    dates = column.dropna() if date_column else None
+    return {
+        "rows": len(column),
+        "date_column": date_column,
+        "date_min": str(dates.min()) if dates is not None and len(dates) else None,
+        "date_max": str(dates.max()) if dates is not None and len(dates) else None,
+    }
+
+# ========== RUN MANIFESTS ==========
+def run_path(run_id):
+    return os.path.join(RUN_DIR, f"{run_id}.json")
+
+def new_run_id():
+    run_id = datetime.now().strftime(RUN_ID_FORMAT)
+    suffix = 1
+    while os.path.exists(run_path(run_id if suffix == 1 else f"{run_id}_{suffix}")):
+        suffix += 1
+    return run_id if suffix == 1 else f"{run_id}_{suffix}"
+
+def write_run(manifest):
+    os.makedirs(RUN_DIR, exist_ok=True)
+    path = run_path(manifest["run_id"])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def read_run(run_id):
+    try:
+        with open(run_path(run_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def list_runs():
+    """All run manifests, oldest first."""
+    if not os.path.isdir(RUN_DIR):
+        return []
+    run_ids = sorted(name[:-5] for name in os.listdir(RUN_DIR) if name.endswith(".json"))
+    runs = [read_run(run_id) for run_id in run_ids]
+    return [run for run in runs if run is not None]
+
+def archive_run(paths, settings, run_id=None):
+    """Archive `paths` concurrently (hash + compress per file) and record the run."""
+    run_id = run_id or new_run_id()
+    compression, level = settings["compression"], settings["level"]
+    runs = list_runs()
+    previous = runs[-1]["files"] if runs else {}
+
+    def archive_one(path):
+        name = os.path.basename(path)
+        if name in settings["delta_files"]:
+            entry = archive_snapshot(path, previous.get(name), compression, level, settings["max_chain"])
+        else:
+            entry = archive_file(path, compression, level)
+        if "rows" not in entry:
+            entry.update(describe_csv(path))
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, settings["workers"])) as pool:
+        entries = pool.map(archive_one, paths)
+        files = {os.path.basename(path): entry for path, entry in zip(paths, entries)}
+    manifest = {
+        "run_id": run_id,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "compression": compression,
+        "files": files,
+    }
+    write_run(manifest)
+    return manifest
+
+def run_blobs(manifest):
+    """Every blob a run needs to restore its files (a delta's base and whole chain included)."""
+    blobs = set()
+    for entry in manifest["files"].values():
+        if entry.get("format") == "delta":
+            blobs.add(entry["base"])
+            for delta in entry["deltas"]:
+                blobs.update((delta["upserts"], delta["deletes"]))
+        else:
+            blobs.add(entry["blob"])
+    return blobs
+
+# ========== RETENTION ==========
+def blob_sizes():
+    if not os.path.isdir(BLOB_DIR):
+        return {}
+    return {name: os.path.getsize(os.path.join(BLOB_DIR, name))
+            for name in os.listdir(BLOB_DIR) if not name.endswith(".tmp")}
+
+def select_expired(runs, keep_runs=None, max_age_days=None, max_bytes=None, now=None):
+    """Run ids to drop, oldest first. The newest run is always kept.
+
+    Limits apply in order: run count, age, then total stored bytes (blobs
+    shared between runs count once).
+    """
+    now = now or datetime.now()
+    newest_first = list(reversed(runs))
+    kept = newest_first[:1]
+    for position, run in enumerate(newest_first[1:], start=1):
+        if keep_runs is not None and position >= keep_runs:
+            continue
+        created = datetime.strptime(run["created_at"], "%Y-%m-%d %H:%M:%S")
+        if max_age_days is not None and now - created > timedelta(days=max_age_days):
+            continue
+        kept.append(run)
+
+    if max_bytes is not None:
+        sizes = blob_sizes()
+        while len(kept) > 1:
+            needed = set().union(*(run_blobs(run) for run in kept))
+            if sum(sizes.get(name, 0) for name in needed) <= max_bytes:
+                break
+            kept.pop()  # oldest kept run
+
+    kept_ids = {run["run_id"] for run in kept}
+    return [run["run_id"] for run in runs if run["run_id"] not in kept_ids]
+
+def collect_garbage():
+    """Delete blobs no run manifest refers to; returns the bytes freed."""
+    needed = set()
+    for run in list_runs():
+        needed |= run_blobs(run)
+    freed = 0
+    for name, size in blob_sizes().items():
+        if name not in needed:
+            os.remove(os.path.join(BLOB_DIR, name))
+            freed += size
+    return freed
+
+def apply_retention(settings, now=None):
+    """Drop expired runs, their restored copies and unreferenced blobs. Returns (run_ids, bytes_freed)."""
+    expired = select_expired(list_runs(), settings["keep_runs"], settings["max_age_days"], settings["max_bytes"], now)
+    for run_id in expired:
+        os.remove(run_path(run_id))
+        shutil.rmtree(os.path.join(CACHE_DIR, run_id), ignore_errors=True)
+    return expired, collect_garbage()
+
+# ========== ARCHIVE INDEX ==========
+def legacy_runs(known=None):
+    """Runs made of the old archiver's timestamp-prefixed copies, oldest first.
+
+    `known` (the previous index's legacy runs) saves re-hashing unchanged files.
+    """
+    cached = {}
+    for run in known or []:
+        for name, entry in run["files"].items():
+            cached[(run["run_id"], name)] = entry
+    runs = {}
+    for file_name in sorted(os.listdir(ARCHIVE_DIR)):
+        match = LEGACY_FILE.match(file_name)
+        if not match:
+            continue
+        run_id, name = match.groups()
+        path = os.path.join(ARCHIVE_DIR, file_name)
+        size = os.path.getsize(path)
+        entry = cached.get((run_id, name))
+        if entry is None or entry["bytes"] != size:
+            entry = {"sha256": file_sha256(path), "bytes": size, "stored_bytes": size, "format": "copy",
+                     **describe_csv(path)}
+        run = runs.setdefault(run_id, {
+            "run_id": run_id,
+            "created_at": datetime.strptime(run_id, RUN_ID_FORMAT).strftime("%Y-%m-%d %H:%M:%S"),
+            "source": "legacy",
+            "files": {},
+        })
+        run["files"][name] = entry
+    return [runs[run_id] for run_id in sorted(runs)]
+
+def index_entry(entry):
+    keys = ("sha256", "bytes", "stored_bytes", "rows", "date_column", "date_min", "date_max",
+            "inserted", "updated", "deleted")
+    summary = {key: entry[key] for key in keys if key in entry}
+    summary["format"] = entry.get("format", "full")
+    return summary
+
+def build_archive_index():
+    """{"runs": [...]} of every archived run, newest first."""
+    previous = read_archive_index() or {"runs": []}
+    legacy = legacy_runs([run for run in previous["runs"] if run.get("source") == "legacy"])
+    runs = {run["run_id"]: run for run in legacy}
+    for manifest in list_runs():
+        runs[manifest["run_id"]] = {
+            "run_id": manifest["run_id"],
+            "created_at": manifest["created_at"],
+            "source": "archive",
+            "files": {name: index_entry(entry) for name, entry in manifest["files"].items()},
+        }
+    return {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "runs": [runs[run_id] for run_id in sorted(runs, reverse=True)],
+    }
+
+def update_archive_index():
+    index = build_archive_index()
+    tmp_path = INDEX_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, INDEX_FILE)
+    return index
+
+def read_archive_index():
+    try:
+        with open(INDEX_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def run_file_path(run_id, name):
+    """Local path of `name` as archived by `run_id` (restored into CACHE_DIR on first use), or None."""
+    manifest = read_run(run_id)
+    if manifest is None:
+        legacy_path = os.path.join(ARCHIVE_DIR, f"{run_id}_{name}")
+        return legacy_path if os.path.exists(legacy_path) else None
+    entry = manifest["files"].get(name)
+    if entry is None:
+        return None
+    path = os.path.join(CACHE_DIR, run_id, name)
+    if not os.path.exists(path):
+        restore_file(entry, path)
+    return path
@@ -0,0 +1,71 @@
+# scripts/benchmark_csv.py
+
+import os
+import time
+import argparse
+
+from chunk_reader import CSV_ENGINES, DEFAULT_CHUNKSIZE, pa_csv, read_csv, read_csv_chunks
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_DIR = os.path.join(BASE_DIR, "data", "raw")
+RAW_FILES = ["train.csv", "test.csv", "features.csv", "stores.csv"]
+
+# ========== LOGGER ==========
+def log(msg):
+    print(msg)
+
+def quiet(msg):
+    pass
+
+# ========== BENCHMARK ==========
+def time_whole(path, engine):
+    start = time.perf_counter()
+    df = read_csv(path, engine=engine, log=quiet)
+    return time.perf_counter() - start, df
+
+def time_chunked(path, engine, chunksize):
+    start = time.perf_counter()
+    rows = sum(len(chunk) for chunk in read_csv_chunks(path, chunksize=chunksize, engine=engine, log=quiet))
+    return time.perf_counter() - start, rows
+
+def benchmark(path, engines, repeat=3, chunksize=DEFAULT_CHUNKSIZE):
+    """Best-of-`repeat` seconds per engine, whole-file and chunked; frames are checked equal."""
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    results, frames = [], {}
+    for engine in engines:
+        whole = min(time_whole(path, engine)[0] for _ in range(repeat))
+        chunked = min(time_chunked(path, engine, chunksize)[0] for _ in range(repeat))
+        frames[engine] = time_whole(path, engine)[1]
+        results.append({"engine": engine, "rows": len(frames[engine]), "whole": whole, "chunked": chunked, "mb": size_mb})
+
+    reference = frames[engines[0]]
+    for engine in engines[1:]:
+        same = frames[engine].equals(reference)
+        log(f"  {engine} result {'matches' if same else 'DIFFERS FROM'} {engines[0]}")
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare CSV parser engines on the raw files")
+    parser.add_argument("paths", nargs="*", help="CSV files (default: data/raw/*.csv)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    engines = [engine for engine in CSV_ENGINES if engine != "pyarrow" or pa_csv is not None]
+    if len(engines) < len(CSV_ENGINES):
+        log("pyarrow is not installed; benchmarking the 'c' engine only")
+    paths = args.paths or [os.path.join(RAW_DIR, name) for name in RAW_FILES]
+
+    for path in paths:
+        if not os.path.exists(path):
+            log(f"Missing file: {path}")
+            continue
+        log(f"{os.path.basename(path)}:")
+        for r in benchmark(path, engines, args.repeat, args.chunksize):
+            log(f"  {r['engine']:<8} {r['rows']:>9} rows  whole {r['whole']:6.2f}s ({r['mb'] / r['whole']:6.1f} MB/s)"
+                f"  chunked {r['chunked']:6.2f}s ({r['mb'] / r['chunked']:6.1f} MB/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+# scripts/chunk_reader.py
+
+import io
+import os
+import csv
+import time
+import codecs
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # the "pyarrow" engine is optional; "c" always works
+    pa = pc = pa_csv = None
+
+DEFAULT_CHUNKSIZE = 100000
+# Parser backends, chosen with "parsing": {"engine": ...} in etl_config.json
+CSV_ENGINES = ("c", "pyarrow")
+# Arrow parses (and infers types) one block at a time, on all cores
+ARROW_BLOCK_SIZE = 16 * 1024 * 1024
+# The "c" engine checks field counts one block of raw bytes at a time
+C_BLOCK_SIZE = 8 * 1024 * 1024
+
+# ========== ENGINE SELECTION ==========
+def csv_options(etl_cfg):
+    """Reader keyword arguments from the "parsing" section of etl_config.json."""
+    parsing = etl_cfg.get("parsing", {})
+    return {"engine": parsing.get("engine", "c"), "arrow_dtypes": bool(parsing.get("arrow_dtypes", False))}
+
+def resolve_engine(engine, log=print):
+    """`engine` if it can run here, otherwise "c"."""
+    if engine not in CSV_ENGINES:
+        log(f"WARNING: unknown CSV engine {engine!r}, using 'c'")
+        return "c"
+    if engine == "pyarrow" and pa_csv is None:
+        log("WARNING: pyarrow is not installed, using the 'c' CSV engine")
+        return "c"
+    return engine
+
+# ========== PYARROW HELPERS ==========
+# Frames read with pyarrow match the C engine's: date-like columns stay
+# strings (callers parse them with a known format), and columns that are
+# empty in the first block become float64 rather than Arrow's null type,
+# which the streaming reader could not widen in later blocks.
+
+def _arrow_column_types(path, read_options, ignore_empty_lines):
+    # the probe parses the first block only; its bad rows are reported by the real read
+    parse_options = pa_csv.ParseOptions(invalid_row_handler=lambda row: "skip", ignore_empty_lines=ignore_empty_lines)
+    probe = pa_csv.open_csv(path, read_options=read_options, parse_options=parse_options)
+    try:
+        schema = probe.schema
+    finally:
+        probe.close()
+    column_types = {}
+    for field in schema:
+        if pa.types.is_null(field.type):
+            column_types[field.name] = pa.float64()
+        elif pa.types.is_date(field.type) or pa.types.is_timestamp(field.type) or pa.types.is_time(field.type):
+            column_types[field.name] = pa.string()
+    return column_types
+
+def _arrow_options(path, skip_lines=0, invalid_row_handler=None, streaming=False):
+    read_options = pa_csv.ReadOptions(use_threads=True, block_size=ARROW_BLOCK_SIZE, skip_rows_after_names=skip_lines)
+    # blank lines are kept (as rows with one empty value) when streaming, so
+    # row counts stay in step with physical lines for checkpoints;
+    # _arrow_chunks drops them before conversion
+    parse_options = pa_csv.ParseOptions(invalid_row_handler=invalid_row_handler, ignore_empty_lines=not streaming)
+    convert_options = pa_csv.ConvertOptions(column_types=_arrow_column_types(path, read_options, not streaming))
+    return read_options, parse_options, convert_options
+
+def _blank_rows(table):
+    """Mask of the rows a kept blank line becomes: every value null, or "" in string columns."""
+    blank = None
+    for column in table.columns:
+        empty = pc.is_null(column)
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            empty = pc.or_(empty, pc.fill_null(pc.equal(column, ""), False))
+        blank = empty if blank is None else pc.and_(blank, empty)
+    return blank
+
+def _to_pandas(table, arrow_dtypes=False, self_destruct=False):
+    if arrow_dtypes:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    # self_destruct frees each Arrow column as it is converted (only safe when
+    # nothing else references the table's buffers)
+    return table.to_pandas(split_blocks=True, self_destruct=self_destruct)
+
+# ========== WHOLE-FILE READER ==========
+def read_csv(path, engine="c", arrow_dtypes=False, log=print, **read_kwargs):
+    """Read all of `path` into one DataFrame with the chosen parser backend.
+
+    `read_kwargs` go to pd.read_csv and apply to the "c" engine only.
+    """
+    if resolve_engine(engine, log) == "c":
+        return pd.read_csv(path, **read_kwargs)
+    read_options, parse_options, convert_options = _arrow_options(path)
+    table = pa_csv.read_csv(path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+    return _to_pandas(table, arrow_dtypes, self_destruct=True)
+
+# ========== CHUNKED CSV READER ==========
+# One pass over the file; every malformed line (wrong field count) is
+# quarantined with its exact line number and raw text.
+#
+# "c":       field counts are checked here with a vectorised scan of raw
+#            byte blocks; runs of well-formed records go to the C parser
+#            as-is, one chunk at a time, and only rejected records are
+#            decoded in Python. (pandas' own on_bad_lines handling is not
+#            used: in chunked mode a chunk that starts with a too-wide line
+#            silently changes the expected field count and later bad lines
+#            are truncated, not reported.)
+# "pyarrow": Arrow's streaming reader parses blocks on all cores and reports
+#            bad rows through invalid_row_handler. Quoted fields spanning
+#            lines would desynchronize line counts; use "c" for such files.
+#
+# `stats` tracks exactly what was consumed:
+#   rows     - data rows yielded
+#   rejected - malformed records quarantined
+#   lines    - physical data lines consumed, blank ones included
+#              (header excluded), i.e. the `skip_lines` that resumes
+#              right after the last yielded chunk (same for both engines)
+
+def field_count(record, sep=","):
+    if '"' not in record:
+        return record.count(sep) + 1
+    return len(next(csv.reader([record], delimiter=sep)))
+
+def _open_rejects(reject_path):
+    os.makedirs(os.path.dirname(reject_path) or ".", exist_ok=True)
+    is_new = not os.path.exists(reject_path)
+    f = open(reject_path, "a", encoding="utf-8", newline="")
+    writer = csv.writer(f)
+    if is_new:
+        writer.writerow(["line", "error", "raw"])
+    return f, writer
+
+def read_csv_chunks(path, chunksize=DEFAULT_CHUNKSIZE, skip_lines=0, reject_path=None,
+                    stats=None, log=print, engine="c", arrow_dtypes=False, **read_kwargs):
+    """Yield DataFrame chunks of `path` after its first `skip_lines` data lines.
+
+    `read_kwargs` go to pd.read_csv for each chunk ("c" engine only).
+    """
+    stats = stats if stats is not None else {}
+    stats.update(path=path, rows=0, rejected=0, lines=skip_lines, seconds=0.0, engine=resolve_engine(engine, log))
+    rejects = {}
+
+    def quarantine(bad):
+        if not bad:
+            return
+        stats["rejected"] += len(bad)
+        if reject_path is None:
+            return
+        if "writer" not in rejects:
+            rejects["file"], rejects["writer"] = _open_rejects(reject_path)
+        rejects["writer"].writerows(bad)
+        rejects["file"].flush()
+
+    if stats["engine"] == "pyarrow":
+        chunks = _arrow_chunks(path, chunksize, skip_lines, stats, quarantine, arrow_dtypes)
+    else:
+        chunks = _c_chunks(path, chunksize, skip_lines, stats, quarantine, read_kwargs)
+    try:
+        yield from chunks
+    finally:
+        if "file" in rejects:
+            rejects["file"].close()
+    if stats.get("empty"):
+        log(f"WARNING: {path} is empty")
+        return
+
+    seconds = stats["seconds"]
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    stats["rows_per_sec"] = round(stats["rows"] / seconds) if seconds else None
+    stats["mb_per_sec"] = round(size_mb / seconds, 1) if seconds else None
+    if stats["rejected"] and reject_path is None:
+        log(f"WARNING: skipped {stats['rejected']} malformed line(s) in {path}")
+    log(f"Parsed {os.path.basename(path)} ({stats['engine']}): {stats['rows']} rows, {stats['rejected']} rejected "
+        f"in {seconds:.2f}s ({stats['rows_per_sec']} rows/s, {stats['mb_per_sec']} MB/s)")
+
+# Bytes that leave a record blank (what bytes.strip() removes)
+BLANK_BYTES = np.array([9, 10, 11, 12, 13, 32], dtype=np.uint8)
+
+def _per_record(positions, ends):
+    """How many of `positions` fall in each record ending at `ends`, plus the tail after the last."""
+    return np.diff(np.searchsorted(positions, ends), prepend=0, append=len(positions))
+
+def _scan_block(block, sep, inside):
+    """Split a block of raw bytes into the records that end in it.
+
+    A quote toggles "inside a quoted field" (a doubled "" toggles twice);
+    newlines and separators inside quotes do not count. `inside` is the
+    state at the start of the block. Returns the records' end offsets, their
+    (separators, non-blank, newlines) counts as a 3 x n array, the same
+    counts for the unfinished tail after the last record, and the state at
+    the end of the block.
+    """
+    arr = np.frombuffer(block, dtype=np.uint8)
+    newlines = np.flatnonzero(arr == 10)
+    seps = np.flatnonzero(arr == sep)
+    if inside or (arr == 34).any():
+        quoted = np.logical_xor.accumulate(arr == 34) ^ inside
+        ends = newlines[~quoted[newlines]] + 1
+        seps = seps[~quoted[seps]]
+        inside = bool(quoted[-1])
+    else:
+        ends = newlines + 1
+    counts = np.array([_per_record(seps, ends), np.ones(len(ends) + 1, dtype=np.int64),
+                       _per_record(newlines, ends)])
+
+    # only a record without separators can be blank
+    bounds = np.concatenate(([0], ends, [len(block)]))
+    maybe_blank = np.flatnonzero(counts[0] == 0)
+    if len(maybe_blank) > len(ends) // 16 + 64:
+        # e.g. a one-column file: count non-blank bytes per record in one pass
+        filled = ~np.isin(arr, BLANK_BYTES)
+        starts = bounds[:-1][bounds[:-1] < len(block)]
+        counts[1, :len(starts)] = np.add.reduceat(filled, starts, dtype=np.int64)
+        counts[1, len(starts):] = 0
+    else:
+        for i in maybe_blank:
+            counts[1, i] = bool(block[bounds[i]:bounds[i + 1]].strip())
+    return ends, counts[:, :-1], counts[:, -1], inside
+
+def _c_chunks(path, chunksize, skip_lines, stats, quarantine, read_kwargs):
+    sep = read_kwargs.get("sep", ",")
+    if len(sep.encode()) != 1:
+        raise ValueError(f"the 'c' chunk reader needs a one-byte separator, got {sep!r}")
+    sep_byte = sep.encode()[0]
+    read_kwargs = {"encoding_errors": "replace", **read_kwargs}
+
+    def parse(header, parts):
+        return pd.read_csv(io.BytesIO(header + b"".join(parts)), engine="c", **read_kwargs)
+
+    def text(record):
+        return record.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        header = f.readline()
+        if header.startswith(codecs.BOM_UTF8):
+            header = header[len(codecs.BOM_UTF8):]
+        if not header.strip():
+            stats["empty"] = True
+            return
+        if not header.endswith(b"\n"):
+            header += b"\n"
+        n_fields = field_count(text(header), sep)
+
+        for _ in range(skip_lines):
+            if not f.readline():
+                break
+        consumed = 1 + skip_lines  # physical lines read, header included
+
+        parts, n_good, bad = [], 0, []
+        # the record still open at the end of the last block: its bytes and counts
+        carry, carry_counts, inside = [], np.zeros(3, dtype=np.int64), False
+        while True:
+            block = f.read(C_BLOCK_SIZE)
+            if not block:
+                break
+            ends, counts, tail, inside = _scan_block(block, sep_byte, inside)
+            if not len(ends):
+                carry.append(block)
+                carry_counts += tail
+                continue
+
+            counts[:, 0] += carry_counts
+            head = b"".join(carry)
+            starts = np.concatenate(([0], ends[:-1]))
+            fields, filled, newlines = counts[0] + 1, counts[1] > 0, counts[2]
+            good = filled & (fields == n_fields)
+            lines_after = consumed + np.cumsum(newlines)  # physical line each record ends on
+            good_through = np.cumsum(good)
+
+            def records(lo, hi):
+                # raw bytes of records lo..hi of this block
+                return (head if lo == 0 else b"") + block[starts[lo]:ends[hi]]
+
+            n, i = len(ends), 0
+            while i < n:
+                before = good_through[i - 1] if i else 0
+                # the record that completes the chunk, or the block's last one
+                last = min(int(np.searchsorted(good_through, before + chunksize - n_good)), n - 1)
+                run = i
+                for k in np.flatnonzero(~good[i:last + 1]) + i:
+                    if k > run:
+                        parts.append(records(run, k - 1))
+                    if filled[k]:
+                        line = (lines_after[k - 1] if k else consumed) + 1
+                        bad.append((int(line), f"expected {n_fields} fields, saw {fields[k]}", text(records(k, k))))
+                    run = k + 1
+                if run <= last:
+                    parts.append(records(run, last))
+                n_good += int(good_through[last] - before)
+                i = last + 1
+                if n_good >= chunksize:
+                    chunk = parse(header, parts)
+                    quarantine(bad)
+                    stats["rows"] += len(chunk)
+                    stats["lines"] = int(lines_after[last]) - 1
+                    stats["seconds"] += time.perf_counter() - start
+                    parts, n_good, bad = [], 0, []
+                    yield chunk
+                    start = time.perf_counter()
+            consumed = int(lines_after[-1])
+            carry, carry_counts = [block[ends[-1]:]], tail
+
+        record = b"".join(carry)
+        if record:
+            line = consumed + 1
+            consumed += int(carry_counts[2]) + (not record.endswith(b"\n"))
+            if inside:
+                bad.append((line, "unterminated quoted field", text(record)))
+            elif carry_counts[1]:
+                # last record without a trailing newline
+                count = int(carry_counts[0]) + 1
+                if count == n_fields:
+                    parts.append(record + b"\n")
+                else:
+                    bad.append((line, f"expected {n_fields} fields, saw {count}", text(record)))
+        quarantine(bad)
+        stats["lines"] = consumed - 1
+        if parts:
+            chunk = parse(header, parts)
+            stats["rows"] += len(chunk)
+            stats["seconds"] += time.perf_counter() - start
+            yield chunk
+        else:
+            stats["seconds"] += time.perf_counter() - start
+
+def _arrow_chunks(path, chunksize, skip_lines, stats, quarantine, arrow_dtypes):
+    # the handler runs on Arrow's parser threads, possibly ahead of the batch
+    # being consumed, so bad rows are collected and attributed to a chunk by
+    # line number: a bad line belongs to the chunk once a later good line has
+    # been yielded (or at end of file)
+    bad = []
+
+    def on_invalid_row(row):
+        bad.append((row.number, f"expected {row.expected_columns} fields, saw {row.actual_columns}", row.text))
+        return "skip"
+
+    start = time.perf_counter()
+    if os.path.getsize(path) == 0:
+        stats["empty"] = True
+        return
+    read_options, parse_options, convert_options = _arrow_options(path, skip_lines, on_invalid_row, streaming=True)
+    reader = pa_csv.open_csv(path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+    rows_read, taken = 0, 0
+
+    def take_bad(final=False):
+        nonlocal taken
+        bad.sort(key=lambda b: b[0] or 0)
+        consumed = skip_lines + rows_read + taken
+        count = 0
+        # row.number is the physical line (header = 1); data line = number - 1
+        while count < len(bad) and (final or bad[count][0] is None or bad[count][0] - 1 <= consumed):
+            count += 1
+            consumed += 1
+        quarantine(bad[:count])
+        del bad[:count]
+        taken += count
+        return consumed
+
+    def to_chunk(table):
+        nonlocal rows_read
+        rows_read += table.num_rows
+        # drop blank lines in Arrow: converted, their nulls would already have
+        # turned int columns into float64
+        return _to_pandas(table.filter(pc.invert(_blank_rows(table))), arrow_dtypes)
+
+    try:
+        # Arrow batches follow block boundaries; re-cut them into `chunksize` rows
+        buffered = pa.Table.from_batches([], schema=reader.schema)
+        for batch in reader:
+            buffered = pa.concat_tables([buffered, pa.Table.from_batches([batch])])
+            while buffered.num_rows >= chunksize:
+                chunk = to_chunk(buffered.slice(0, chunksize))
+                buffered = buffered.slice(chunksize)
+                stats["lines"] = take_bad()
+                stats["rows"] += len(chunk)
+                stats["seconds"] += time.perf_counter() - start
+                yield chunk
+                start = time.perf_counter()
+        chunk = to_chunk(buffered) if buffered.num_rows else None
+        stats["lines"] = take_bad(final=True)
+        if chunk is not None and len(chunk):
+            stats["rows"] += len(chunk)
+            stats["seconds"] += time.perf_counter() - start
+            yield chunk
+        else:
+            stats["seconds"] += time.perf_counter() - start
+    finally:
+        reader.close()
@@ -0,0 +1,137 @@
+# scripts/column_encoding.py
+
+import numpy as np
+import pandas as pd
+
+# Low-cardinality text columns of the clean datasets, held as pandas
+# categoricals (int8 codes + one dictionary) instead of one string per row.
+# transform.py writes them dictionary-encoded into the Arrow copies; CSV
+# readers re-apply them with encode_columns().
+CATEGORY_COLUMNS = ["store_type"]
+# True/False flags, held as bool (1 byte per row)
+FLAG_COLUMNS = ["is_holiday"]
+
+TRUE_VALUES = {"true", "1", "t", "yes"}
+FALSE_VALUES = {"false", "0", "f", "no"}
+
+def encode_flag(values):
+    """bool Series of a True/False column (bools, 0/1 or text); "boolean" if it has missing values."""
+    if pd.api.types.is_bool_dtype(values):
+        return values
+    text = values.astype("string").str.strip().str.lower()
+    unknown = text.notna() & ~text.isin(TRUE_VALUES | FALSE_VALUES)
+    if unknown.any():
+        raise ValueError(f"{values.name}: {int(unknown.sum())} value(s) are not True/False, e.g. {values[unknown].iloc[0]!r}")
+    flags = text.isin(TRUE_VALUES).astype("boolean").mask(text.isna())
+    return flags.astype(bool) if not flags.isna().any() else flags
+
+def encode_columns(df):
+    """`df` with CATEGORY_COLUMNS as categoricals and FLAG_COLUMNS as bool (columns it lacks are skipped)."""
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            categories = sorted(df[column].dropna().astype(str).unique())
+            df[column] = df[column].astype(pd.CategoricalDtype(categories))
+    for column in FLAG_COLUMNS:
+        if column in df.columns:
+            df[column] = encode_flag(df[column])
+    return df
+
+def reconcile_flag(df, column, log=print):
+    """Collapse the `<column>_x` / `<column>_y` pair a merge leaves into one `column`.
+
+    The left side wins; rows where the right side has a different value are
+    counted and logged. Rows without a right-side match keep the left value.
+    """
+    left, right = f"{column}_x", f"{column}_y"
+    if left not in df.columns or right not in df.columns:
+        return df
+    other = df[right]
+    disagree = other.notna() & (encode_flag(df[left]) != encode_flag(other).fillna(False))
+    if disagree.any():
+        log(f"WARNING: {column} differs between the merged tables on {int(disagree.sum())} row(s); kept the left value")
+    return df.drop(columns=[right]).rename(columns={left: column})
+
+# ========== DOWNCASTING ==========
+# Numeric columns are stored in the smallest dtype that keeps their values:
+# integers in the smallest signed type covering their range, floats as
+# float32 when every value written as float32 text (what to_csv emits) reads
+# back within `tolerance` of the original. With the default tolerance of 0
+# the clean CSVs are byte-identical to float64 output.
+
+INT_TYPES = ["int8", "int16", "int32"]
+DEFAULT_TOLERANCE = 0.0
+# Kept float64: the measure the dashboard sums over whole datasets, where
+# float32 accumulation would drift even though each value round-trips
+DEFAULT_EXCLUDE = ["weekly_sales"]
+# Values checked before the whole column, so columns that fail stop early
+SCREEN_ROWS = 10000
+
+def smallest_int(values):
+    """Smallest signed dtype in INT_TYPES holding every value of an int column, or None."""
+    if values.empty:
+        return INT_TYPES[0]
+    lo, hi = int(values.min()), int(values.max())
+    for dtype in INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return None
+
+def float32_error(values):
+    """Largest |x - x'| over a float column, x' being x written as float32 text and parsed back."""
+    x = values.to_numpy(dtype="float64")
+    x = x[~np.isnan(x)]
+    if x.size == 0:
+        return 0.0
+    with np.errstate(over="ignore"):
+        x32 = x.astype("float32")
+    if np.isinf(x32).any():
+        return float("inf")
+    return float(np.abs(x32.astype(str).astype("float64") - x).max())
+
+def downcast_columns(df, tolerance=DEFAULT_TOLERANCE, tolerances=None, exclude=DEFAULT_EXCLUDE):
+    """Copy of `df` with int64 / float64 columns downcast where lossless, and {column: report}.
+
+    `tolerances` overrides `tolerance` (max absolute round-trip error of a
+    float column) per column; `exclude` columns are left as they are.
+    """
+    tolerances = tolerances or {}
+    out, report = df.copy(deep=False), {}
+    for column in df.columns:
+        if column in exclude:
+            continue
+        values = df[column]
+        source = str(values.dtype)
+        if source == "int64":
+            dtype = smallest_int(values)
+            if dtype is not None:
+                out[column] = values.astype(dtype)
+                report[column] = {"dtype": dtype, "source": source}
+        elif source == "float64":
+            limit = float(tolerances.get(column, tolerance))
+            if float32_error(values.iloc[:SCREEN_ROWS]) > limit:
+                continue
+            error = float32_error(values)
+            if error <= limit:
+                out[column] = values.astype("float32")
+                report[column] = {"dtype": "float32", "source": source, "max_error": error, "tolerance": limit}
+    return out, report
+
+def frame_schema(df, report=None):
+    """{column: {"dtype", and the downcast report if any}} of a frame."""
+    report = report or {}
+    schema = {}
+    for column, dtype in df.dtypes.items():
+        name = "category" if isinstance(dtype, pd.CategoricalDtype) else str(dtype)
+        schema[column] = {**report.get(column, {}), "dtype": name}
+    return schema
+
+def schema_dtypes(schema, columns=None):
+    """read_csv `dtype` mapping that re-applies a recorded schema (dates, flags and wide types are left to the parser)."""
+    dtypes = {}
+    for column, entry in schema.get("columns", {}).items():
+        if columns is not None and column not in columns:
+            continue
+        if entry["dtype"] in INT_TYPES or entry["dtype"] in ("float32", "category"):
+            dtypes[column] = entry["dtype"]
+    return dtypes
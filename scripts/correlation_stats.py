@@ -0,0 +1,98 @@
+# scripts/correlation_stats.py
+
+import json
+import numpy as np
+import pandas as pd
+
+# Numeric columns of full_dataset_clean covered by the correlation matrix
+CORRELATION_COLUMNS = [
+    "store", "dept", "weekly_sales", "temperature", "fuel_price",
+    "markdown1", "markdown2", "markdown3", "markdown4", "markdown5",
+    "cpi", "unemployment", "size",
+]
+
+# ========== SUFFICIENT STATISTICS ==========
+# Stored as count, per-column mean and the co-moment matrix
+# sum((x - mean_x) * (y - mean_y)). They carry the same information as
+# sums / sums of squares / cross-products but merge without the
+# cancellation error of raw sums on large sales values.
+
+def empty_stats(columns):
+    k = len(columns)
+    return {"columns": list(columns), "n": 0, "mean": np.zeros(k), "comoment": np.zeros((k, k))}
+
+def chunk_stats(chunk, columns):
+    """Statistics of one chunk; missing values count as 0, like the dashboard always did."""
+    x = chunk.reindex(columns=columns).astype("float64").fillna(0).to_numpy()
+    stats = empty_stats(columns)
+    if len(x):
+        stats["n"] = len(x)
+        stats["mean"] = x.mean(axis=0)
+        centered = x - stats["mean"]
+        stats["comoment"] = centered.T @ centered
+    return stats
+
+def merge_stats(a, b):
+    """Combine two sets of statistics (Chan et al. parallel update)."""
+    if a["columns"] != b["columns"]:
+        raise ValueError("Cannot merge statistics over different columns")
+    if b["n"] == 0:
+        return a
+    if a["n"] == 0:
+        return b
+    n = a["n"] + b["n"]
+    delta = b["mean"] - a["mean"]
+    return {
+        "columns": a["columns"],
+        "n": n,
+        "mean": a["mean"] + delta * (b["n"] / n),
+        "comoment": a["comoment"] + b["comoment"] + np.outer(delta, delta) * (a["n"] * b["n"] / n),
+    }
+
+def compute_stats(df, columns=CORRELATION_COLUMNS, chunksize=100000):
+    """Accumulate statistics over `df` (or an iterable of chunks) one chunk at a time."""
+    chunks = (df.iloc[i:i + chunksize] for i in range(0, len(df), chunksize)) if isinstance(df, pd.DataFrame) else df
+    stats = empty_stats(columns)
+    for chunk in chunks:
+        stats = merge_stats(stats, chunk_stats(chunk, columns))
+    return stats
+
+def correlation_matrix(stats):
+    """Pearson correlation matrix derived from the statistics alone."""
+    std = np.sqrt(np.diag(stats["comoment"]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = stats["comoment"] / np.outer(std, std)
+    return pd.DataFrame(corr, index=stats["columns"], columns=stats["columns"])
+
+# ========== PERSISTENCE ==========
+def save_stats(stats, path, **extra):
+    payload = {
+        "columns": stats["columns"],
+        "n": int(stats["n"]),
+        "mean": stats["mean"].tolist(),
+        "comoment": stats["comoment"].tolist(),
+        **extra,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+def load_stats(path):
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    payload["mean"] = np.array(payload["mean"], dtype="float64")
+    payload["comoment"] = np.array(payload["comoment"], dtype="float64")
+    return payload
+
+def update_stats_file(path, new_rows):
+    """Fold `new_rows` (e.g. newly arrived weeks) into the statistics saved at `path`.
+
+    Only the new rows are scanned; the result equals a full recompute over
+    old + new rows. Extra fields are kept, with `rows` moved to the new count.
+    """
+    saved = load_stats(path)
+    stats = {key: saved.pop(key) for key in ("columns", "n", "mean", "comoment")}
+    merged = merge_stats(stats, compute_stats(new_rows, stats["columns"]))
+    if "rows" in saved:
+        saved["rows"] = int(merged["n"])
+    save_stats(merged, path, **saved)
+    return merged
@@ -0,0 +1,284 @@
+# scripts/dataset_diff.py
+
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import pandas as pd
+
+from archive_store import CLEAN_DIR, run_file_path
+from chunk_reader import read_csv_chunks
+from snapshot_delta import SNAPSHOT_KEY as DIFF_KEY
+
+VALUE_COLUMN = "weekly_sales"
+DEFAULT_BUCKETS = 64
+DEFAULT_SAMPLE = 10
+DIFF_CHUNKSIZE = 200000
+
+# ---------- SIMPLE LOGGER ----------
+def log(msg):
+    print(msg)
+
+def quiet(msg):
+    pass
+
+# ========== VERSIONS ==========
+def resolve_version(version, dataset="full_dataset_clean"):
+    """CSV path of one version of `dataset`: a file path, "current" (data/clean) or an archive run id."""
+    if os.path.isfile(version):
+        return version
+    if version == "current":
+        path = os.path.join(CLEAN_DIR, f"{dataset}.csv")
+    else:
+        path = run_file_path(version, f"{dataset}.csv")
+    if path is None or not os.path.exists(path):
+        raise FileNotFoundError(f"No {dataset}.csv for version {version!r}")
+    return path
+
+def read_header(path):
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def text_chunks(path, compare, chunksize=DIFF_CHUNKSIZE, stats=None):
+    """Chunks with the compared columns as their CSV text, so fingerprints ignore dtype inference.
+
+    Malformed lines are skipped; their count ends up in `stats["rejected"]`.
+    """
+    return read_csv_chunks(path, chunksize=chunksize, stats=stats, log=quiet, dtype={c: str for c in compare},
+                           keep_default_na=False)
+
+def normalize_keys(chunk, key):
+    """Key columns comparable across versions: numeric keys as float64 ("1" == "1.0")."""
+    keys = pd.DataFrame(index=chunk.index)
+    for column in key:
+        values = chunk[column]
+        keys[column] = values.astype("float64") if pd.api.types.is_numeric_dtype(values) else values.astype(str)
+    return keys
+
+# ========== PASS 1: FINGERPRINT AND BUCKET ==========
+# Each version is read once, in chunks. Per row only the key, a 64-bit
+# fingerprint of the compared columns and weekly_sales are kept, spilled to
+# disk by key-hash bucket, so pass 2 holds one bucket of both sides at a time.
+# The row's ordinal in the file is kept too, for fetching sample rows later.
+
+def spill_version(path, side, key, compare, buckets, spill_dir, chunksize=DIFF_CHUNKSIZE):
+    """Bucket one version's fingerprints into `spill_dir`.
+
+    Returns (rows, rejected lines, per-store weekly_sales totals).
+    """
+    rows, totals, stats = 0, [], {}
+    for chunk_no, chunk in enumerate(text_chunks(path, compare, chunksize, stats)):
+        out = normalize_keys(chunk, key)
+        out["row"] = range(rows, rows + len(chunk))
+        out["fingerprint"] = pd.util.hash_pandas_object(chunk[compare], index=False).to_numpy()
+        if VALUE_COLUMN in chunk.columns:
+            out[VALUE_COLUMN] = pd.to_numeric(chunk[VALUE_COLUMN], errors="coerce")
+            if "store" in key:
+                totals.append(out.groupby("store")[VALUE_COLUMN].sum())
+        bucket = pd.util.hash_pandas_object(out[key], index=False).to_numpy() % buckets
+        for b, part in out.groupby(bucket, sort=False):
+            part.to_pickle(os.path.join(spill_dir, f"{side}_{b:04d}_{chunk_no:06d}.pkl"))
+        rows += len(chunk)
+    store_totals = pd.concat(totals).groupby(level=0).sum() if totals else pd.Series(dtype="float64")
+    return rows, stats["rejected"], store_totals
+
+def load_bucket(spill_dir, side, bucket, key):
+    prefix = f"{side}_{bucket:04d}_"
+    parts = [pd.read_pickle(os.path.join(spill_dir, name)) for name in sorted(os.listdir(spill_dir))
+             if name.startswith(prefix)]
+    if not parts:
+        return pd.DataFrame(columns=[*key, "fingerprint"])
+    return pd.concat(parts, ignore_index=True)
+
+# ========== PASS 2: SORTED MERGE PER BUCKET ==========
+def diff_bucket(old, new, key):
+    """(added, removed, changed, unchanged count, duplicates) of one bucket, frames sorted by key."""
+    duplicates = int(old.duplicated(key).sum() + new.duplicated(key).sum())
+    old = old.drop_duplicates(key, keep="last").sort_values(key, kind="mergesort")
+    new = new.drop_duplicates(key, keep="last").sort_values(key, kind="mergesort")
+    merged = old.merge(new, on=key, how="outer", suffixes=("_old", "_new"), indicator=True, sort=True)
+    both = merged["_merge"] == "both"
+    added = merged[merged["_merge"] == "right_only"]
+    removed = merged[merged["_merge"] == "left_only"]
+    same = merged["fingerprint_old"] == merged["fingerprint_new"]
+    changed = merged[both & ~same]
+    return added, removed, changed, int((both & same).sum()), duplicates
+
+def display_keys(frame, key):
+    """`frame` with integral numeric key columns (float64 internally) shown as integers."""
+    frame = frame.copy()
+    for column in key:
+        if column in frame.columns and frame[column].dtype == "float64" and (frame[column] % 1 == 0).all():
+            frame[column] = frame[column].astype("int64")
+    return frame
+
+def row_columns(frame):
+    return [c for c in ("row_old", "row_new") if c in frame.columns]
+
+def value_columns(frame):
+    return [c for c in (f"{VALUE_COLUMN}_old", f"{VALUE_COLUMN}_new") if c in frame.columns]
+
+# ========== PASS 3: SAMPLE ROWS ==========
+def fetch_rows(path, compare, rows):
+    """Rows of `path` at the given data-row ordinals, compared columns as text.
+
+    Assumes one record per line (true of the clean files); rows that shifted
+    anyway are caught by the key match in sample_changed_columns.
+    """
+    wanted = {int(r) + 1 for r in rows}
+    return pd.read_csv(path, skiprows=lambda i: i != 0 and i not in wanted,
+                       dtype={c: str for c in compare}, keep_default_na=False)
+
+def changed_columns(old_row, new_row, compare):
+    return [c for c in compare if old_row.get(c) != new_row.get(c)]
+
+# ========== DIFF ==========
+def diff_datasets(old_path, new_path, key=DIFF_KEY, buckets=DEFAULT_BUCKETS, sample=DEFAULT_SAMPLE,
+                  chunksize=DIFF_CHUNKSIZE):
+    """Compare two versions of a keyed clean dataset by row fingerprints.
+
+    Returns counts of added / removed / changed / unchanged rows, malformed
+    lines skipped in each version, column changes, per-store weekly_sales
+    deltas and up to `sample` example rows of each kind.
+    """
+    old_columns, new_columns = read_header(old_path), read_header(new_path)
+    missing = [c for c in key if c not in old_columns or c not in new_columns]
+    if missing:
+        raise ValueError(f"Key column(s) {missing} missing from one of the versions")
+    compare = [c for c in new_columns if c in old_columns and c not in key]
+
+    spill_dir = tempfile.mkdtemp(prefix="dataset_diff_")
+    try:
+        old_rows, old_rejected, old_totals = spill_version(old_path, "old", key, compare, buckets, spill_dir, chunksize)
+        new_rows, new_rejected, new_totals = spill_version(new_path, "new", key, compare, buckets, spill_dir, chunksize)
+
+        counts = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0, "duplicate_keys": 0}
+        samples = {"added": [], "removed": [], "changed": []}
+        per_store = []
+        for b in range(buckets):
+            added, removed, changed, unchanged, duplicates = diff_bucket(
+                load_bucket(spill_dir, "old", b, key), load_bucket(spill_dir, "new", b, key), key)
+            counts["unchanged"] += unchanged
+            counts["duplicate_keys"] += duplicates
+            for kind, frame in (("added", added), ("removed", removed), ("changed", changed)):
+                counts[kind] += len(frame)
+                if len(frame) and "store" in key:
+                    per_store.append(frame.groupby("store").size().to_frame(f"{kind}_rows"))
+                if sum(len(s) for s in samples[kind]) < sample:
+                    rows = {c: "Int64" for c in row_columns(frame)}
+                    samples[kind].append(frame[[*key, *value_columns(frame), *rows]].head(sample).astype(rows))
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    samples = {kind: pd.concat(parts, ignore_index=True).head(sample) if parts else pd.DataFrame(columns=key)
+               for kind, parts in samples.items()}
+    changed = sample_changed_columns(old_path, new_path, key, compare, samples["changed"])
+    result = {
+        "old": old_path,
+        "new": new_path,
+        "key": key,
+        "rows_old": old_rows,
+        "rows_new": new_rows,
+        "rejected_old": old_rejected,
+        "rejected_new": new_rejected,
+        **counts,
+        "columns_added": [c for c in new_columns if c not in old_columns],
+        "columns_removed": [c for c in old_columns if c not in new_columns],
+        "store_deltas": display_keys(store_deltas(old_totals, new_totals, per_store), key),
+        "samples": {kind: display_keys(frame, key) for kind, frame in samples.items()},
+        "changed_columns": changed,
+    }
+    return result
+
+def store_deltas(old_totals, new_totals, per_store):
+    """weekly_sales total per store in each version, the delta, and rows changed per store."""
+    deltas = pd.DataFrame({"sales_old": old_totals, "sales_new": new_totals}).fillna(0.0).round(2)
+    deltas["delta"] = (deltas["sales_new"] - deltas["sales_old"]).round(2)
+    deltas["delta_pct"] = (deltas["delta"] / deltas["sales_old"].where(deltas["sales_old"] != 0) * 100).round(3)
+    if per_store:
+        deltas = deltas.join(pd.concat(per_store).groupby(level=0).sum(), how="outer")
+    for kind in ("added_rows", "removed_rows", "changed_rows"):
+        deltas[kind] = deltas[kind].fillna(0).astype("int64") if kind in deltas.columns else 0
+    deltas.index.name = "store"
+    return deltas.reset_index().sort_values("delta", key=abs, ascending=False, kind="mergesort")
+
+def sample_changed_columns(old_path, new_path, key, compare, changed):
+    """{"store, dept, sale_date": changed column names} of the sampled changed rows (one more scan of each version)."""
+    if changed.empty:
+        return {}
+    old_rows = fetch_rows(old_path, compare, changed["row_old"])
+    new_rows = fetch_rows(new_path, compare, changed["row_new"])
+    old_by_key = {format_key(k): row for k, row in zip(normalize_keys(old_rows, key).itertuples(index=False),
+                                                        old_rows.to_dict("records"))}
+    result = {}
+    for k, row in zip(normalize_keys(new_rows, key).itertuples(index=False), new_rows.to_dict("records")):
+        if format_key(k) in old_by_key:
+            result[format_key(k)] = changed_columns(old_by_key[format_key(k)], row, compare)
+    return result
+
+# ========== REPORT ==========
+def format_key(values):
+    return ", ".join(str(int(v)) if isinstance(v, float) and v.is_integer() else str(v) for v in values)
+
+def print_report(result, top=10):
+    log(f"OLD: {result['old']} ({result['rows_old']} rows)")
+    log(f"NEW: {result['new']} ({result['rows_new']} rows)")
+    log(f"Added: {result['added']}  Removed: {result['removed']}  Changed: {result['changed']}  "
+        f"Unchanged: {result['unchanged']}")
+    for side in ("old", "new"):
+        if result[f"rejected_{side}"]:
+            log(f"WARNING: {result[f'rejected_{side}']} malformed line(s) in {side.upper()} skipped, "
+                f"not compared")
+    if result["duplicate_keys"]:
+        log(f"WARNING: {result['duplicate_keys']} duplicate {result['key']} row(s) ignored")
+    if result["columns_added"] or result["columns_removed"]:
+        log(f"Columns added: {result['columns_added']}  removed: {result['columns_removed']}")
+
+    for kind in ("added", "removed", "changed"):
+        sample = result["samples"][kind]
+        if sample.empty:
+            continue
+        log(f"--- {kind} (sample) ---")
+        for row in sample.itertuples(index=False):
+            values = row._asdict()
+            key = format_key(values[c] for c in result["key"])
+            sales = {k: v for k, v in values.items() if k.startswith(VALUE_COLUMN)}
+            columns = result["changed_columns"].get(key)
+            log(f"  ({key}) {sales}" + (f" columns: {columns}" if columns else ""))
+
+    deltas = result["store_deltas"]
+    moved = deltas[(deltas["delta"] != 0) | (deltas[["added_rows", "removed_rows", "changed_rows"]].sum(axis=1) > 0)]
+    if not moved.empty:
+        log(f"--- weekly_sales delta by store (top {top}) ---")
+        log(moved.head(top).to_string(index=False))
+
+def to_json(result):
+    out = {k: v for k, v in result.items() if k not in ("store_deltas", "samples")}
+    out["store_deltas"] = json.loads(result["store_deltas"].to_json(orient="records"))
+    out["samples"] = {kind: json.loads(frame.to_json(orient="records")) for kind, frame in result["samples"].items()}
+    return out
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Diff two versions of a clean dataset by business key")
+    parser.add_argument("old", help='CSV path, "current" or an archive run id')
+    parser.add_argument("new", nargs="?", default="current", help='CSV path, "current" (default) or an archive run id')
+    parser.add_argument("--dataset", default="full_dataset_clean", help="clean dataset name (for run ids / current)")
+    parser.add_argument("--buckets", type=int, default=DEFAULT_BUCKETS)
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE)
+    parser.add_argument("--chunksize", type=int, default=DIFF_CHUNKSIZE)
+    parser.add_argument("--json", help="also write the full result as JSON to this path")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    old_path = resolve_version(args.old, args.dataset)
+    new_path = resolve_version(args.new, args.dataset)
+    result = diff_datasets(old_path, new_path, DIFF_KEY, args.buckets, args.sample, args.chunksize)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(to_json(result), f, indent=2)
+        log(f"Saved diff: {args.json}")
+
+if __name__ == "__main__":
+    main()
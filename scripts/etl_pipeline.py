@@ -1,8 +1,19 @@
 # scripts/etl_pipeline.py
 
 import os
+import json
+import argparse
 import subprocess
+import pandas as pd
 from datetime import datetime
+from sqlalchemy import create_engine, text
+
+from progress import emit, finish_stage, start_stage
+from run_coordinator import acquire_pipeline_lock, pipeline_lock_holder, release_pipeline_lock
+from sql_runner import SQL_DIR, read_sql_script, run_statements
+from load import ensure_fact_table, ensure_fact_partitions
+from column_encoding import encode_columns
+from transform import save_outputs
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LOG_DIR = os.path.join(BASE_DIR, "logs")
@@ -15,36 +26,205 @@ def log(msg):
         f.write(f"[{ts}] {msg}\n")
     print(msg)
 
+def load_db_config():
+    cfg_path = os.path.join(BASE_DIR, "config", "db_config.json")
+    with open(cfg_path, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_etl_config():
+    """Optional pipeline settings; missing or unreadable config means defaults."""
+    cfg_path = os.path.join(BASE_DIR, "config", "etl_config.json")
+    try:
+        with open(cfg_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get_engine(cfg):
+    uri = f"mysql+mysqlconnector://{cfg['user']}:{cfg['password']}@{cfg['host']}:{cfg['port']}/{cfg['database']}"
+    return create_engine(uri, pool_recycle=3600)
+
 def run_script(script_name):
     """Runs extract.py, transform.py, load.py sequentially"""
     log(f"---- Running {script_name} ----")
     script_path = os.path.join(BASE_DIR, "scripts", script_name)
+    stage = os.path.splitext(script_name)[0]
+    start_stage(stage)
 
     if not os.path.exists(script_path):
         log(f"ERROR: Script not found → {script_path}")
+        finish_stage(stage, ok=False)
         return False
 
     result = subprocess.run(["python", script_path], capture_output=True, text=True)
 
     if result.returncode != 0:
         log(f"ERROR in {script_name}: {result.stderr}")
+        finish_stage(stage, ok=False)
         return False
 
     log(f"{script_name} completed successfully.")
+    finish_stage(stage)
     return True
 
-def main():
-    log("===== ETL PIPELINE STARTED =====")
+# ========== ELT MODE (SERVER-SIDE SQL) ==========
+def run_sql_script(engine, script_name, params=None):
+    """Execute a SQL script server-side, timing each statement."""
+    log(f"---- Running {script_name} (server-side) ----")
+    start_stage(script_name)
+
+    if not os.path.exists(os.path.join(SQL_DIR, script_name)):
+        log(f"ERROR: SQL script not found → {os.path.join(SQL_DIR, script_name)}")
+        finish_stage(script_name, ok=False)
+        return False
+
+    try:
+        # user variables are per-session, so the whole script shares one
+        # connection. This is not atomic: MySQL commits implicitly at every
+        # DDL / TRUNCATE statement, so a failing script can leave earlier
+        # statements applied. The ELT scripts rebuild their tables from
+        # staging, so re-running the pipeline repairs that.
+        with engine.begin() as conn:
+            run_statements(conn, read_sql_script(script_name), params, log=log)
+    except Exception as e:
+        log(f"ERROR in {script_name}: {e}")
+        finish_stage(script_name, ok=False)
+        return False
+
+    log(f"{script_name} completed successfully.")
+    finish_stage(script_name)
+    return True
+
+def prepare_fact_table(engine, granularity):
+    """Create the managed fact_sales table and the partitions for the staged dates."""
+    log("---- Preparing fact_sales partitions ----")
+    try:
+        with engine.begin() as conn:
+            ensure_fact_table(conn)
+            min_date, max_date = conn.execute(text(
+                "SELECT MIN(sale_date), MAX(sale_date) FROM sales_clean WHERE weekly_sales IS NOT NULL;"
+            )).one()
+            if min_date is not None:
+                ensure_fact_partitions(conn, min_date, max_date, granularity)
+    except Exception as e:
+        log(f"ERROR preparing fact_sales: {e}")
+        return False
+    return True
+
+# Clean tables ELT builds (transformations.sql recreates them, so `id` is
+# staging order), read back in the column order of the ETL CSVs
+ELT_EXPORTS = {
+    "sales": "SELECT store, dept, sale_date, weekly_sales, is_holiday FROM sales_clean ORDER BY id;",
+    "features": """SELECT store, feature_date, temperature, fuel_price,
+                          markdown1, markdown2, markdown3, markdown4, markdown5,
+                          cpi, unemployment, is_holiday
+                   FROM features_clean ORDER BY id;""",
+    "stores": "SELECT store, store_type, size FROM dim_store ORDER BY store;",
+}
+
+def read_clean_table(engine, query):
+    """One clean table as transform.py would hold it: dates as datetime64, DECIMAL as float."""
+    df = pd.read_sql(text(query), engine)
+    for column in ("sale_date", "feature_date"):
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    if "weekly_sales" in df.columns:
+        df["weekly_sales"] = df["weekly_sales"].astype("float64")
+    return encode_columns(df)
 
+def export_clean_outputs(engine):
+    """Write data/clean/*.csv and the dashboard artifacts from the tables ELT built."""
+    log("---- Exporting clean tables and dashboard artifacts ----")
+    start_stage("export")
+    try:
+        frames = {name: read_clean_table(engine, query) for name, query in ELT_EXPORTS.items()}
+        save_outputs(frames["sales"], frames["features"], frames["stores"], stage="export")
+    except Exception as e:
+        log(f"ERROR exporting clean outputs: {e}")
+        finish_stage("export", ok=False)
+        return False
+
+    log("Clean outputs exported.")
+    finish_stage("export")
+    return True
+
+def run_elt(sql_params, granularity="year"):
+    """Extract to staging, transform + build fact_sales inside MySQL, then export the clean outputs."""
+    if not run_script("extract.py"):
+        return False
+
+    engine = get_engine(load_db_config())
+    try:
+        return (
+            run_sql_script(engine, "transformations.sql", sql_params)
+            and prepare_fact_table(engine, granularity)
+            and run_sql_script(engine, "elt_fact_sales.sql", sql_params)
+            and export_clean_outputs(engine)
+        )
+    finally:
+        engine.dispose()
+
+# Stages each mode reports progress for (see progress.py)
+MODE_STAGES = {
+    "etl": ["extract", "transform", "load"],
+    "elt": ["extract", "transformations.sql", "elt_fact_sales.sql", "export"],
+}
+
+def run_etl():
     steps = ["extract.py", "transform.py", "load.py"]
 
     for step in steps:
         success = run_script(step)
         if not success:
-            log("PIPELINE FAILED. STOPPING.")
-            return
+            return False
+    return True
+
+def parse_args():
+    etl_cfg = load_etl_config()
+    pipeline_cfg = etl_cfg.get("pipeline", {})
+    parser = argparse.ArgumentParser(description="Run the retail sales pipeline.")
+    parser.add_argument("--mode", choices=["etl", "elt"], default=pipeline_cfg.get("mode", "etl"),
+                        help="etl: transform in pandas (default); elt: transform in MySQL from staging, "
+                             "then export the clean tables to data/clean with the dashboard artifacts")
+    parser.add_argument("--date-format", default=pipeline_cfg.get("date_format", "%Y-%m-%d"),
+                        help="STR_TO_DATE format of the raw staging date columns (ELT mode)")
+    parser.add_argument("--fact-partition", choices=["quarter", "year"],
+                        default=etl_cfg.get("load", {}).get("fact_partition", "year"),
+                        help="granularity of new fact_sales partitions (ELT mode)")
+    parser.add_argument("--lock-timeout", type=float, default=pipeline_cfg.get("lock_timeout", 0),
+                        help="seconds to wait for another running pipeline to finish (default: fail at once)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # one run at a time: overlapping runs would truncate / drop each other's tables
+    if not acquire_pipeline_lock(args.lock_timeout):
+        holder = pipeline_lock_holder() or {}
+        log(f"Another pipeline run is in progress (pid {holder.get('pid')}, "
+            f"{holder.get('owner')}, since {holder.get('acquired_at')}). Not starting.")
+        emit("pipeline", "failed", reason="locked")
+        raise SystemExit(2)
+
+    try:
+        log(f"===== ETL PIPELINE STARTED ({args.mode.upper()} mode) =====")
+        emit("pipeline", "started", mode=args.mode, stages=MODE_STAGES[args.mode])
+
+        if args.mode == "elt":
+            success = run_elt({"date_format": args.date_format}, args.fact_partition)
+        else:
+            success = run_etl()
+    finally:
+        release_pipeline_lock()
+
+    if not success:
+        log("PIPELINE FAILED. STOPPING.")
+        emit("pipeline", "failed")
+        # non-zero exit so callers (the dashboard's job manager) see the failure
+        raise SystemExit(1)
 
     log("===== ETL PIPELINE COMPLETED SUCCESSFULLY =====")
+    emit("pipeline", "completed")
 
 if __name__ == "__main__":
     main()
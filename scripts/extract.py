@@ -1,17 +1,24 @@
 # scripts/extract.py
 
-import pandas as pd
+import csv
 import json
+import argparse
 from sqlalchemy import create_engine, text
 import os
 from datetime import datetime
 
+from chunk_reader import csv_options, read_csv_chunks
+from progress import advance
+from sql_runner import read_sql_script, run_statements
+
 # ========== PATHS ==========
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DIR = os.path.join(BASE_DIR, "data", "raw")
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOG_DIR, "etl_log.txt")
+# Malformed raw lines, one <file>.rejects.csv per source (line, error, raw)
+REJECT_DIR = os.path.join(LOG_DIR, "rejects")
 
 # ========== LOGGER ==========
 def log(msg):
@@ -34,18 +41,52 @@ def get_engine(cfg):
     uri = f"mysql+mysqlconnector://{cfg['user']}:{cfg['password']}@{cfg['host']}:{cfg['port']}/{cfg['database']}"
     return create_engine(uri, pool_recycle=3600)
 
-# ========== SAFE CSV READER ==========
-def read_csv_chunked(path, chunksize=100000):
-    """Generator that yields chunks (DataFrame) from CSV."""
+# ========== LOAD ETL CONFIG ==========
+def load_etl_config():
+    """Optional pipeline settings; missing or unreadable config means defaults."""
+    cfg_path = os.path.join(BASE_DIR, "config", "etl_config.json")
     try:
-        for chunk in pd.read_csv(path, chunksize=chunksize):
-            yield chunk
-    except ValueError:
-        # file too small for chunksize -> read at once
-        yield pd.read_csv(path)
-    except Exception as e:
-        log(f"ERROR reading CSV {path}: {e}")
-        yield from ()
+        with open(cfg_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# ========== SOURCES ==========
+# (raw file, staging table, column renames), extracted in this order
+SOURCES = [
+    ("train.csv", "sales_staging", {
+        "Store": "store",
+        "Dept": "dept",
+        "Date": "sale_date_raw",
+        "Weekly_Sales": "weekly_sales",
+        "IsHoliday": "is_holiday"
+    }),
+    ("test.csv", "sales_staging", {
+        "Store": "store",
+        "Dept": "dept",
+        "Date": "sale_date_raw",
+        "IsHoliday": "is_holiday"
+    }),
+    ("features.csv", "features_staging", {
+        "Store": "store",
+        "Date": "feature_date_raw",
+        "Temperature": "temperature",
+        "Fuel_Price": "fuel_price",
+        "MarkDown1": "markdown1",
+        "MarkDown2": "markdown2",
+        "MarkDown3": "markdown3",
+        "MarkDown4": "markdown4",
+        "MarkDown5": "markdown5",
+        "CPI": "cpi",
+        "Unemployment": "unemployment",
+        "IsHoliday": "is_holiday"
+    }),
+    ("stores.csv", "stores_staging", {
+        "Store": "store",
+        "Type": "store_type",
+        "Size": "size"
+    }),
+]
 
 # ========== TRUNCATE STAGING (idempotent run) ==========
 def truncate_staging(engine):
@@ -62,95 +103,160 @@ def normalize_columns(df):
     df.columns = [str(c).strip() for c in df.columns]
     return df
 
+def prepare_chunk(chunk, renames):
+    chunk = normalize_columns(chunk).rename(columns=renames)
+    if "sale_date_raw" in chunk.columns and "weekly_sales" not in chunk.columns:
+        # test has no weekly_sales -> set None
+        chunk["weekly_sales"] = None
+    return chunk
+
+# ========== CHECKPOINTS ==========
+def file_version(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+def ensure_checkpoint_table(engine):
+    with engine.begin() as conn:
+        run_statements(conn, read_sql_script("extract_checkpoints.sql"), log=log)
+
+def load_checkpoints(engine):
+    """{(source_file, target_table): checkpoint row} of the last (possibly unfinished) extract."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT * FROM extract_checkpoints;")).mappings().all()
+    return {(row["source_file"], row["target_table"]): dict(row) for row in rows}
+
+def can_resume(checkpoints, sources):
+    """True if the last extract stopped part-way over exactly these, unchanged, files."""
+    if not checkpoints or all(cp["completed"] for cp in checkpoints.values()):
+        return False
+    if set(checkpoints) != {(name, table) for name, table, _, _ in sources}:
+        return False
+    for name, table, path, _ in sources:
+        size, mtime = file_version(path)
+        cp = checkpoints[(name, table)]
+        if cp["file_size"] != size or abs(cp["file_mtime"] - mtime) > 1e-3:
+            log(f"{name} changed since the last extract; starting over.")
+            return False
+    return True
+
+def reject_path(name):
+    return os.path.join(REJECT_DIR, f"{os.path.splitext(name)[0]}.rejects.csv")
+
+def trim_rejects(name, lines):
+    """Keep only the rejects of the first `lines` data lines (the committed ones).
+
+    Rejects are written when a chunk is parsed, before it commits, so a run
+    that died part-way has quarantined lines the resumed read reports again.
+    """
+    path = reject_path(name)
+    if not os.path.exists(path):
+        return
+    kept = dropped = 0
+    with open(path, encoding="utf-8", newline="") as src, open(path + ".tmp", "w", encoding="utf-8", newline="") as dst:
+        reader, writer = csv.reader(src), csv.writer(dst)
+        writer.writerow(next(reader, ["line", "error", "raw"]))
+        for row in reader:
+            # "line" is the physical line (header = 1); unknown positions are kept
+            if row and row[0] and int(row[0]) - 1 > lines:
+                dropped += 1
+                continue
+            writer.writerow(row)
+            kept += 1
+    os.replace(path + ".tmp", path)
+    if dropped:
+        log(f"Dropped {dropped} reject(s) of {name} past the checkpoint (kept {kept})")
+
+def reset_checkpoints(engine, sources):
+    """Fresh extract: empty staging and start every source at row 0."""
+    truncate_staging(engine)
+    for name, _, _, _ in sources:
+        if os.path.exists(reject_path(name)):
+            os.remove(reject_path(name))
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM extract_checkpoints;"))
+        for name, table, path, _ in sources:
+            size, mtime = file_version(path)
+            conn.execute(text("""
+                INSERT INTO extract_checkpoints (source_file, target_table, file_size, file_mtime)
+                VALUES (:source, :target, :size, :mtime)
+            """), {"source": name, "target": table, "size": size, "mtime": mtime})
+
+def commit_chunk(engine, chunk, source, table, lines):
+    """Insert one chunk and advance its checkpoint by the `lines` it consumed, in a single transaction."""
+    with engine.begin() as conn:
+        chunk.to_sql(table, conn, if_exists="append", index=False, method="multi")
+        conn.execute(text("""
+            UPDATE extract_checkpoints
+            SET rows_committed = rows_committed + :lines, chunks_committed = chunks_committed + 1
+            WHERE source_file = :source AND target_table = :target
+        """), {"lines": lines, "source": source, "target": table})
+
+def mark_completed(engine, source, table):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE extract_checkpoints SET completed = TRUE
+            WHERE source_file = :source AND target_table = :target
+        """), {"source": source, "target": table})
+
+def extract_source(engine, name, table, path, renames, checkpoint, done_before=0):
+    """Load one raw file into staging from its checkpoint on; returns its committed line count."""
+    total = checkpoint["rows_committed"]
+    if checkpoint["completed"]:
+        log(f"Skipping {name} -> {table} (already extracted, {total} lines)")
+        return total
+    if total:
+        log(f"Resuming {name} -> {table} after line {total}")
+    trim_rejects(name, total)
+
+    stats = {}
+    options = csv_options(load_etl_config())
+    for chunk in read_csv_chunks(path, skip_lines=total, reject_path=reject_path(name), stats=stats, log=log, **options):
+        commit_chunk(engine, prepare_chunk(chunk, renames), name, table, stats["lines"] - total)
+        total = stats["lines"]
+        advance("extract", done_before + total, table=table)
+
+    mark_completed(engine, name, table)
+    rejected = f", {stats['rejected']} rejected -> {reject_path(name)}" if stats.get("rejected") else ""
+    log(f"Loaded {name} -> {table} ({stats.get('rows', 0)} rows{rejected})")
+    return total
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract raw CSVs into the MySQL staging tables.")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore checkpoints of an unfinished extract and reload from row zero")
+    return parser.parse_args()
+
 # ========== MAIN EXTRACT FUNCTION ==========
 def main():
+    args = parse_args()
     log("==== EXTRACT STEP STARTED ====")
     print("Using DB Config from:", os.path.join(BASE_DIR, "config", "db_config.json"))
     cfg = load_db_config()
     engine = get_engine(cfg)
 
-    # CSV paths
-    train_csv = os.path.join(RAW_DIR, "train.csv")
-    test_csv = os.path.join(RAW_DIR, "test.csv")
-    features_csv = os.path.join(RAW_DIR, "features.csv")
-    stores_csv = os.path.join(RAW_DIR, "stores.csv")
-
     # Ensure files exist
-    for p in [train_csv, features_csv, stores_csv, test_csv]:
-        if not os.path.exists(p):
-            log(f"WARNING: expected file missing: {p}")
+    sources = []
+    for name, table, renames in SOURCES:
+        path = os.path.join(RAW_DIR, name)
+        if not os.path.exists(path):
+            log(f"WARNING: expected file missing: {path}")
+            continue
+        sources.append((name, table, path, renames))
 
     try:
-        # 0) Truncate staging to avoid duplicates on repeated runs
-        truncate_staging(engine)
-
-        # 1) Load train.csv and test.csv into sales_staging (chunked)
-        total_train = 0
-        if os.path.exists(train_csv):
-            for chunk in read_csv_chunked(train_csv):
-                chunk = normalize_columns(chunk)
-                chunk = chunk.rename(columns={
-                    "Store": "store",
-                    "Dept": "dept",
-                    "Date": "sale_date_raw",
-                    "Weekly_Sales": "weekly_sales",
-                    "IsHoliday": "is_holiday"
-                })
-                chunk.to_sql("sales_staging", engine, if_exists="append", index=False, method="multi")
-                total_train += len(chunk)
-            log(f"Loaded train.csv -> sales_staging ({total_train} rows)")
-
-        total_test = 0
-        if os.path.exists(test_csv):
-            for chunk in read_csv_chunked(test_csv):
-                chunk = normalize_columns(chunk)
-                chunk = chunk.rename(columns={
-                    "Store": "store",
-                    "Dept": "dept",
-                    "Date": "sale_date_raw",
-                    "IsHoliday": "is_holiday"
-                })
-                # test has no weekly_sales -> set None
-                if "weekly_sales" not in chunk.columns:
-                    chunk["weekly_sales"] = None
-                chunk.to_sql("sales_staging", engine, if_exists="append", index=False, method="multi")
-                total_test += len(chunk)
-            log(f"Loaded test.csv -> sales_staging ({total_test} rows)")
-
-        # 2) Load features.csv
-        total_features = 0
-        if os.path.exists(features_csv):
-            for chunk in read_csv_chunked(features_csv):
-                chunk = normalize_columns(chunk)
-                chunk = chunk.rename(columns={
-                    "Store": "store",
-                    "Date": "feature_date_raw",
-                    "Temperature": "temperature",
-                    "Fuel_Price": "fuel_price",
-                    "MarkDown1": "markdown1",
-                    "MarkDown2": "markdown2",
-                    "MarkDown3": "markdown3",
-                    "MarkDown4": "markdown4",
-                    "MarkDown5": "markdown5",
-                    "CPI": "cpi",
-                    "Unemployment": "unemployment",
-                    "IsHoliday": "is_holiday"
-                })
-                chunk.to_sql("features_staging", engine, if_exists="append", index=False, method="multi")
-                total_features += len(chunk)
-            log(f"Loaded features.csv -> features_staging ({total_features} rows)")
-
-        # 3) Load stores.csv (small, read at once)
-        if os.path.exists(stores_csv):
-            stores_df = pd.read_csv(stores_csv)
-            stores_df = normalize_columns(stores_df)
-            stores_df = stores_df.rename(columns={
-                "Store": "store",
-                "Type": "store_type",
-                "Size": "size"
-            })
-            stores_df.to_sql("stores_staging", engine, if_exists="append", index=False, method="multi")
-            log(f"Loaded stores.csv -> stores_staging ({len(stores_df)} rows)")
+        # 0) Resume an interrupted extract, or truncate staging to avoid duplicates
+        ensure_checkpoint_table(engine)
+        checkpoints = load_checkpoints(engine)
+        if not args.restart and can_resume(checkpoints, sources):
+            log("Resuming unfinished extract from checkpoints.")
+        else:
+            reset_checkpoints(engine, sources)
+            checkpoints = load_checkpoints(engine)
+
+        # 1) Load each file chunk by chunk, committing a checkpoint with every chunk
+        done = 0
+        for name, table, path, renames in sources:
+            done += extract_source(engine, name, table, path, renames, checkpoints[(name, table)], done)
 
     except Exception as e:
         log(f"DB Load Error: {e}")
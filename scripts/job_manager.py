@@ -0,0 +1,157 @@
+# scripts/job_manager.py
+
+import os
+import sys
+import json
+import subprocess
+import threading
+import uuid
+from datetime import datetime
+
+from progress import PROGRESS_ENV, read_events, summarize
+from run_coordinator import (
+    JOB_ID_ENV, QUEUE_LOCK, coordinator_status, enqueue_run, file_lock, load_queue,
+    pid_alive, pipeline_lock_holder, save_queue,
+)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# One folder per job: job.json (registry entry), progress.jsonl, output.log
+JOBS_DIR = os.path.join(BASE_DIR, "logs", "jobs")
+PIPELINE_SCRIPT = os.path.join(BASE_DIR, "scripts", "etl_pipeline.py")
+
+_lock = threading.Lock()
+
+# ========== REGISTRY ==========
+def job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+def _write_job(job):
+    path = os.path.join(job_dir(job["id"]), "job.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(job, f, indent=2)
+    os.replace(tmp_path, path)
+
+def read_job(job_id):
+    try:
+        with open(os.path.join(job_dir(job_id), "job.json"), encoding="utf-8") as f:
+            job = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # the process is gone but its watcher never recorded the exit (e.g. the
+    # dashboard restarted mid-run): fall back to the pipeline's own events
+    if job["status"] == "running" and not pid_alive(job["pid"]):
+        outcome = job_progress(job_id).get("pipeline", {}).get("status")
+        job["status"] = outcome if outcome in ("completed", "failed") else "lost"
+    return job
+
+def list_jobs(limit=20):
+    """Most recent jobs first."""
+    if not os.path.isdir(JOBS_DIR):
+        return []
+    # the folder also holds the coordinator's lock / queue files
+    job_ids = sorted((name for name in os.listdir(JOBS_DIR) if os.path.isdir(job_dir(name))), reverse=True)
+    jobs = [read_job(job_id) for job_id in job_ids[:limit]]
+    return [job for job in jobs if job is not None]
+
+def latest_job():
+    jobs = list_jobs(limit=1)
+    return jobs[0] if jobs else None
+
+# ========== LAUNCH ==========
+def _watch(job, proc, output):
+    """Wait for the pipeline in a daemon thread and record how it ended."""
+    returncode = proc.wait()
+    output.close()
+    with _lock:
+        job.update(
+            status="completed" if returncode == 0 else "failed",
+            returncode=returncode,
+            finished_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        )
+        _write_job(job)
+    # start the next queued run, if any
+    dispatch_next()
+
+def launch_job(args=(), name="etl_pipeline"):
+    """Start etl_pipeline.py in the background and return its registry entry immediately.
+
+    stdout/stderr go to the job's output.log instead of memory, and the
+    pipeline writes progress events to progress.jsonl via ETL_PROGRESS_FILE.
+    """
+    job_id = datetime.now().strftime("%Y%m%d_%H%M%S_") + uuid.uuid4().hex[:6]
+    os.makedirs(job_dir(job_id))
+    command = [sys.executable, PIPELINE_SCRIPT, *args]
+    env = dict(os.environ, **{PROGRESS_ENV: os.path.join(job_dir(job_id), "progress.jsonl"), JOB_ID_ENV: job_id})
+
+    output = open(os.path.join(job_dir(job_id), "output.log"), "w", encoding="utf-8")
+    proc = subprocess.Popen(
+        command,
+        cwd=BASE_DIR,
+        stdout=output,
+        stderr=subprocess.STDOUT,
+        env=env,
+    )
+    job = {
+        "id": job_id,
+        "name": name,
+        "command": command,
+        "pid": proc.pid,
+        "status": "running",
+        "returncode": None,
+        "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "finished_at": None,
+    }
+    with _lock:
+        _write_job(job)
+    threading.Thread(target=_watch, args=(job, proc, output), daemon=True).start()
+    return job
+
+# ========== QUEUE ==========
+def _run_in_progress():
+    job = latest_job()
+    return pipeline_lock_holder() is not None or (job is not None and job["status"] == "running")
+
+def dispatch_next():
+    """Launch the oldest queued run if no pipeline is running. Returns the job or None."""
+    with file_lock(QUEUE_LOCK):
+        queue = load_queue()
+        if not queue or _run_in_progress():
+            return None
+        request = queue.pop(0)
+        save_queue(queue)
+        return launch_job(request["args"])
+
+def request_run(args=()):
+    """Queue a pipeline run and start it right away when nothing else is running.
+
+    Returns (status, detail): ("started", job), ("queued", position) or
+    ("coalesced", position) when an identical run was already waiting.
+    """
+    with file_lock(QUEUE_LOCK):
+        queue = load_queue()
+        request, coalesced = enqueue_run(queue, args)
+        save_queue(queue)
+        position = queue.index(request) + 1
+    job = dispatch_next()
+    if job is not None and position == 1:
+        return "started", job
+    if job is not None:
+        position -= 1  # an older request just left the queue
+    return ("coalesced" if coalesced else "queued"), position
+
+def run_status():
+    """Latest job, pipeline lock holder and pending queue, for the dashboard."""
+    return {"job": latest_job(), **coordinator_status()}
+
+# ========== STATUS ==========
+def job_progress(job_id):
+    """Latest event per pipeline stage of a job."""
+    return summarize(read_events(os.path.join(job_dir(job_id), "progress.jsonl")))
+
+def tail_output(job_id, lines=50):
+    try:
+        with open(os.path.join(job_dir(job_id), "output.log"), encoding="utf-8", errors="replace") as f:
+            return "".join(f.readlines()[-lines:])
+    except OSError:
+        return ""
@@ -1,17 +1,42 @@
 # scripts/load.py
 
 import pandas as pd
+import numpy as np
+import argparse
 import json
-from sqlalchemy import create_engine, text
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import Boolean, String, create_engine, inspect, text
 import os
 from datetime import datetime
 
+from chunk_reader import csv_options, read_csv
+from column_encoding import encode_columns
+from progress import advance
+from sql_runner import read_sql_script, run_statements
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CLEAN_DIR = os.path.join(BASE_DIR, "data", "clean")
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOG_DIR, "etl_log.txt")
 
+# Clean tables fully replaced on every run, and the CSV each one is loaded from
+CLEAN_TABLES = [
+    ("sales_clean", "sales_clean.csv"),
+    ("features_clean", "features_clean.csv"),
+    ("stores_clean", "stores_clean.csv"),
+]
+SHADOW_SUFFIX = "__shadow"
+OLD_SUFFIX = "__old"
+
+# Managed, partitioned fact table (see sql/fact_sales.sql)
+FACT_TABLE = "fact_sales"
+FACT_CSV = "full_dataset_clean.csv"
+PARTITION_PERIODS = {"year": "Y", "quarter": "Q"}
+# Columns of earlier fact_sales definitions; a table that still has them is recreated
+RETIRED_FACT_COLUMNS = {"is_holiday_x", "is_holiday_y"}
+
 def log(msg):
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     with open(LOG_FILE, "a", encoding="utf-8") as f:
@@ -23,14 +48,394 @@ def load_db_config():
     with open(cfg_path, encoding="utf-8") as f:
         return json.load(f)
 
-def get_engine(cfg):
+def load_etl_config():
+    """Optional pipeline settings; missing or unreadable config means defaults."""
+    cfg_path = os.path.join(BASE_DIR, "config", "etl_config.json")
+    try:
+        with open(cfg_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get_engine(cfg, pool_size=None):
     uri = f"mysql+mysqlconnector://{cfg['user']}:{cfg['password']}@{cfg['host']}:{cfg['port']}/{cfg['database']}"
+    if pool_size:
+        return create_engine(uri, pool_recycle=3600, pool_size=pool_size, max_overflow=0)
     return create_engine(uri, pool_recycle=3600)
 
-def main():
-    log("==== LOAD STEP STARTED ====")
+def parallel_pool_size(workers, fact_store_ranges=1):
+    """Connections load_parallel can hold at once.
 
-    cfg = load_db_config()
+    Every worker may be loading a fact partition split into
+    `fact_store_ranges` concurrent appends, each on its own connection; a
+    smaller pool (it has no overflow) makes those appends wait on each other.
+    """
+    return workers * max(fact_store_ranges, 1)
+
+def read_clean_csv(name):
+    """One clean CSV, parsed with the engine set in etl_config.json ("parsing"), flags and categories encoded."""
+    return encode_columns(read_csv(os.path.join(CLEAN_DIR, name), log=log, **csv_options(load_etl_config())))
+
+# Width of store_type in the SQL scripts (dim_store, fact_sales)
+CATEGORY_LENGTH = 10
+
+def sql_dtypes(df):
+    """Column types for tables to_sql creates: categoricals as VARCHAR, flags as BOOLEAN."""
+    dtypes = {}
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            longest = int(dtype.categories.astype(str).str.len().max()) if len(dtype.categories) else 0
+            dtypes[column] = String(max(CATEGORY_LENGTH, longest))
+        elif pd.api.types.is_bool_dtype(dtype):
+            dtypes[column] = Boolean()
+    return dtypes
+
+# ========== MANAGED FACT TABLE (PARTITIONED BY sale_date) ==========
+def partition_name(start, granularity):
+    if granularity == "quarter":
+        return f"p{start.year}q{start.quarter}"
+    return f"p{start.year}"
+
+def next_boundary(ts, granularity):
+    """First day of the period after the one containing `ts`."""
+    return (ts.to_period(PARTITION_PERIODS[granularity]) + 1).start_time
+
+def get_fact_partitions(conn):
+    """Ordered [(partition_name, upper_bound)] of fact_sales; pmax has bound None."""
+    rows = conn.execute(text("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = :table
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """), {"table": FACT_TABLE}).fetchall()
+    partitions = []
+    for name, description in rows:
+        bound = None if description.upper() == "MAXVALUE" else pd.Timestamp(description.strip("'"))
+        partitions.append((name, bound))
+    return partitions
+
+def ensure_fact_table(conn):
+    """Create fact_sales from sql/fact_sales.sql, replacing a legacy (unpartitioned or old-column) table."""
+    existed = FACT_TABLE in inspect(conn).get_table_names()
+    if existed:
+        columns = {c["name"] for c in inspect(conn).get_columns(FACT_TABLE)}
+        if not get_fact_partitions(conn) or columns & RETIRED_FACT_COLUMNS:
+            log("Replacing legacy fact_sales with the managed definition...")
+            conn.execute(text(f"DROP TABLE `{FACT_TABLE}`;"))
+            existed = False
+
+    run_statements(conn, read_sql_script("fact_sales.sql"), log=log)
+    # store_type was ENUM('A','B','C') / VARCHAR(1) in earlier definitions; widen it in place
+    store_type = next((c for c in inspect(conn).get_columns(FACT_TABLE) if c["name"] == "store_type"), None)
+    if store_type is not None and (getattr(store_type["type"], "length", None) or 0) < CATEGORY_LENGTH:
+        conn.execute(text(f"ALTER TABLE `{FACT_TABLE}` MODIFY store_type VARCHAR({CATEGORY_LENGTH});"))
+
+    # a new (or just replaced) fact table is empty: checksums recorded for the
+    # old one would make plan_fact_load skip every partition
+    if not existed:
+        conn.execute(text("DELETE FROM fact_sales_partitions;"))
+
+def ensure_fact_partitions(conn, min_date, max_date, granularity="year"):
+    """Split pmax so every period up to `max_date` has its own partition."""
+    bounds = [bound for _, bound in get_fact_partitions(conn) if bound is not None]
+    start = bounds[-1] if bounds else pd.Timestamp(min_date).to_period(PARTITION_PERIODS[granularity]).start_time
+
+    new_partitions = []
+    while start <= pd.Timestamp(max_date):
+        upper = next_boundary(start, granularity)
+        new_partitions.append(f"PARTITION {partition_name(start, granularity)} "
+                              f"VALUES LESS THAN ('{upper:%Y-%m-%d}')")
+        start = upper
+
+    if new_partitions:
+        log(f"Adding {len(new_partitions)} fact_sales partition(s)...")
+        conn.execute(text(
+            f"ALTER TABLE `{FACT_TABLE}` REORGANIZE PARTITION pmax INTO ("
+            + ", ".join(new_partitions)
+            + ", PARTITION pmax VALUES LESS THAN (MAXVALUE));"
+        ))
+
+def assign_partitions(dates, partitions):
+    """Name of the partition each date falls into (RANGE ... VALUES LESS THAN)."""
+    names = np.array([name for name, _ in partitions])
+    bounds = np.array([bound for _, bound in partitions if bound is not None], dtype="datetime64[ns]")
+    return names[np.searchsorted(bounds, dates.to_numpy(dtype="datetime64[ns]"), side="right")]
+
+def frame_checksum(df):
+    """Order-independent fingerprint of a frame's rows."""
+    return str(int(pd.util.hash_pandas_object(df, index=False).sum()))
+
+def plan_fact_load(engine, full_df, granularity="year"):
+    """Prepare fact_sales and work out which partitions this run must rewrite.
+
+    Returns (changed, stale): `changed` is a list of (partition, rows, checksum)
+    whose content differs from the last load; `stale` are partitions that held
+    rows before but receive none from this run.
+    """
+    dates = pd.to_datetime(full_df["sale_date"], format="%Y-%m-%d")
+
+    with engine.begin() as conn:
+        ensure_fact_table(conn)
+        ensure_fact_partitions(conn, dates.min(), dates.max(), granularity)
+        partitions = get_fact_partitions(conn)
+        columns = [c["name"] for c in inspect(conn).get_columns(FACT_TABLE)]
+        loaded = dict(conn.execute(text(
+            "SELECT partition_name, checksum FROM fact_sales_partitions;"
+        )).fetchall())
+
+    fact_df = full_df[[c for c in columns if c in full_df.columns]]
+    names = assign_partitions(dates, partitions)
+
+    changed = []
+    for name, part in fact_df.groupby(names, sort=True):
+        checksum = frame_checksum(part)
+        if loaded.get(name) != checksum:
+            changed.append((name, part, checksum))
+
+    stale = sorted(set(loaded) - set(names))
+    log(f"fact_sales: {len(changed)} partition(s) changed, "
+        f"{len(set(names)) - len(changed)} unchanged, {len(stale)} stale")
+    return changed, stale
+
+def record_partition(conn, name, rows, checksum):
+    conn.execute(text("""
+        INSERT INTO fact_sales_partitions (partition_name, row_count, checksum)
+        VALUES (:name, :rows, :checksum)
+        ON DUPLICATE KEY UPDATE row_count = VALUES(row_count), checksum = VALUES(checksum)
+    """), {"name": name, "rows": rows, "checksum": checksum})
+
+def clear_stale_partitions(conn, stale):
+    for name in stale:
+        conn.execute(text(f"DELETE FROM `{FACT_TABLE}` PARTITION ({name});"))
+        conn.execute(text("DELETE FROM fact_sales_partitions WHERE partition_name = :name;"), {"name": name})
+
+def load_fact_partitions(engine, full_df, granularity="year"):
+    """Rewrite only the fact_sales partitions whose rows changed, in one transaction."""
+    changed, stale = plan_fact_load(engine, full_df, granularity)
+
+    with engine.begin() as conn:
+        for name, part, checksum in changed:
+            start = time.perf_counter()
+            conn.execute(text(f"DELETE FROM `{FACT_TABLE}` PARTITION ({name});"))
+            part.to_sql(FACT_TABLE, conn, if_exists="append", index=False, chunksize=10000)
+            record_partition(conn, name, len(part), checksum)
+            log(f"Rewrote fact_sales partition {name} ({len(part)} rows) in {time.perf_counter() - start:.2f}s")
+        clear_stale_partitions(conn, stale)
+
+# ========== PARALLEL LOAD (SHADOW TABLES) ==========
+def split_by_store_ranges(df, parts):
+    """Split a frame into `parts` contiguous store ranges of similar row counts."""
+    stores = df["store"].value_counts().sort_index()
+    if parts <= 1 or len(stores) <= 1:
+        return [df]
+
+    target = stores.sum() / parts
+    bounds, running = [], 0
+    for store, count in stores.items():
+        running += count
+        if running >= target * (len(bounds) + 1) and len(bounds) < parts - 1:
+            bounds.append(store)
+
+    ranges, low = [], None
+    for high in bounds + [None]:
+        mask = pd.Series(True, index=df.index)
+        if low is not None:
+            mask &= df["store"] > low
+        if high is not None:
+            mask &= df["store"] <= high
+        part = df[mask]
+        if not part.empty:
+            ranges.append(part)
+        low = high
+    return ranges
+
+def load_shadow_table(engine, shadow, df, store_ranges=1, create_statements=None):
+    """Load `df` into the table `shadow` and return throughput metrics.
+
+    Without `create_statements` the shadow's schema is inferred from `df`.
+    """
+    start = time.perf_counter()
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS `{shadow}`;"))
+        if create_statements:
+            for stmt in create_statements:
+                conn.execute(text(stmt))
+
+    parts = split_by_store_ranges(df, store_ranges) if "store" in df.columns else [df]
+    if len(parts) == 1 and not create_statements:
+        # one connection per table, one transaction per table
+        with engine.begin() as conn:
+            df.to_sql(shadow, conn, if_exists="replace", index=False, dtype=sql_dtypes(df))
+    else:
+        if not create_statements:
+            # create the empty shadow table first so the ranges only append
+            with engine.begin() as conn:
+                df.head(0).to_sql(shadow, conn, if_exists="replace", index=False, dtype=sql_dtypes(df))
+
+        def append_part(part):
+            with engine.begin() as conn:
+                part.to_sql(shadow, conn, if_exists="append", index=False, chunksize=10000)
+
+        with ThreadPoolExecutor(max_workers=len(parts)) as pool:
+            for future in as_completed([pool.submit(append_part, p) for p in parts]):
+                future.result()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "table": shadow,
+        "rows": len(df),
+        "parts": len(parts),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(len(df) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def swap_shadow_tables(engine, tables):
+    """Atomically replace every live table with its shadow copy (old tables are left as <table>__old)."""
+    with engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        for table in tables:
+            conn.execute(text(f"DROP TABLE IF EXISTS `{table}{OLD_SUFFIX}`;"))
+
+        # MySQL applies a multi-table RENAME as a single atomic operation
+        renames = [f"`{t}` TO `{t}{OLD_SUFFIX}`" for t in tables if t in existing]
+        renames += [f"`{t}{SHADOW_SUFFIX}` TO `{t}`" for t in tables]
+        conn.execute(text("RENAME TABLE " + ", ".join(renames) + ";"))
+
+def fact_shadow(name):
+    return f"{FACT_TABLE}{SHADOW_SUFFIX}_{name}"
+
+def verify_shadow_tables(engine, expected):
+    """Check every shadow exists and holds the expected rows before anything is swapped.
+
+    `expected` maps shadow table -> row count.
+    """
+    with engine.connect() as conn:
+        existing = set(inspect(conn).get_table_names())
+        for shadow, rows in expected.items():
+            if shadow not in existing:
+                raise RuntimeError(f"Shadow table {shadow} is missing")
+            count = conn.execute(text(f"SELECT COUNT(*) FROM `{shadow}`;")).scalar()
+            if count != rows:
+                raise RuntimeError(f"Shadow table {shadow} has {count} rows, expected {rows}")
+
+def exchange_fact_partitions(engine, names, swapped):
+    """Swap each loaded partition shadow into fact_sales.
+
+    EXCHANGE PARTITION is DDL and commits on its own, so every partition
+    swapped so far is appended to `swapped`; afterwards its shadow holds the
+    old rows, which is what revert_fact_partitions swaps back.
+    """
+    with engine.begin() as conn:
+        for name in names:
+            conn.execute(text(f"ALTER TABLE `{FACT_TABLE}` EXCHANGE PARTITION {name} WITH TABLE `{fact_shadow(name)}`;"))
+            swapped.append(name)
+
+def revert_fact_partitions(engine, swapped):
+    """Swap the old rows of `swapped` partitions back in; returns the partitions that could not be reverted."""
+    failed = []
+    for name in reversed(swapped):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE `{FACT_TABLE}` EXCHANGE PARTITION {name} WITH TABLE `{fact_shadow(name)}`;"))
+        except Exception as e:
+            log(f"Could not revert fact_sales partition {name}: {e}")
+            failed.append(name)
+    return failed
+
+def finish_fact_load(engine, changed, stale):
+    """Record the new checksums, clear stale partitions and drop the partition shadows (now holding old rows)."""
+    with engine.begin() as conn:
+        for name, part, checksum in changed:
+            record_partition(conn, name, len(part), checksum)
+        clear_stale_partitions(conn, stale)
+    drop_shadow_tables(engine, [fact_shadow(name) for name, _, _ in changed])
+
+def drop_shadow_tables(engine, shadows):
+    with engine.begin() as conn:
+        for shadow in shadows:
+            conn.execute(text(f"DROP TABLE IF EXISTS `{shadow}`;"))
+
+def load_parallel(cfg, workers=4, fact_store_ranges=1, granularity="year"):
+    """Load all clean tables concurrently; live tables change only if every load succeeds.
+
+    The clean tables are loaded into whole-table shadows; each changed
+    fact_sales partition is loaded into its own unpartitioned shadow. Once
+    every shadow is verified, the partitions are swapped in with EXCHANGE
+    PARTITION and the clean tables with one RENAME, last. If a swap fails,
+    the partitions already exchanged are swapped back.
+    """
+    tables = [table for table, _ in CLEAN_TABLES]
+    engine = get_engine(cfg, pool_size=parallel_pool_size(workers, fact_store_ranges))
+    shadows = [f"{t}{SHADOW_SUFFIX}" for t in tables]
+    metrics = []
+    swapped = []
+    swapped_in = False
+
+    try:
+        frames = {table: read_clean_csv(csv_name) for table, csv_name in CLEAN_TABLES}
+        full_df = read_clean_csv(FACT_CSV)
+        changed, stale = plan_fact_load(engine, full_df, granularity)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(load_shadow_table, engine, f"{t}{SHADOW_SUFFIX}", frames[t]) for t in tables]
+            for name, part, _ in changed:
+                shadow = fact_shadow(name)
+                shadows.append(shadow)
+                create = [f"CREATE TABLE `{shadow}` LIKE `{FACT_TABLE}`",
+                          f"ALTER TABLE `{shadow}` REMOVE PARTITIONING"]
+                futures.append(pool.submit(load_shadow_table, engine, shadow, part, fact_store_ranges, create))
+
+            for future in as_completed(futures):
+                m = future.result()
+                metrics.append(m)
+                advance("load", sum(x["rows"] for x in metrics), table=m["table"])
+                log(f"Loaded {m['table']} ({m['rows']} rows, {m['parts']} part(s)) "
+                    f"in {m['seconds']}s ({m['rows_per_sec']} rows/s)")
+
+        expected = {f"{t}{SHADOW_SUFFIX}": len(frames[t]) for t in tables}
+        expected.update({fact_shadow(name): len(part) for name, part, _ in changed})
+        verify_shadow_tables(engine, expected)
+
+        exchange_fact_partitions(engine, [name for name, _, _ in changed], swapped)
+        swap_shadow_tables(engine, tables)
+        swapped_in = True
+        log("Swapped shadow tables and fact_sales partitions into place.")
+        drop_shadow_tables(engine, [f"{t}{OLD_SUFFIX}" for t in tables])
+
+        # data is in place: only now record the new checksums
+        finish_fact_load(engine, changed, stale)
+
+    except Exception:
+        if swapped_in:
+            log("Parallel load swapped all tables in, but cleaning up or recording fact_sales checksums failed; "
+                "the next load rewrites the affected partitions.")
+            drop_shadow_tables(engine, shadows)
+            raise
+        if swapped:
+            failed = revert_fact_partitions(engine, swapped)
+            if failed:
+                log(f"Parallel load failed after exchanging fact_sales partition(s) {', '.join(swapped)}; "
+                    f"could not swap back {', '.join(failed)}: fact_sales is partly new. "
+                    f"Their old rows are kept in {', '.join(fact_shadow(n) for n in failed)}.")
+                # keep the shadows holding old rows for manual recovery; bookkeeping is untouched,
+                # so the next load rewrites these partitions
+                shadows = [s for s in shadows if s not in {fact_shadow(n) for n in failed}]
+                drop_shadow_tables(engine, shadows)
+                raise
+            log(f"Parallel load failed; fact_sales partition(s) {', '.join(swapped)} were exchanged and swapped back.")
+        log("Parallel load failed; discarding shadow tables, live tables unchanged.")
+        drop_shadow_tables(engine, shadows)
+        raise
+
+    finally:
+        engine.dispose()
+
+    return metrics
+
+def load_sequential(cfg, granularity="year"):
     engine = get_engine(cfg)
 
     try:
@@ -39,24 +444,56 @@ def main():
             conn.execute(text("DROP TABLE IF EXISTS sales_clean;"))
             conn.execute(text("DROP TABLE IF EXISTS features_clean;"))
             conn.execute(text("DROP TABLE IF EXISTS stores_clean;"))
-            conn.execute(text("DROP TABLE IF EXISTS fact_sales;"))
 
         # Load CSVs
-        sales_df = pd.read_csv(os.path.join(CLEAN_DIR, "sales_clean.csv"))
-        features_df = pd.read_csv(os.path.join(CLEAN_DIR, "features_clean.csv"))
-        stores_df = pd.read_csv(os.path.join(CLEAN_DIR, "stores_clean.csv"))
-        full_df = pd.read_csv(os.path.join(CLEAN_DIR, "full_dataset_clean.csv"))
+        sales_df = read_clean_csv("sales_clean.csv")
+        features_df = read_clean_csv("features_clean.csv")
+        stores_df = read_clean_csv("stores_clean.csv")
+        full_df = read_clean_csv(FACT_CSV)
 
-        sales_df.to_sql("sales_clean", engine, if_exists="replace", index=False)
-        features_df.to_sql("features_clean", engine, if_exists="replace", index=False)
-        stores_df.to_sql("stores_clean", engine, if_exists="replace", index=False)
-        full_df.to_sql("fact_sales", engine, if_exists="replace", index=False)
+        sales_df.to_sql("sales_clean", engine, if_exists="replace", index=False, dtype=sql_dtypes(sales_df))
+        features_df.to_sql("features_clean", engine, if_exists="replace", index=False, dtype=sql_dtypes(features_df))
+        stores_df.to_sql("stores_clean", engine, if_exists="replace", index=False, dtype=sql_dtypes(stores_df))
+        advance("load", len(sales_df) + len(features_df) + len(stores_df), table="stores_clean")
+        load_fact_partitions(engine, full_df, granularity)
+        advance("load", len(sales_df) + len(features_df) + len(stores_df) + len(full_df), table=FACT_TABLE)
 
         log(f"Loaded sales_clean ({len(sales_df)} rows)")
         log(f"Loaded features_clean ({len(features_df)} rows)")
         log(f"Loaded stores_clean ({len(stores_df)} rows)")
         log(f"Loaded fact_sales ({len(full_df)} rows)")
 
+    finally:
+        engine.dispose()
+
+def parse_args():
+    load_cfg = load_etl_config().get("load", {})
+    parser = argparse.ArgumentParser(description="Load clean CSVs into MySQL.")
+    parser.add_argument("--parallel", action="store_true", default=load_cfg.get("parallel", False),
+                        help="load the clean tables concurrently via shadow tables")
+    parser.add_argument("--workers", type=int, default=load_cfg.get("workers", 4),
+                        help="number of tables loaded at once in parallel mode")
+    parser.add_argument("--fact-store-ranges", type=int, default=load_cfg.get("fact_store_ranges", 1),
+                        help="split each fact_sales partition into this many store ranges loaded concurrently")
+    parser.add_argument("--fact-partition", choices=sorted(PARTITION_PERIODS),
+                        default=load_cfg.get("fact_partition", "year"),
+                        help="granularity of new fact_sales partitions")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    log("==== LOAD STEP STARTED ====")
+
+    cfg = load_db_config()
+
+    try:
+        if args.parallel:
+            log(f"Parallel load mode ({args.workers} workers, fact_sales in {args.fact_store_ranges} store range(s))")
+            load_parallel(cfg, workers=args.workers, fact_store_ranges=args.fact_store_ranges,
+                          granularity=args.fact_partition)
+        else:
+            load_sequential(cfg, granularity=args.fact_partition)
+
     except Exception as e:
         log(f"LOAD ERROR: {e}")
         raise
@@ -0,0 +1,71 @@
+# scripts/progress.py
+
+import os
+import json
+import time
+from datetime import datetime
+
+# Set by job_manager.py for pipelines launched from the dashboard. Without
+# it (plain command-line runs) every function here is a no-op.
+PROGRESS_ENV = "ETL_PROGRESS_FILE"
+
+_stage_started = {}
+# Stages reported by a child step (extract.py, ...) are timed from its start
+_process_started = time.perf_counter()
+
+# ========== PROGRESS EVENTS ==========
+def emit(stage, status, **fields):
+    """Append one JSON event to the progress file, if there is one."""
+    path = os.environ.get(PROGRESS_ENV)
+    if not path:
+        return
+    event = {
+        "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "pid": os.getpid(),
+        "stage": stage,
+        "status": status,
+        **fields,
+    }
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+    except OSError:
+        pass  # progress reporting must never break the pipeline
+
+def start_stage(stage, **fields):
+    _stage_started[stage] = time.perf_counter()
+    emit(stage, "started", **fields)
+
+def _rate(stage, rows):
+    elapsed = time.perf_counter() - _stage_started.get(stage, _process_started)
+    return {"rows": int(rows), "seconds": round(elapsed, 2), "rows_per_sec": round(rows / elapsed) if elapsed > 0 else None}
+
+def advance(stage, rows, **fields):
+    """Report `rows` (cumulative) processed so far in `stage`."""
+    emit(stage, "running", **_rate(stage, rows), **fields)
+
+def finish_stage(stage, rows=None, ok=True, **fields):
+    stats = _rate(stage, rows) if rows is not None else {}
+    emit(stage, "completed" if ok else "failed", **stats, **fields)
+
+# ========== READING EVENTS ==========
+def read_events(path):
+    """All events of a progress file; a partly written last line is skipped."""
+    events = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return events
+
+def summarize(events):
+    """Latest event per stage, in the order stages first appeared."""
+    stages = {}
+    for event in events:
+        stages.setdefault(event["stage"], {}).update(event)
+    return stages
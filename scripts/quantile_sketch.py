@@ -0,0 +1,155 @@
+# scripts/quantile_sketch.py
+
+import json
+import numpy as np
+
+# ========== MERGING T-DIGEST ==========
+# A digest is a small set of (mean, weight) centroids, dense at the tails
+# and coarse around the median. Digests of disjoint data merge by pooling
+# their centroids and compressing again, so per-store / per-department
+# digests can be combined without touching raw rows.
+
+DEFAULT_COMPRESSION = 100
+
+def empty_digest(compression=DEFAULT_COMPRESSION):
+    return {
+        "compression": compression,
+        "min": float("inf"),
+        "max": float("-inf"),
+        "means": np.zeros(0),
+        "weights": np.zeros(0),
+    }
+
+def _scale(q, compression):
+    """t-digest k1 scale function: k(q) = δ/2π · asin(2q − 1)."""
+    return compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+def _compress(means, weights, compression):
+    """Merge sorted-by-mean centroids so each cluster spans at most one k unit."""
+    order = np.argsort(means, kind="mergesort")
+    means, weights = means[order], weights[order]
+    total = weights.sum()
+    if total == 0:
+        return means, weights
+
+    # bucket every centroid by the k value at its rank midpoint
+    mid = (np.cumsum(weights) - weights / 2) / total
+    buckets = np.floor(_scale(mid, compression) - _scale(0, compression)).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return merged_means, merged_weights
+
+def add_values(digest, values):
+    """Fold a batch of raw values into a digest; NaNs are ignored."""
+    values = np.asarray(values, dtype="float64")
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return digest
+    means, weights = _compress(
+        np.concatenate([digest["means"], values]),
+        np.concatenate([digest["weights"], np.ones(len(values))]),
+        digest["compression"],
+    )
+    return {
+        "compression": digest["compression"],
+        "min": min(digest["min"], float(values.min())),
+        "max": max(digest["max"], float(values.max())),
+        "means": means,
+        "weights": weights,
+    }
+
+def merge_digests(a, b):
+    compression = max(a["compression"], b["compression"])
+    means, weights = _compress(
+        np.concatenate([a["means"], b["means"]]),
+        np.concatenate([a["weights"], b["weights"]]),
+        compression,
+    )
+    return {
+        "compression": compression,
+        "min": min(a["min"], b["min"]),
+        "max": max(a["max"], b["max"]),
+        "means": means,
+        "weights": weights,
+    }
+
+def build_digest(values, compression=DEFAULT_COMPRESSION):
+    return add_values(empty_digest(compression), values)
+
+def count(digest):
+    return float(digest["weights"].sum())
+
+def quantiles(digest, qs):
+    """Estimate quantiles by interpolating between centroid centres."""
+    n = count(digest)
+    if n == 0:
+        return np.full(len(np.atleast_1d(qs)), np.nan)
+    centres = np.cumsum(digest["weights"]) - digest["weights"] / 2
+    ranks = np.r_[0, centres, n]
+    values = np.r_[digest["min"], digest["means"], digest["max"]]
+    return np.interp(np.asarray(qs, dtype="float64") * n, ranks, values)
+
+def box_summary(digest):
+    """Tukey box-plot statistics (whiskers clipped to the observed range)."""
+    q1, median, q3 = quantiles(digest, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    mean = float((digest["means"] * digest["weights"]).sum() / count(digest)) if count(digest) else np.nan
+    return {
+        "count": int(count(digest)),
+        "mean": mean,
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lowerfence": float(max(digest["min"], q1 - 1.5 * iqr)),
+        "upperfence": float(min(digest["max"], q3 + 1.5 * iqr)),
+        "min": digest["min"],
+        "max": digest["max"],
+    }
+
+# ========== GROUPED SKETCHES + PERSISTENCE ==========
+def build_sketches(df, column, group_columns, compression=DEFAULT_COMPRESSION):
+    """Digest of `column` overall and per value of each grouping column."""
+    sketches = {"column": column, "overall": build_digest(df[column].to_numpy(), compression * 2)}
+    for group in group_columns:
+        sketches[group] = {
+            str(key): build_digest(values.to_numpy(), compression)
+            for key, values in df.groupby(group, sort=True)[column]
+        }
+    return sketches
+
+def _digest_to_json(digest):
+    return {**digest, "means": digest["means"].tolist(), "weights": digest["weights"].tolist()}
+
+def _digest_from_json(payload):
+    return {
+        **payload,
+        "means": np.array(payload["means"], dtype="float64"),
+        "weights": np.array(payload["weights"], dtype="float64"),
+    }
+
+def save_sketches(sketches, path):
+    payload = {}
+    for key, value in sketches.items():
+        if key == "column":
+            payload[key] = value
+        elif key == "overall":
+            payload[key] = _digest_to_json(value)
+        else:
+            payload[key] = {k: _digest_to_json(d) for k, d in value.items()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+def load_sketches(path):
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    sketches = {}
+    for key, value in payload.items():
+        if key == "column":
+            sketches[key] = value
+        elif key == "overall":
+            sketches[key] = _digest_from_json(value)
+        else:
+            sketches[key] = {k: _digest_from_json(d) for k, d in value.items()}
+    return sketches
@@ -0,0 +1,125 @@
+# scripts/ranking_index.py
+
+import json
+import pandas as pd
+
+DEFAULT_TOP_K = 10
+# Weeks in each of the "recent" and "older" comparison windows
+DEFAULT_WINDOW_WEEKS = 4
+
+# ========== WEEKLY AGGREGATES ==========
+# The index keeps revenue per (store, week) and (dept, week). That is a few
+# thousand rows, enough to rebuild every ranking and window without
+# rescanning the full dataset.
+
+def weekly_totals(df, group):
+    weekly = df.groupby([group, "sale_date"], sort=True)["weekly_sales"].agg(
+        total_sales="sum", rows="count", max_sales="max"
+    ).reset_index()
+    weekly["sale_date"] = pd.to_datetime(weekly["sale_date"])
+    return weekly
+
+def replace_weeks(saved, new, group):
+    """`saved` weekly totals with every week present in `new` taken from `new` instead.
+
+    A week's totals are replaced, not added to, so re-sending a week that is
+    already in the index does not count it twice.
+    """
+    kept = saved[~saved["sale_date"].isin(new["sale_date"])]
+    merged = pd.concat([kept, new], ignore_index=True)
+    return merged.sort_values([group, "sale_date"], kind="mergesort").reset_index(drop=True)
+
+# ========== RANKINGS ==========
+def rank_totals(weekly, group):
+    """All values of `group` ranked by revenue, with the columns the dashboard shows."""
+    totals = weekly.groupby(group).agg(
+        total_sales=("total_sales", "sum"), rows=("rows", "sum"), max_sales=("max_sales", "max")
+    )
+    totals["avg_sales"] = totals["total_sales"] / totals["rows"]
+    totals = totals.sort_values("total_sales", ascending=False, kind="mergesort").reset_index()
+    return totals[[group, "total_sales", "avg_sales", "max_sales", "rows"]]
+
+def window_summary(weekly, dates):
+    rows = weekly[weekly["sale_date"].isin(dates)]
+    total, count = float(rows["total_sales"].sum()), int(rows["rows"].sum())
+    return {
+        "start": dates.min().strftime("%Y-%m-%d") if len(dates) else None,
+        "end": dates.max().strftime("%Y-%m-%d") if len(dates) else None,
+        "weeks": len(dates),
+        "total_sales": total,
+        "rows": count,
+        "avg_sales": total / count if count else None,
+    }
+
+def sales_windows(weekly, window_weeks):
+    """Mean weekly_sales over the latest and the earliest `window_weeks` weeks."""
+    dates = pd.Series(weekly["sale_date"].unique()).sort_values()
+    return {
+        "recent": window_summary(weekly, dates.tail(window_weeks)),
+        "older": window_summary(weekly, dates.head(window_weeks)),
+    }
+
+def build_rankings(store_weekly, dept_weekly, top_k=DEFAULT_TOP_K, window_weeks=DEFAULT_WINDOW_WEEKS):
+    return {
+        "top_k": top_k,
+        "window_weeks": window_weeks,
+        "rows": int(store_weekly["rows"].sum()),
+        "total_sales": float(store_weekly["total_sales"].sum()),
+        "stores": rank_totals(store_weekly, "store"),
+        "depts": rank_totals(dept_weekly, "dept"),
+        "windows": sales_windows(store_weekly, window_weeks),
+        "weekly": {"store": store_weekly, "dept": dept_weekly},
+    }
+
+def build_index(df, top_k=DEFAULT_TOP_K, window_weeks=DEFAULT_WINDOW_WEEKS):
+    return build_rankings(weekly_totals(df, "store"), weekly_totals(df, "dept"), top_k, window_weeks)
+
+def update_index(index, new_rows):
+    """Fold `new_rows` into a saved index; they must hold every row of the weeks they cover."""
+    weekly = {group: replace_weeks(index["weekly"][group], weekly_totals(new_rows, group), group)
+              for group in ("store", "dept")}
+    return build_rankings(weekly["store"], weekly["dept"], index["top_k"], index["window_weeks"])
+
+def top(index, group="stores", k=None):
+    """Top `k` (default: the index's K) rows of a ranking."""
+    return index[group].head(k or index["top_k"])
+
+# ========== PERSISTENCE ==========
+def _frame_to_json(df):
+    df = df.copy()
+    if "sale_date" in df.columns:
+        df["sale_date"] = df["sale_date"].dt.strftime("%Y-%m-%d")
+    # column-oriented, so integer keys stay integers next to float totals
+    return {column: df[column].tolist() for column in df.columns}
+
+def _frame_from_json(payload):
+    df = pd.DataFrame(payload)
+    if "sale_date" in df.columns:
+        df["sale_date"] = pd.to_datetime(df["sale_date"])
+    return df
+
+def save_index(index, path, **extra):
+    payload = {
+        **{k: v for k, v in index.items() if k not in ("stores", "depts", "weekly")},
+        "stores": _frame_to_json(index["stores"]),
+        "depts": _frame_to_json(index["depts"]),
+        "weekly": {group: _frame_to_json(df) for group, df in index["weekly"].items()},
+        **extra,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+def load_index(path):
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    payload["stores"] = _frame_from_json(payload["stores"])
+    payload["depts"] = _frame_from_json(payload["depts"])
+    payload["weekly"] = {group: _frame_from_json(df) for group, df in payload["weekly"].items()}
+    return payload
+
+def update_index_file(path, new_rows):
+    """Fold newly arrived weeks into the index saved at `path`, keeping its extra fields."""
+    saved = load_index(path)
+    index = update_index(saved, new_rows)
+    save_index(index, path, **{k: v for k, v in saved.items() if k not in index})
+    return index
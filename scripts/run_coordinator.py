@@ -0,0 +1,159 @@
+# scripts/run_coordinator.py
+
+import os
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN_DIR = os.path.join(BASE_DIR, "logs", "jobs")
+# Held by etl_pipeline.py for the whole run, whoever started it
+PIPELINE_LOCK = os.path.join(RUN_DIR, "pipeline.lock")
+# Pending dashboard runs (FIFO) and the short-lived lock guarding the file
+QUEUE_FILE = os.path.join(RUN_DIR, "queue.json")
+QUEUE_LOCK = os.path.join(RUN_DIR, "queue.lock")
+# Set by job_manager.py so the lock records which dashboard job holds it
+JOB_ID_ENV = "ETL_JOB_ID"
+
+# ========== PROCESS LIVENESS ==========
+def pid_alive(pid):
+    if not pid:
+        return False
+    if os.name == "nt":
+        import ctypes
+        # OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION) + GetExitCodeProcess == STILL_ACTIVE
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return code.value == 259
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# ========== FILE LOCKS ==========
+# O_CREAT | O_EXCL is atomic on every platform and filesystem we run on, so
+# whoever creates the file owns the lock. The file records the owner's pid;
+# a lock whose process is gone (crash, kill -9) is stale and is broken.
+
+def read_lock(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def lock_holder(path):
+    """Owner record of a live lock at `path`, or None."""
+    holder = read_lock(path)
+    if holder is not None and pid_alive(holder.get("pid")):
+        return holder
+    return None
+
+def _break_stale_lock(path):
+    holder = read_lock(path)
+    if holder is None:
+        # unreadable: either being written right now or truncated by a crash
+        try:
+            if time.time() - os.path.getmtime(path) < 5:
+                return False
+        except OSError:
+            return True
+    elif pid_alive(holder.get("pid")):
+        return False
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return True
+
+def acquire_lock(path, owner=None, timeout=0, poll=0.2):
+    """Create the lock file at `path`; wait up to `timeout` seconds. Returns True if acquired."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    deadline = time.monotonic() + timeout
+    record = {"pid": os.getpid(), "owner": owner, "acquired_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if _break_stale_lock(path):
+                continue
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        return True
+
+def release_lock(path):
+    """Remove the lock at `path` if this process holds it."""
+    holder = read_lock(path)
+    if holder is not None and holder.get("pid") == os.getpid():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+@contextmanager
+def file_lock(path, owner=None, timeout=10):
+    if not acquire_lock(path, owner, timeout):
+        holder = read_lock(path) or {}
+        raise TimeoutError(f"Lock {path} held by pid {holder.get('pid')} since {holder.get('acquired_at')}")
+    try:
+        yield
+    finally:
+        release_lock(path)
+
+# ========== PIPELINE LOCK ==========
+def acquire_pipeline_lock(timeout=0):
+    return acquire_lock(PIPELINE_LOCK, os.environ.get(JOB_ID_ENV, "cli"), timeout)
+
+def release_pipeline_lock():
+    release_lock(PIPELINE_LOCK)
+
+def pipeline_lock_holder():
+    return lock_holder(PIPELINE_LOCK)
+
+# ========== RUN QUEUE ==========
+def load_queue():
+    try:
+        with open(QUEUE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def save_queue(queue):
+    os.makedirs(RUN_DIR, exist_ok=True)
+    tmp_path = QUEUE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(queue, f, indent=2)
+    os.replace(tmp_path, QUEUE_FILE)
+
+def enqueue_run(queue, args=()):
+    """Append a run request to `queue`, or coalesce it into a pending identical one.
+
+    Returns (request, coalesced). Call with QUEUE_LOCK held.
+    """
+    args = list(args)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for request in queue:
+        if request["args"] == args:
+            # a pending run with the same arguments will pick up this request's data too
+            request["coalesced"] += 1
+            request["last_requested_at"] = now
+            return request, True
+    request = {"args": args, "requested_at": now, "last_requested_at": now, "coalesced": 0}
+    queue.append(request)
+    return request, False
+
+def coordinator_status():
+    """Current pipeline lock holder and pending queue."""
+    return {"lock": pipeline_lock_holder(), "queue": load_queue()}
@@ -0,0 +1,61 @@
+# scripts/sampling.py
+
+import numpy as np
+import pandas as pd
+
+# Columns that identify a row of full_dataset_clean
+SAMPLE_KEY = ["store", "dept", "sale_date"]
+DEFAULT_SAMPLE_SIZE = 10000
+DEFAULT_SEED = 42
+
+# ========== SAMPLE KEYS ==========
+# Every row gets a pseudo-random key in [0, 1) derived from its identity
+# columns and the seed. Keeping the `size` rows with the smallest keys is a
+# uniform sample (bottom-k / reservoir sampling) that does not depend on
+# file order or chunking, so reruns over the same data pick the same rows
+# and samples of separate chunks merge by taking the smallest keys again.
+
+def sample_keys(df, key_columns=SAMPLE_KEY, seed=DEFAULT_SEED):
+    columns = [c for c in key_columns if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns] if columns else df, index=False, hash_key=f"{seed:016d}"[:16])
+    return (hashes.to_numpy() >> np.uint64(11)).astype("float64") / float(1 << 53)
+
+def _smallest_keys(df, keys, size):
+    if len(df) > size:
+        keep = np.argpartition(keys, size - 1)[:size]
+        df, keys = df.iloc[keep], keys[keep]
+    order = np.argsort(keys, kind="mergesort")
+    # sorted by key, so any prefix of the sample is itself a uniform sample
+    return df.iloc[order].reset_index(drop=True), keys[order]
+
+# ========== RESERVOIR SAMPLE ==========
+def reservoir_sample(df, size=DEFAULT_SAMPLE_SIZE, seed=DEFAULT_SEED, chunksize=100000):
+    """Uniform sample of `size` rows from `df` or an iterable of chunks."""
+    chunks = (df.iloc[i:i + chunksize] for i in range(0, len(df), chunksize)) if isinstance(df, pd.DataFrame) else df
+    sample, keys = None, np.zeros(0)
+    for chunk in chunks:
+        chunk_keys = sample_keys(chunk, seed=seed)
+        if sample is not None:
+            chunk = pd.concat([sample, chunk], ignore_index=True)
+            chunk_keys = np.concatenate([keys, chunk_keys])
+        sample, keys = _smallest_keys(chunk, chunk_keys, size)
+    return sample if sample is not None else pd.DataFrame()
+
+# ========== STRATIFIED SAMPLE ==========
+def allocate(counts, size):
+    """Proportional allocation of `size` rows over strata, at least one row each."""
+    counts = pd.Series(counts)
+    if counts.sum() <= size:
+        return counts
+    quota = np.maximum(np.floor(counts * size / counts.sum()), 1).astype("int64")
+    return np.minimum(quota, counts)
+
+def stratified_sample(df, column="store", size=DEFAULT_SAMPLE_SIZE, seed=DEFAULT_SEED):
+    """Sample of about `size` rows with every value of `column` represented in proportion."""
+    keys = sample_keys(df, seed=seed)
+    quota = allocate(df[column].value_counts(sort=False), size)
+    # rank rows within their stratum by key and keep each stratum's quota
+    ranks = pd.Series(keys, index=df.index).groupby(df[column]).rank(method="first")
+    keep = (ranks <= df[column].map(quota)).to_numpy()
+    order = np.argsort(keys[keep], kind="mergesort")
+    return df[keep].iloc[order].reset_index(drop=True)
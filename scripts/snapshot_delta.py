@@ -0,0 +1,73 @@
+# scripts/snapshot_delta.py
+
+import io
+import pandas as pd
+
+# Business key of the sales-grain clean files
+SNAPSHOT_KEY = ["store", "dept", "sale_date"]
+# Row orders a snapshot can be rebuilt in: full_dataset_clean.csv is written
+# store-partitioned (transform.sort_by_store), sales_clean.csv in key order
+SNAPSHOT_ORDERS = (["store", "sale_date", "dept"], SNAPSHOT_KEY)
+
+# ========== SNAPSHOT ROWS ==========
+# A snapshot is handled as its raw CSV lines indexed by key, never as parsed
+# values: deltas then carry the exact bytes, and a rebuilt snapshot is
+# byte-identical to the file that was archived (same sha256).
+
+def split_rows(data, key=SNAPSHOT_KEY):
+    """(header, rows) of CSV bytes with one record per line; rows = raw lines indexed by key."""
+    header, _, body = data.partition(b"\n")
+    lines = body.splitlines(keepends=True)
+    keys = pd.read_csv(io.BytesIO(data), usecols=key)[key]
+    if len(keys) != len(lines):
+        raise ValueError("snapshot has blank lines or records spanning lines")
+    index = pd.MultiIndex.from_frame(keys)
+    if index.has_duplicates:
+        raise ValueError(f"snapshot has duplicate {key} rows")
+    return header + b"\n", pd.Series(lines, index=index, dtype=object)
+
+def join_rows(header, rows, order):
+    """CSV bytes of `rows`, sorted by the `order` key columns."""
+    keys = rows.index.to_frame(index=False)
+    position = keys.sort_values(order, kind="mergesort").index.to_numpy()
+    return header + b"".join(rows.to_numpy()[position])
+
+def detect_order(rows):
+    """The first of SNAPSHOT_ORDERS the rows are sorted by, or None."""
+    keys = rows.index.to_frame(index=False)
+    for order in SNAPSHOT_ORDERS:
+        if not set(order) <= set(keys.columns):
+            continue
+        position = keys.sort_values(order, kind="mergesort").index.to_numpy()
+        if (position == range(len(keys))).all():
+            return order
+    return None
+
+# ========== DELTAS ==========
+def encode_delta(old_rows, new_rows):
+    """(upserts, deleted, counts) turning `old_rows` into `new_rows`.
+
+    upserts are the inserted and changed rows of `new_rows`; deleted is the
+    key index of rows only in `old_rows`.
+    """
+    in_old = new_rows.index.isin(old_rows.index)
+    changed = in_old.copy()
+    changed[in_old] = old_rows.reindex(new_rows.index[in_old]).to_numpy() != new_rows[in_old].to_numpy()
+    upserts = new_rows[~in_old | changed]
+    deleted = old_rows.index[~old_rows.index.isin(new_rows.index)]
+    counts = {"inserted": int((~in_old).sum()), "updated": int(changed.sum()), "deleted": len(deleted)}
+    return upserts, deleted, counts
+
+def apply_delta(rows, upserts, deleted):
+    """`rows` with `deleted` keys removed and `upserts` inserted or replacing old rows (unordered)."""
+    drop = rows.index.isin(upserts.index) | rows.index.isin(deleted)
+    return pd.concat([rows[~drop], upserts])
+
+def encode_deletes(deleted):
+    return deleted.to_frame(index=False).to_csv(index=False).encode("utf-8")
+
+def decode_deletes(data, key=SNAPSHOT_KEY):
+    keys = pd.read_csv(io.BytesIO(data))
+    if keys.empty:
+        return pd.MultiIndex.from_arrays([[]] * len(key), names=key)
+    return pd.MultiIndex.from_frame(keys[key])
@@ -0,0 +1,54 @@
+# scripts/sql_runner.py
+
+import os
+import re
+import time
+from sqlalchemy import text
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQL_DIR = os.path.join(BASE_DIR, "sql")
+
+SET_VARIABLE = re.compile(r"^SET\s+@(\w+)\s*=\s*'(.*)'$", re.IGNORECASE | re.DOTALL)
+
+def split_sql_statements(sql):
+    """Split a SQL script into statements, dropping comments, USE and SHOW lines.
+
+    The database always comes from db_config.json, so `USE` is skipped.
+    Statements are split on ';' — the scripts in sql/ contain no string
+    literals with semicolons.
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    statements = []
+    for stmt in "\n".join(lines).split(";"):
+        stmt = stmt.strip()
+        if not stmt or stmt.split()[0].upper() in ("USE", "SHOW"):
+            continue
+        statements.append(stmt)
+    return statements
+
+def read_sql_script(script_name):
+    with open(os.path.join(SQL_DIR, script_name), encoding="utf-8") as f:
+        return split_sql_statements(f.read())
+
+def bind_statement(stmt, params):
+    """Turn `SET @name = '...'` into a bound `SET @name = :name` statement.
+
+    The literal in the file is the default; `params` overrides it. Binding
+    also keeps '%' format strings out of the SQL text sent to the driver.
+    """
+    m = SET_VARIABLE.match(stmt)
+    if not m:
+        return text(stmt), {}
+    name, default = m.groups()
+    return text(f"SET @{name} = :{name}"), {name: params.get(name, default)}
+
+def run_statements(conn, statements, params=None, log=print):
+    """Execute statements on one connection, logging the time of each."""
+    for stmt in statements:
+        clause, bound = bind_statement(stmt, params or {})
+        start = time.perf_counter()
+        result = conn.execute(clause, bound)
+        elapsed = time.perf_counter() - start
+        summary = " ".join(stmt.split())[:80]
+        rows = f", {result.rowcount} rows" if result.rowcount >= 0 else ""
+        log(f"  {elapsed:8.3f}s{rows} | {summary}")
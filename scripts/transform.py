@@ -1,34 +1,189 @@
 # scripts/transform.py
 
 import pandas as pd
+import json
 import os
 from datetime import datetime
 
+from chunk_reader import csv_options, read_csv
+from column_encoding import (DEFAULT_EXCLUDE, DEFAULT_TOLERANCE, downcast_columns, encode_columns, frame_schema,
+                             reconcile_flag)
+from correlation_stats import compute_stats, save_stats
+from progress import advance
+from quantile_sketch import build_sketches, save_sketches
+from ranking_index import DEFAULT_TOP_K, DEFAULT_WINDOW_WEEKS, build_index, save_index
+from sampling import DEFAULT_SAMPLE_SIZE, DEFAULT_SEED, reservoir_sample, stratified_sample
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # Arrow artifacts are optional; the CSVs are always written
+    feather = None
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DIR = os.path.join(BASE_DIR, "data", "raw")
 CLEAN_DIR = os.path.join(BASE_DIR, "data", "clean")
+# Sub-folder, so the archiver (top-level *.csv only) leaves samples alone
+SAMPLES_DIR = os.path.join(CLEAN_DIR, "samples")
 os.makedirs(CLEAN_DIR, exist_ok=True)
 
+# Format of the Date column in the raw Kaggle CSVs
+DATE_FORMAT = "%Y-%m-%d"
+
 # ---------- SIMPLE LOGGER (ASCII ONLY) ----------
 def log(msg):
     print(msg)
 
+def load_etl_config():
+    """Optional pipeline settings; missing or unreadable config means defaults."""
+    cfg_path = os.path.join(BASE_DIR, "config", "etl_config.json")
+    try:
+        with open(cfg_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
 # ---------- LOAD CLEAN FUNCTION ----------
 def load_csv(name):
     path = os.path.join(RAW_DIR, name)
-    log(f"Loading {name}")
-    return pd.read_csv(path)
+    options = csv_options(load_etl_config())
+    log(f"Loading {name} ({options['engine']} engine)")
+    return read_csv(path, log=log, **options)
 
 def save_clean(df, filename):
+    df, report = downcast(df, filename)
     out_path = os.path.join(CLEAN_DIR, filename)
     df.to_csv(out_path, index=False, encoding="utf-8")
     log(f"Saved clean file: {out_path} ({len(df)} rows)")
+    save_arrow(df, filename)
+    save_schema(df, filename, report)
+
+def downcast(df, filename):
+    """Smallest lossless dtypes for the saved copies (see column_encoding); summaries use the full frame."""
+    downcast_cfg = load_etl_config().get("downcast", {})
+    if not downcast_cfg.get("enabled", True):
+        return df, {}
+    before = df.memory_usage(deep=True).sum()
+    small, report = downcast_columns(
+        df,
+        float(downcast_cfg.get("tolerance", DEFAULT_TOLERANCE)),
+        downcast_cfg.get("tolerances", {}),
+        downcast_cfg.get("exclude", DEFAULT_EXCLUDE),
+    )
+    after = small.memory_usage(deep=True).sum()
+    log(f"Downcast {filename}: {len(report)} column(s), {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB in memory")
+    return small, report
+
+def save_schema(df, filename, report):
+    """Record the dtype of every column (and how it was downcast) next to the CSV."""
+    schema = {
+        "dataset": os.path.splitext(filename)[0],
+        "rows": len(df),
+        "columns": frame_schema(df, report),
+    }
+    out_path = os.path.join(CLEAN_DIR, os.path.splitext(filename)[0] + ".schema.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2)
+    log(f"Saved schema: {out_path}")
+
+def save_arrow(df, filename):
+    """Write an uncompressed Arrow IPC (Feather v2) copy next to the CSV.
+
+    Uncompressed so the dashboard can memory-map it and share the buffers
+    between sessions without decoding.
+    """
+    if feather is None:
+        return
+    out_path = os.path.join(CLEAN_DIR, os.path.splitext(filename)[0] + ".arrow")
+    tmp_path = out_path + ".tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    # replace atomically so a dashboard mapping the old file never sees a partial one
+    os.replace(tmp_path, out_path)
+    log(f"Saved Arrow file: {out_path}")
 
 # ---------- CLEANING HELPERS ----------
 def normalize(df):
     df.columns = df.columns.str.strip().str.lower()
     return df
 
+def parse_dates(df, column):
+    """Parse a date column once, with the known format, into datetime64."""
+    df[column] = pd.to_datetime(df[column], format=DATE_FORMAT)
+    return df
+
+def add_calendar_columns(df, column):
+    """Precompute calendar fields so consumers never derive them from strings."""
+    dates = df[column].dt
+    df["year"] = dates.year.astype("int16")
+    df["month"] = dates.month.astype("int8")
+    df["quarter"] = dates.quarter.astype("int8")
+    df["week"] = dates.isocalendar().week.astype("int8")
+    return df
+
+# ---------- STORE-PARTITIONED LAYOUT ----------
+def sort_by_store(df):
+    """Order rows by store, then date, so each store is one contiguous block."""
+    return df.sort_values(["store", "sale_date", "dept"], kind="mergesort").reset_index(drop=True)
+
+def save_store_index(df, filename):
+    """Write {store: [start, stop)} row offsets of a store-sorted frame.
+
+    Lets the dashboard slice one store's date-ordered series without
+    scanning the whole dataset.
+    """
+    starts = df.groupby("store", sort=True).indices
+    index = {
+        "dataset": os.path.splitext(filename)[0],
+        "rows": len(df),
+        "sort": ["store", "sale_date", "dept"],
+        "stores": {str(store): [int(rows[0]), int(rows[-1]) + 1] for store, rows in starts.items()},
+    }
+    out_path = os.path.join(CLEAN_DIR, os.path.splitext(filename)[0] + ".store_index.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    log(f"Saved store index: {out_path} ({len(index['stores'])} stores)")
+
+# ---------- PRECOMPUTED SUMMARIES ----------
+def save_correlation_stats(df, filename):
+    """Persist the sufficient statistics behind the dashboard's correlation matrix."""
+    stats = compute_stats(df)
+    out_path = os.path.join(CLEAN_DIR, os.path.splitext(filename)[0] + ".corr_stats.json")
+    save_stats(stats, out_path, dataset=os.path.splitext(filename)[0], rows=len(df))
+    log(f"Saved correlation statistics: {out_path} ({len(stats['columns'])} columns)")
+
+def save_sales_sketches(df, filename):
+    """Persist weekly_sales quantile digests, overall and per store / department."""
+    sketches = build_sketches(df, "weekly_sales", ["store", "dept"])
+    out_path = os.path.join(CLEAN_DIR, os.path.splitext(filename)[0] + ".sales_sketches.json")
+    save_sketches(sketches, out_path)
+    log(f"Saved sales quantile sketches: {out_path} ({len(sketches['store'])} stores, {len(sketches['dept'])} depts)")
+
+def save_samples(df, filename):
+    """Persist deterministic uniform and store-stratified samples for the dashboard previews."""
+    sample_cfg = load_etl_config().get("samples", {})
+    size = int(sample_cfg.get("size", DEFAULT_SAMPLE_SIZE))
+    seed = int(sample_cfg.get("seed", DEFAULT_SEED))
+    os.makedirs(SAMPLES_DIR, exist_ok=True)
+    base = os.path.splitext(filename)[0]
+    for kind, sample in (
+        ("reservoir", reservoir_sample(df, size, seed)),
+        ("stratified", stratified_sample(df, "store", size, seed)),
+    ):
+        out_path = os.path.join(SAMPLES_DIR, f"{base}.{kind}.csv")
+        sample.to_csv(out_path, index=False, encoding="utf-8")
+        log(f"Saved {kind} sample: {out_path} ({len(sample)} rows)")
+
+def save_ranking_index(df, filename):
+    """Persist top-K store / department rankings and the recent vs older sales windows."""
+    ranking_cfg = load_etl_config().get("ranking", {})
+    index = build_index(
+        df,
+        int(ranking_cfg.get("top_k", DEFAULT_TOP_K)),
+        int(ranking_cfg.get("window_weeks", DEFAULT_WINDOW_WEEKS)),
+    )
+    out_path = os.path.join(CLEAN_DIR, os.path.splitext(filename)[0] + ".ranking.json")
+    save_index(index, out_path, dataset=os.path.splitext(filename)[0])
+    log(f"Saved ranking index: {out_path} ({len(index['stores'])} stores, {len(index['depts'])} depts)")
+
 # ---------- BUILD FULL DATASET ----------
 def build_full_dataset(sales, features, stores):
     # Merge features on store + date
@@ -39,9 +194,36 @@ def build_full_dataset(sales, features, stores):
         how="left"
     )
 
+    # Both sides carry the holiday flag: keep one (the sales row's)
+    merged = reconcile_flag(merged, "is_holiday", log=log)
+
     # Merge stores
     merged = merged.merge(stores, on="store", how="left")
-    return merged
+    return encode_columns(merged)
+
+# ---------- SAVE OUTPUTS ----------
+def save_outputs(sales, features, stores, stage="transform"):
+    """Write the clean CSVs and every dashboard artifact from the three clean frames.
+
+    Also used by etl_pipeline.py --mode elt with the clean tables exported
+    from MySQL, so both modes leave the same files behind.
+    """
+    save_clean(sales, "sales_clean.csv")
+    save_clean(features, "features_clean.csv")
+    save_clean(stores, "stores_clean.csv")
+
+    full = build_full_dataset(sales, features, stores)
+    full = add_calendar_columns(full, "sale_date")
+    full = sort_by_store(full)
+    advance(stage, len(full), step="full_dataset")
+    log(f"Full dataset: {len(full)} rows, {full.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
+
+    save_clean(full, "full_dataset_clean.csv")
+    save_store_index(full, "full_dataset_clean.csv")
+    save_correlation_stats(full, "full_dataset_clean.csv")
+    save_sales_sketches(full, "full_dataset_clean.csv")
+    save_samples(full, "full_dataset_clean.csv")
+    save_ranking_index(full, "full_dataset_clean.csv")
 
 
 # ================= MAIN =================
@@ -88,15 +270,17 @@ def main():
         "size": "size"
     })
 
-    # ---------- Save individual clean files ----------
-    save_clean(sales, "sales_clean.csv")
-    save_clean(features, "features_clean.csv")
-    save_clean(stores, "stores_clean.csv")
+    # ---------- Parse dates ----------
+    sales = parse_dates(sales, "sale_date")
+    features = parse_dates(features, "feature_date")
 
-    # ---------- Build full dataset ----------
-    full = build_full_dataset(sales, features, stores)
+    # ---------- Encode flags and categories ----------
+    sales = encode_columns(sales)
+    features = encode_columns(features)
+    stores = encode_columns(stores)
 
-    save_clean(full, "full_dataset_clean.csv")
+    # ---------- Save clean files, full dataset and dashboard artifacts ----------
+    save_outputs(sales, features, stores)
 
     log("==== TRANSFORM STEP COMPLETED ====")
 
@@ -86,6 +86,10 @@ CREATE TABLE dim_store (
     size INT
 );
 
+-- 7) Sales fact table
+-- fact_sales is partitioned by sale_date and managed separately:
+-- see fact_sales.sql (created by load.py on first load).
+
 -- =========================================================
 --  INDEXES (PERFORMANCE)
 -- =========================================================
@@ -0,0 +1,59 @@
+-- ================================================================
+-- elt_fact_sales.sql
+-- Builds fact_sales server-side from the clean tables
+-- (run by etl_pipeline.py --mode elt after transformations.sql)
+-- ================================================================
+
+USE retail_db;
+
+-- ================================================================
+-- 1. CLEAR FACT TABLE
+-- fact_sales itself is defined in fact_sales.sql; etl_pipeline.py
+-- creates it and its partitions before running this file.
+-- ================================================================
+
+TRUNCATE TABLE fact_sales;
+
+-- a full rebuild invalidates the partition bookkeeping of load.py
+DELETE FROM fact_sales_partitions;
+
+
+-- ================================================================
+-- 2. SALES + FEATURES + STORE MERGE
+-- Only rows with sales (train.csv), like full_dataset_clean.csv
+-- ================================================================
+
+INSERT INTO fact_sales (
+    store, dept, sale_date, weekly_sales, is_holiday,
+    feature_date, temperature, fuel_price,
+    markdown1, markdown2, markdown3, markdown4, markdown5,
+    cpi, unemployment,
+    store_type, size
+)
+SELECT
+    s.store,
+    s.dept,
+    s.sale_date,
+    s.weekly_sales,
+    s.is_holiday,
+    f.feature_date,
+    f.temperature,
+    f.fuel_price,
+    f.markdown1,
+    f.markdown2,
+    f.markdown3,
+    f.markdown4,
+    f.markdown5,
+    f.cpi,
+    f.unemployment,
+    d.store_type,
+    d.size
+FROM sales_clean s
+LEFT JOIN features_clean f
+    ON s.store = f.store
+   AND s.sale_date = f.feature_date
+LEFT JOIN dim_store d
+    ON s.store = d.store
+WHERE s.weekly_sales IS NOT NULL;
+
+-- END OF FILE
@@ -0,0 +1,32 @@
+-- ================================================================
+-- extract_checkpoints.sql
+-- Resume bookkeeping of extract.py (created by it when missing)
+-- ================================================================
+
+USE retail_db;
+
+-- ================================================================
+-- 1. EXTRACT CHECKPOINTS
+-- One row per (source file, staging table). rows_committed counts
+-- the source data lines consumed (loaded, or quarantined to the
+-- reject file as malformed). It is updated in the same transaction
+-- as each chunk insert, so after a failure it always matches what
+-- the staging table holds, and the next run resumes from the first
+-- line not yet committed.
+-- file_size / file_mtime identify the source version the rows came
+-- from; a changed file restarts the extract from scratch.
+-- ================================================================
+
+CREATE TABLE IF NOT EXISTS extract_checkpoints (
+    source_file VARCHAR(255) NOT NULL,
+    target_table VARCHAR(64) NOT NULL,
+    file_size BIGINT NOT NULL,
+    file_mtime DOUBLE NOT NULL,
+    rows_committed BIGINT NOT NULL DEFAULT 0,
+    chunks_committed INT NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (source_file, target_table)
+) ENGINE=InnoDB;
+
+-- END OF FILE
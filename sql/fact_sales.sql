@@ -0,0 +1,62 @@
+-- ================================================================
+-- fact_sales.sql
+-- Managed definition of the fact_sales table
+-- (created by load.py / etl_pipeline.py --mode elt when missing)
+-- ================================================================
+
+USE retail_db;
+
+-- ================================================================
+-- 1. FACT TABLE (RANGE PARTITIONED BY sale_date)
+-- Column names mirror full_dataset_clean.csv. is_holiday is the
+-- sales row's flag (the features copy is reconciled away in
+-- transform.py). store_type is a plain VARCHAR(10), as in dim_store:
+-- its values come from the data, and the compact encoding lives in
+-- the categorical clean artifacts.
+-- The table starts with a single catch-all partition; the loader
+-- splits pmax into yearly (pYYYY) or quarterly (pYYYYqN) partitions
+-- as new periods arrive.
+-- MySQL requires the partition column in every unique key, so
+-- sale_date is part of the primary key.
+-- ================================================================
+
+CREATE TABLE IF NOT EXISTS fact_sales (
+    store INT NOT NULL,
+    dept INT NOT NULL,
+    sale_date DATE NOT NULL,
+    weekly_sales DECIMAL(14,2),
+    is_holiday BOOLEAN,
+    feature_date DATE,
+    temperature DOUBLE,
+    fuel_price DOUBLE,
+    markdown1 DOUBLE,
+    markdown2 DOUBLE,
+    markdown3 DOUBLE,
+    markdown4 DOUBLE,
+    markdown5 DOUBLE,
+    cpi DOUBLE,
+    unemployment DOUBLE,
+    store_type VARCHAR(10),
+    size INT,
+    PRIMARY KEY (store, dept, sale_date),
+    INDEX idx_fact_date_store (sale_date, store)
+)
+PARTITION BY RANGE COLUMNS (sale_date) (
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+
+-- ================================================================
+-- 2. PARTITION LOAD BOOKKEEPING
+-- One row per partition: what the last load wrote into it, so
+-- unchanged partitions are skipped on the next run.
+-- ================================================================
+
+CREATE TABLE IF NOT EXISTS fact_sales_partitions (
+    partition_name VARCHAR(16) PRIMARY KEY,
+    row_count INT NOT NULL,
+    checksum VARCHAR(20) NOT NULL,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- END OF FILE
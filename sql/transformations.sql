@@ -1,11 +1,76 @@
 -- ================================================================
 -- transformations.sql
 -- SQL version of cleaning + transforming staging tables
--- (Python transform.py already performs these steps)
+-- (Python transform.py performs the same steps in pandas;
+--  etl_pipeline.py --mode elt runs this file server-side)
 -- ================================================================
 
 USE retail_db;
 
+-- Date format of the *_raw staging columns
+-- (etl_pipeline.py binds its own value for every SET @variable)
+SET @date_format = '%Y-%m-%d';
+
+
+-- ================================================================
+-- 0. (RE)CREATE CLEAN TABLES
+-- (same definitions as create_tables.sql)
+-- load.py (ETL mode) replaces sales_clean / features_clean with
+-- pandas-created tables (no id, other column types), so both are
+-- recreated here rather than only created when missing; they are
+-- rebuilt from staging below anyway.
+-- ================================================================
+
+DROP TABLE IF EXISTS sales_clean;
+CREATE TABLE sales_clean (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    store INT NOT NULL,
+    dept INT NOT NULL,
+    sale_date DATE NOT NULL,
+    weekly_sales DECIMAL(14,2),
+    is_holiday BOOLEAN,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_store_dept_date (store, dept, sale_date)
+);
+
+DROP TABLE IF EXISTS features_clean;
+CREATE TABLE features_clean (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    store INT,
+    feature_date DATE,
+    temperature DOUBLE,
+    fuel_price DOUBLE,
+    markdown1 DOUBLE,
+    markdown2 DOUBLE,
+    markdown3 DOUBLE,
+    markdown4 DOUBLE,
+    markdown5 DOUBLE,
+    cpi DOUBLE,
+    unemployment DOUBLE,
+    is_holiday BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS dim_store (
+    store INT PRIMARY KEY,
+    store_type VARCHAR(10),
+    size INT
+);
+
+-- an existing dim_store may still have store_type ENUM('A','B','C') or
+-- VARCHAR(1); widen only those, so an up-to-date table is left alone
+SET @widen_store_type = (
+    SELECT IF(DATA_TYPE = 'enum' OR CHARACTER_MAXIMUM_LENGTH < 10,
+              'ALTER TABLE dim_store MODIFY store_type VARCHAR(10)',
+              'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND TABLE_NAME = 'dim_store'
+      AND COLUMN_NAME = 'store_type'
+);
+PREPARE widen_store_type FROM @widen_store_type;
+EXECUTE widen_store_type;
+DEALLOCATE PREPARE widen_store_type;
+
 -- ================================================================
 -- 1. CLEAN SALES DATA
 -- ================================================================
@@ -13,14 +78,14 @@ USE retail_db;
 -- Convert date → DATE format
 -- Convert is_holiday → BOOLEAN
 -- Remove NULL store/dept records
-
-TRUNCATE TABLE sales_clean;
+-- Keep train rows only: test.csv rows are staged too (weekly_sales NULL),
+-- but transform.py's sales_clean has none
 
 INSERT INTO sales_clean (store, dept, sale_date, weekly_sales, is_holiday)
 SELECT
     CAST(store AS SIGNED),
     CAST(dept AS SIGNED),
-    STR_TO_DATE(sale_date_raw, '%Y-%m-%d'),
+    STR_TO_DATE(sale_date_raw, @date_format),
     weekly_sales,
     CASE 
         WHEN is_holiday IN ('True', '1', 'true') THEN TRUE
@@ -28,15 +93,14 @@ SELECT
     END
 FROM sales_staging
 WHERE store IS NOT NULL
-  AND dept IS NOT NULL;
+  AND dept IS NOT NULL
+  AND weekly_sales IS NOT NULL;
 
 
 -- ================================================================
 -- 2. CLEAN FEATURES DATA
 -- ================================================================
 
-TRUNCATE TABLE features_clean;
-
 INSERT INTO features_clean (
     store, feature_date, temperature, fuel_price,
     markdown1, markdown2, markdown3, markdown4, markdown5,
@@ -44,7 +108,7 @@ INSERT INTO features_clean (
 )
 SELECT
     CAST(store AS SIGNED),
-    STR_TO_DATE(feature_date_raw, '%Y-%m-%d'),
+    STR_TO_DATE(feature_date_raw, @date_format),
     temperature,
     fuel_price,
     markdown1, markdown2, markdown3, markdown4, markdown5,
@@ -77,6 +141,7 @@ FROM stores_staging;
 -- ================================================================
 
 -- This step is optional — used for analysis.
+-- ELT mode materializes it into fact_sales via elt_fact_sales.sql.
 
 -- SELECT
 --     s.store,
@@ -9,8 +9,9 @@ Run:
  
 import streamlit as st
 import os
+import sys
+import shutil
 import json
-import subprocess
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -24,6 +25,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow artifacts are optional; clean CSVs are read instead
+    pa = None
+
 
 # ADD THIS LINE BELOW ↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓↓
 IS_CLOUD = "STREAMLIT_RUNTIME" in os.environ
@@ -51,6 +57,22 @@ SCRIPTS_DIR = PROJECT_ROOT / "scripts"
 CONFIG_PATH = PROJECT_ROOT / "config" / "db_config.json"
 PIPELINE_SCRIPT = SCRIPTS_DIR / "etl_pipeline.py"
 
+# Summaries precomputed by the pipeline are read with the pipeline's own helpers
+sys.path.insert(0, str(SCRIPTS_DIR))
+from archive_store import INDEX_FILE as ARCHIVE_INDEX_FILE, read_archive_index, run_file_path
+from column_encoding import CATEGORY_COLUMNS, schema_dtypes
+from correlation_stats import correlation_matrix, load_stats
+from job_manager import dispatch_next, job_progress, request_run, run_status, tail_output
+from quantile_sketch import box_summary, load_sketches
+from ranking_index import load_index, top
+
+# Date columns of the clean datasets and their on-disk format (see transform.py)
+DATE_COLUMNS = ("sale_date", "feature_date")
+DATE_FORMAT = "%Y-%m-%d"
+# Archived run whose clean data every section shows (sidebar "Data Version");
+# None = the current files in data/clean
+ARCHIVE_RUN = None
+
 # Ensure directories exist
 for d in (RAW_DIR, CLEAN_DIR, STAGING_DIR, LOG_DIR):
     d.mkdir(parents=True, exist_ok=True)
@@ -393,33 +415,338 @@ def load_json_config(path: Path):
         return None
 
 @st.cache_data(ttl=300)
-def read_csv_if_exists(path: Path):
+def read_csv_if_exists(path: Path, usecols=None, fingerprint=None, parse_dates=None, dtypes=None):
+    """Read a CSV, optionally only `usecols`; pass `fingerprint` to key the cache to the file version.
+
+    `parse_dates` columns are parsed with DATE_FORMAT once, inside the cached
+    read; `dtypes` are (column, dtype) pairs passed to the parser.
+    """
     if not path.exists():
         return None
     try:
-        return pd.read_csv(path)
+        return pd.read_csv(
+            path,
+            usecols=list(usecols) if usecols is not None else None,
+            parse_dates=list(parse_dates) if parse_dates else None,
+            date_format=DATE_FORMAT if parse_dates else None,
+            dtype=dict(dtypes) if dtypes else None
+        )
     except Exception as e:
         st.warning(f"Could not read {path.name}: {e}")
         return None
 
+def file_fingerprint(path: Path):
+    """(mtime, size) of a file, used to invalidate caches when a run rewrites it."""
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def read_csv_header(path: Path, fingerprint):
+    return list(pd.read_csv(path, nrows=0).columns)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def open_arrow_table(path_str: str, fingerprint):
+    """Memory-map an Arrow IPC file once per server process."""
+    source = pa.memory_map(path_str, "r")
+    return pa.ipc.open_file(source).read_all()
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def open_shared_frame(path_str: str, fingerprint, columns=None):
+    """Pandas view of a mapped Arrow file, pruned to `columns`, shared by all sessions.
+
+    Numeric columns without nulls stay zero-copy views of the mapped file;
+    the remaining columns are converted once per column set.
+    """
+    table = open_arrow_table(path_str, fingerprint)
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.schema.names])
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+def clean_csv_path(name: str):
+    """CSV of clean dataset `name`: in data/clean, or the selected archived run's copy (None if it has none).
+
+    Archived files are restored into data/archive/cache on first use, then
+    read like any other CSV (same read_csv_if_exists cache).
+    """
+    if ARCHIVE_RUN is None:
+        return CLEAN_DIR / f"{name}.csv"
+    path = run_file_path(ARCHIVE_RUN, f"{name}.csv")
+    return Path(path) if path is not None else None
+
+def read_clean_dataset(name: str, columns=None):
+    """Clean dataset `name` (only `columns` if given) from the shared Arrow copy or the CSV.
+
+    Requested columns missing from the file are skipped, so callers keep
+    their usual `'col' in df.columns` checks.
+    """
+    columns = tuple(columns) if columns is not None else None
+    arrow_path = CLEAN_DIR / f"{name}.arrow"
+    if ARCHIVE_RUN is None and pa is not None and arrow_path.exists():
+        try:
+            # shallow copy: sessions can add/replace columns without touching the shared frame
+            fingerprint = file_fingerprint(arrow_path)
+            return open_shared_frame(str(arrow_path), fingerprint, columns).copy(deep=False)
+        except Exception as e:
+            st.warning(f"Could not map {arrow_path.name}, reading CSV instead: {e}")
+
+    csv_path = clean_csv_path(name)
+    if csv_path is None or not csv_path.exists():
+        return None
+    fingerprint = file_fingerprint(csv_path)
+    header = read_csv_header(csv_path, fingerprint)
+    if columns is not None:
+        columns = tuple(c for c in columns if c in header)
+    present = columns if columns is not None else header
+    dates = tuple(c for c in DATE_COLUMNS if c in present)
+    return read_csv_if_exists(csv_path, usecols=columns, fingerprint=fingerprint, parse_dates=dates,
+                              dtypes=clean_dataset_dtypes(name, present))
+
+def clean_dataset_dtypes(name: str, columns):
+    """(column, dtype) pairs for reading clean CSV `name`: its recorded schema, else just the categoricals.
+
+    The schema written by transform.py describes data/clean only, so archived
+    runs get the categoricals alone.
+    """
+    schema_path = CLEAN_DIR / f"{name}.schema.json"
+    dtypes = {c: "category" for c in CATEGORY_COLUMNS if c in columns}
+    if ARCHIVE_RUN is None and schema_path.exists():
+        try:
+            with open(schema_path, "r", encoding="utf-8") as f:
+                dtypes = schema_dtypes(json.load(f), columns)
+        except Exception:
+            pass
+    return tuple(sorted(dtypes.items()))
+
+def clean_dataset_fingerprint(name: str):
+    """Fingerprint of the file read_clean_dataset would use for `name`."""
+    arrow_path = CLEAN_DIR / f"{name}.arrow"
+    if ARCHIVE_RUN is None and pa is not None and arrow_path.exists():
+        return file_fingerprint(arrow_path)
+    csv_path = clean_csv_path(name)
+    return file_fingerprint(csv_path) if csv_path is not None and csv_path.exists() else None
+
+@st.cache_data(ttl=300, show_spinner=False)
+def read_store_index(name: str, fingerprint):
+    """{store: (start, stop)} row offsets written by transform.py, or None."""
+    path = CLEAN_DIR / f"{name}.store_index.json"
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        return index["rows"], {int(k): tuple(v) for k, v in index["stores"].items()}
+    except Exception:
+        return None
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def get_store_slice(_frame: pd.DataFrame, fingerprint, columns, store, start, stop):
+    """One store's date-ordered rows: an O(1) positional slice, cached per store."""
+    return _frame.iloc[start:stop]
+
+@st.cache_data(ttl=300, show_spinner=False)
+def read_correlation_matrix(name: str, fingerprint):
+    """Correlation matrix from the statistics transform.py saved, or None."""
+    path = CLEAN_DIR / f"{name}.corr_stats.json"
+    if not path.exists():
+        return None
+    try:
+        return correlation_matrix(load_stats(path))
+    except Exception:
+        return None
+
+def read_sample(name: str, kind: str = "stratified"):
+    """Pre-built sample of a clean dataset ("reservoir" or "stratified"), or None."""
+    path = CLEAN_DIR / "samples" / f"{name}.{kind}.csv"
+    if ARCHIVE_RUN is not None or not path.exists():
+        return None
+    fingerprint = file_fingerprint(path)
+    dates = tuple(c for c in DATE_COLUMNS if c in read_csv_header(path, fingerprint))
+    return read_csv_if_exists(path, fingerprint=fingerprint, parse_dates=dates)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def read_sales_box_summaries(name: str, fingerprint):
+    """Box-plot statistics per sketch group ("overall", "store", "dept"), or None."""
+    path = CLEAN_DIR / f"{name}.sales_sketches.json"
+    if not path.exists():
+        return None
+    try:
+        sketches = load_sketches(path)
+    except Exception:
+        return None
+    summaries = {"overall": {"All Stores": box_summary(sketches["overall"])}}
+    for group in ("store", "dept"):
+        summaries[group] = {
+            key: box_summary(digest)
+            for key, digest in sorted(sketches.get(group, {}).items(), key=lambda item: int(float(item[0])))
+        }
+    return summaries
+
+@st.cache_data(ttl=300, show_spinner=False)
+def read_ranking_index(name: str, fingerprint):
+    """Top-K rankings and sales windows transform.py saved, or None."""
+    path = CLEAN_DIR / f"{name}.ranking.json"
+    if not path.exists():
+        return None
+    try:
+        return load_index(path)
+    except Exception:
+        return None
+
+def get_ranking_index(name: str = "full_dataset_clean"):
+    if ARCHIVE_RUN is not None:
+        return None  # built for the current data only
+    path = CLEAN_DIR / f"{name}.ranking.json"
+    return read_ranking_index(name, file_fingerprint(path) if path.exists() else None)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def read_archive_runs(fingerprint):
+    """Archived runs listed in data/archive/index.json, newest first."""
+    index = read_archive_index()
+    return index["runs"] if index else []
+
+def count_clean_rows(name: str):
+    """Row count of a clean dataset without loading all of its columns."""
+    arrow_path = CLEAN_DIR / f"{name}.arrow"
+    if ARCHIVE_RUN is None and pa is not None and arrow_path.exists():
+        try:
+            return open_arrow_table(str(arrow_path), file_fingerprint(arrow_path)).num_rows
+        except Exception:
+            pass
+    csv_path = clean_csv_path(name)
+    if csv_path is None or not csv_path.exists():
+        return None
+    header = read_csv_header(csv_path, file_fingerprint(csv_path))
+    df = read_csv_if_exists(csv_path, usecols=tuple(header[:1]), fingerprint=file_fingerprint(csv_path))
+    return None if df is None else len(df)
+
+# ---------------------------
+# Streaming upload
+# ---------------------------
+UPLOAD_COPY_BYTES = 8 * 1024 * 1024
+UPLOAD_CHUNK_ROWS = 100000
+UPLOAD_PREVIEW_ROWS = 100
+# .part files older than this are left over from sessions that never saved
+UPLOAD_PART_MAX_AGE = 3600
+# Expected layout of the Kaggle files extract.py / transform.py read
+RAW_SCHEMAS = {
+    "train.csv": {"columns": ["Store", "Dept", "Date", "Weekly_Sales", "IsHoliday"],
+                  "numeric": ["Store", "Dept", "Weekly_Sales"]},
+    "test.csv": {"columns": ["Store", "Dept", "Date", "IsHoliday"],
+                 "numeric": ["Store", "Dept"]},
+    "features.csv": {"columns": ["Store", "Date", "Temperature", "Fuel_Price",
+                                 "MarkDown1", "MarkDown2", "MarkDown3", "MarkDown4", "MarkDown5",
+                                 "CPI", "Unemployment", "IsHoliday"],
+                     "numeric": ["Store", "Temperature", "Fuel_Price",
+                                 "MarkDown1", "MarkDown2", "MarkDown3", "MarkDown4", "MarkDown5",
+                                 "CPI", "Unemployment"]},
+    "stores.csv": {"columns": ["Store", "Type", "Size"], "numeric": ["Store", "Size"]},
+}
+
+def upload_part_path(target_path: Path):
+    """Where an upload is spooled before it is saved (not matched by the *.csv globs)."""
+    return target_path.with_name(target_path.name + ".part")
+
+def stream_upload(uploaded, part_path: Path):
+    """Copy an uploaded file to disk in fixed-size blocks instead of one buffer copy."""
+    uploaded.seek(0)
+    with open(part_path, "wb") as f:
+        shutil.copyfileobj(uploaded, f, UPLOAD_COPY_BYTES)
+
+def discard_upload_part():
+    """Delete this session's spooled .part file, if any."""
+    entry = st.session_state.pop("upload_part", None)
+    if entry:
+        Path(entry[1]).unlink(missing_ok=True)
+
+@st.cache_resource(show_spinner=False)
+def sweep_upload_parts():
+    """Delete stale .part files in data/raw once per server start.
+
+    Only files older than UPLOAD_PART_MAX_AGE go, so another session's
+    upload survives; a session whose file was swept spools it again.
+    """
+    cutoff = time.time() - UPLOAD_PART_MAX_AGE
+    for path in RAW_DIR.glob("*.part"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+    return True
+
+@st.cache_data(ttl=300, show_spinner=False)
+def profile_csv(path_str: str, fingerprint, schema_name=None):
+    """Row count, null counts, schema problems and the first rows of a CSV, one chunk at a time."""
+    schema = RAW_SCHEMAS.get(schema_name)
+    rows, columns, preview, nulls = 0, [], None, None
+    non_numeric = {}
+    for chunk in pd.read_csv(path_str, chunksize=UPLOAD_CHUNK_ROWS):
+        chunk.columns = [str(c).strip() for c in chunk.columns]
+        if preview is None:
+            columns = list(chunk.columns)
+            preview = chunk.head(UPLOAD_PREVIEW_ROWS)
+            nulls = chunk.isnull().sum()
+        else:
+            nulls = nulls.add(chunk.isnull().sum(), fill_value=0)
+        rows += len(chunk)
+        for col in (schema["numeric"] if schema else []):
+            if col in chunk.columns:
+                values = chunk[col]
+                bad = int((pd.to_numeric(values, errors="coerce").isna() & values.notna()).sum())
+                non_numeric[col] = non_numeric.get(col, 0) + bad
+
+    problems = []
+    if schema:
+        missing = [c for c in schema["columns"] if c not in columns]
+        unexpected = [c for c in columns if c not in schema["columns"]]
+        if missing:
+            problems.append(f"Missing columns: {', '.join(missing)}")
+        if unexpected:
+            problems.append(f"Unexpected columns: {', '.join(unexpected)}")
+        problems.extend(
+            f"{col}: {count:,} non-numeric values" for col, count in non_numeric.items() if count
+        )
+    return {
+        "rows": rows,
+        "columns": columns,
+        "nulls": {} if nulls is None else {c: int(n) for c, n in nulls.items()},
+        "preview": preview if preview is not None else pd.DataFrame(),
+        "schema_checked": schema is not None,
+        "problems": problems,
+    }
+
 def safe_to_csv(df: pd.DataFrame, out_path: Path):
     out_path.parent.mkdir(parents=True, exist_ok=True)
     df.to_csv(out_path, index=False)
 
-def run_etl_pipeline():
-    """Execute the etl_pipeline.py script and return (stdout, stderr, returncode)."""
-    if not PIPELINE_SCRIPT.exists():
-        return None, f"Pipeline script not found at {PIPELINE_SCRIPT}", 1
-
-    proc = subprocess.Popen(
-        ["python", str(PIPELINE_SCRIPT)],
-        cwd=str(PROJECT_ROOT),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    stdout, stderr = proc.communicate()
-    return stdout, stderr, proc.returncode
+def render_job_status(job):
+    """Progress of a background pipeline job, from its progress events (call inside `with st.sidebar`)."""
+    stages = job_progress(job["id"])
+    planned = stages.get("pipeline", {}).get("stages", [])
+    done = sum(1 for name in planned if stages.get(name, {}).get("status") == "completed")
+
+    status_icons = {"running": "🔄", "completed": "✅", "failed": "❌", "lost": "⚠️"}
+    st.markdown(f"{status_icons.get(job['status'], '•')} **Job {job['id']}** — {job['status']}")
+    st.caption(f"Started {job['started_at']}" + (f", finished {job['finished_at']}" if job.get("finished_at") else ""))
+    if planned:
+        st.progress(1.0 if job["status"] == "completed" else done / len(planned))
+
+    for name in planned:
+        event = stages.get(name)
+        if event is None:
+            continue
+        line = f"`{name}` {event['status']}"
+        if event.get("rows") is not None:
+            line += f" · {event['rows']:,} rows"
+        if event.get("rows_per_sec"):
+            line += f" · {event['rows_per_sec']:,} rows/s"
+        st.markdown(line)
+
+    if job["status"] != "running":
+        output = tail_output(job["id"])
+        if output:
+            with st.expander("📄 View output"):
+                st.code(output, language="text")
 
 def get_db_engine(cfg: dict):
     """Create SQLAlchemy engine from db_config structure."""
@@ -453,6 +780,33 @@ def calculate_data_quality_score(df):
     score = (completeness * 0.6 + uniqueness * 0.4)
     return round(score, 2)
 
+@st.cache_data(ttl=300, show_spinner=False)
+def profile_clean_dataset(name: str, archive_run, fingerprint):
+    """Whole-table quality figures of clean dataset `name`, or None.
+
+    Missing values, duplicates, dtypes and the summary need every column,
+    so they are computed once per file version instead of on every rerun.
+    """
+    df = read_clean_dataset(name)
+    if df is None or df.empty:
+        return None
+    summary = df.describe(include='all').T
+    summary['null_count'] = df.isnull().sum()
+    summary['null_pct'] = (summary['null_count'] / len(df) * 100).round(2)
+    return {
+        "rows": len(df),
+        "columns": len(df.columns),
+        "missing": int(df.isnull().sum().sum()),
+        "duplicates": int(df.duplicated().sum()),
+        "score": calculate_data_quality_score(df),
+        "dtype_counts": df.dtypes.astype(str).value_counts(),
+        "summary": summary,
+        "preview": df.sample(min(500, len(df))),
+    }
+
+def get_dataset_profile(name: str = "full_dataset_clean"):
+    return profile_clean_dataset(name, ARCHIVE_RUN, clean_dataset_fingerprint(name))
+
 def get_quality_badge(score):
     """Return HTML badge based on quality score."""
     if score >= 90:
@@ -523,44 +877,50 @@ st.sidebar.markdown("---")
 # ETL Controls
 st.sidebar.markdown("#### ⚙️ ETL Operations")
 
+pipeline_state = run_status()
+if pipeline_state["queue"] and pipeline_state["lock"] is None:
+    # a queued run whose dispatcher went away (e.g. dashboard restart): start it now
+    dispatch_next()
+    pipeline_state = run_status()
+
 if st.sidebar.button("🚀 Run Full ETL Pipeline", use_container_width=True):
-    progress_bar = st.sidebar.progress(0)
-    status_text = st.sidebar.empty()
-    
-    status_text.text("🔄 Initializing pipeline...")
-    progress_bar.progress(10)
-    time.sleep(0.5)
-    
-    status_text.text("📥 Extracting data...")
-    progress_bar.progress(30)
-    
-    with st.spinner("Running ETL pipeline..."):
-        stdout, stderr, rc = run_etl_pipeline()
-        progress_bar.progress(70)
-        status_text.text("🔄 Transforming data...")
-        time.sleep(0.3)
-        
-        progress_bar.progress(90)
-        status_text.text("💾 Loading to database...")
-        time.sleep(0.3)
-        
-        progress_bar.progress(100)
-        
-        if rc == 0:
-            status_text.text("✅ Pipeline completed successfully!")
-            st.sidebar.success("ETL pipeline finished successfully!")
-            st.balloons()
+    if not PIPELINE_SCRIPT.exists():
+        st.sidebar.error(f"Pipeline script not found at {PIPELINE_SCRIPT}")
+    else:
+        # runs in the background, one at a time: this rerun (and every other session) carries on
+        outcome, detail = request_run()
+        if outcome == "started":
+            st.sidebar.success(f"Started pipeline job {detail['id']}")
+        elif outcome == "coalesced":
+            st.sidebar.info(f"Same run already queued (position {detail}); requests merged")
         else:
-            status_text.text("❌ Pipeline failed")
-            # sanitize stderr/rc info
-            st.sidebar.error(f"ETL pipeline failed (code {rc})")
-        
-        if stdout:
-            with st.sidebar.expander("📄 View stdout"):
-                st.code(stdout, language="text")
-        if stderr:
-            with st.sidebar.expander("⚠️ View stderr"):
-                st.code(stderr, language="text")
+            st.sidebar.info(f"Another run is in progress; queued at position {detail}")
+        pipeline_state = run_status()
+
+# Poll the job's progress file without rerunning the whole app
+_fragment = getattr(st, "fragment", None)
+
+def pipeline_status_panel(polling=False):
+    state = run_status()
+    if state["job"] is not None:
+        render_job_status(state["job"])
+    if state["lock"] is not None and (state["job"] is None or state["lock"].get("owner") != state["job"]["id"]):
+        st.caption(f"🔒 Pipeline running outside the dashboard (pid {state['lock']['pid']}, since {state['lock']['acquired_at']})")
+    if state["queue"]:
+        st.caption(f"⏳ {len(state['queue'])} run(s) queued, next requested {state['queue'][0]['requested_at']}")
+    if polling and state["lock"] is None and (state["job"] is None or state["job"]["status"] != "running") and not state["queue"]:
+        st.rerun()  # all runs ended: one full rerun shows fresh data and stops polling
+
+pipeline_busy = (
+    pipeline_state["lock"] is not None
+    or bool(pipeline_state["queue"])
+    or (pipeline_state["job"] is not None and pipeline_state["job"]["status"] == "running")
+)
+with st.sidebar:
+    if _fragment is not None and pipeline_busy:
+        _fragment(run_every=2)(pipeline_status_panel)(polling=True)
+    else:
+        pipeline_status_panel()
 
 # Quick Actions
 st.sidebar.markdown("#### ⚡ Quick Actions")
@@ -572,6 +932,7 @@ with col1:
 with col2:
     if st.button("🧹 Clear Cache", use_container_width=True):
         st.cache_data.clear()
+        st.cache_resource.clear()
         st.sidebar.success("Cache cleared!")
 
 # Data Info
@@ -586,6 +947,20 @@ st.sidebar.metric("Raw Files", raw_count, delta=None)
 st.sidebar.metric("Clean Files", clean_count, delta=None)
 st.sidebar.metric("Log Files", log_count, delta=None)
 
+# Time travel: every section reads the selected archived run instead of data/clean
+archive_index_path = Path(ARCHIVE_INDEX_FILE)
+archive_runs = read_archive_runs(file_fingerprint(archive_index_path) if archive_index_path.exists() else None)
+version_options = {"Current (data/clean)": None}
+for run in archive_runs:
+    full_entry = run["files"].get("full_dataset_clean.csv") or next(iter(run["files"].values()), {})
+    rows = f"{full_entry['rows']:,} rows" if full_entry.get("rows") is not None else "? rows"
+    until = f", to {full_entry['date_max']}" if full_entry.get("date_max") else ""
+    version_options[f"{run['run_id']} ({rows}{until})"] = run["run_id"]
+version_label = st.sidebar.selectbox("Data Version", list(version_options), key="data_version")
+ARCHIVE_RUN = version_options[version_label]
+if ARCHIVE_RUN is not None:
+    st.sidebar.caption(f"🕰️ Showing archived run {ARCHIVE_RUN}; precomputed summaries are skipped")
+
 # Recent Activity (simulated)
 st.sidebar.markdown("---")
 st.sidebar.markdown("#### 🕐 Recent Activity")
@@ -602,17 +977,42 @@ st.sidebar.caption("🏗️ Built for Production ETL Workflows")
 st.sidebar.caption("Version 2.0 | Last Updated: 2025")
 
 # ---------------------------
-# Load Data
+# Lazy data access
 # ---------------------------
-sales_df = read_csv_if_exists(CLEAN_DIR / "sales_clean.csv")
-features_df = read_csv_if_exists(CLEAN_DIR / "features_clean.csv")
-stores_df = read_csv_if_exists(CLEAN_DIR / "stores_clean.csv")
-full_df = read_csv_if_exists(CLEAN_DIR / "full_dataset_clean.csv")
+CLEAN_DATASETS = {
+    "sales": "sales_clean",
+    "features": "features_clean",
+    "stores": "stores_clean",
+    "full": "full_dataset_clean",
+}
+# Columns of full_dataset_clean each panel renders. Whole-table checks
+# (quality score, missing values, duplicates) use get_dataset_profile.
+PANEL_COLUMNS = {
+    "overview": ("weekly_sales",),
+    "insights": ("store", "sale_date", "weekly_sales"),
+    "store_trend": ("store", "sale_date", "weekly_sales"),
+    "top_stores": ("store", "weekly_sales"),
+    "sales_distribution": ("weekly_sales",),
+    "correlation": (
+        "store", "dept", "weekly_sales", "temperature", "fuel_price",
+        "markdown1", "markdown2", "markdown3", "markdown4", "markdown5",
+        "cpi", "unemployment", "size",
+    ),
+    "seasonal": ("month", "quarter", "weekly_sales"),
+}
+_datasets = {}
+
+def get_dataset(key: str, columns=None):
+    """Load a clean dataset (or a column projection) the first time a section asks for it in this rerun."""
+    memo_key = (key, tuple(columns) if columns is not None else None)
+    if memo_key not in _datasets:
+        _datasets[memo_key] = read_clean_dataset(CLEAN_DATASETS[key], columns)
+    return _datasets[memo_key]
 
 # ---------------------------
 # Tabs
 # ---------------------------
-tabs = st.tabs([
+TAB_LABELS = [
     "📊 Dashboard",
     "📈 Advanced Analytics",
     "🎯 Data Quality",
@@ -622,22 +1022,36 @@ tabs = st.tabs([
     "🔍 Insights",
     "🔥 Big Data Tech",
     "🗂️ SQL Design"
-])
+]
+# Only the selected section runs, so a rerun never loads data or builds
+# charts for sections that are not on screen.
+active_tab = st.radio(
+    "Section",
+    TAB_LABELS,
+    horizontal=True,
+    label_visibility="collapsed",
+    key="active_tab"
+)
 
 # ---------------------------
 # Dashboard Tab
 # ---------------------------
-with tabs[0]:
+if active_tab == TAB_LABELS[0]:
+    sales_rows = count_clean_rows("sales_clean")
+    feature_rows = count_clean_rows("features_clean")
+    store_rows = count_clean_rows("stores_clean")
+    full_df = get_dataset("full", PANEL_COLUMNS["overview"])
+    profile = get_dataset_profile()
     st.markdown("### 📊 Executive Dashboard")
     
     # KPI Metrics Row
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        if sales_df is not None:
+        if sales_rows is not None:
             st.markdown(display_metric_card(
                 "Total Sales Records",
-                f"{len(sales_df):,}",
+                f"{sales_rows:,}",
                 color="blue"
             ), unsafe_allow_html=True)
         else:
@@ -648,10 +1062,10 @@ with tabs[0]:
             ), unsafe_allow_html=True)
     
     with col2:
-        if features_df is not None:
+        if feature_rows is not None:
             st.markdown(display_metric_card(
                 "Feature Records",
-                f"{len(features_df):,}",
+                f"{feature_rows:,}",
                 color="green"
             ), unsafe_allow_html=True)
         else:
@@ -662,10 +1076,10 @@ with tabs[0]:
             ), unsafe_allow_html=True)
     
     with col3:
-        if stores_df is not None:
+        if store_rows is not None:
             st.markdown(display_metric_card(
                 "Active Stores",
-                f"{len(stores_df):,}",
+                f"{store_rows:,}",
                 color="purple"
             ), unsafe_allow_html=True)
         else:
@@ -701,12 +1115,12 @@ with tabs[0]:
     st.markdown("---")
     
     # Data Quality Overview
-    if full_df is not None:
+    if profile is not None:
         st.markdown("### 🎯 Data Quality Overview")
         
         col1, col2, col3 = st.columns(3)
         
-        quality_score = calculate_data_quality_score(full_df)
+        quality_score = profile["score"]
         
         with col1:
             st.markdown(f"""
@@ -718,18 +1132,18 @@ with tabs[0]:
             """, unsafe_allow_html=True)
         
         with col2:
-            completeness = (1 - full_df.isnull().sum().sum() / (full_df.shape[0] * full_df.shape[1])) * 100
+            completeness = (1 - profile["missing"] / (profile["rows"] * profile["columns"])) * 100
             st.markdown(f"""
             <div class="info-card">
                 <h3>Data Completeness</h3>
                 <div style="font-size: 3em; font-weight: bold; color: #2ca02c;">{completeness:.1f}%</div>
-                <p>Missing values: {full_df.isnull().sum().sum():,}</p>
+                <p>Missing values: {profile["missing"]:,}</p>
             </div>
             """, unsafe_allow_html=True)
         
         with col3:
-            duplicates = full_df.duplicated().sum()
-            uniqueness = (1 - duplicates / len(full_df)) * 100
+            duplicates = profile["duplicates"]
+            uniqueness = (1 - duplicates / profile["rows"]) * 100
             st.markdown(f"""
             <div class="info-card">
                 <h3>Data Uniqueness</h3>
@@ -742,20 +1156,24 @@ with tabs[0]:
         
         # Quick Preview
         st.markdown("### 🔍 Data Preview (Sample)")
+        preview_df = read_sample("full_dataset_clean", "stratified")
+        if preview_df is None:
+            preview_df = profile["preview"]
         st.dataframe(
-            full_df.sample(min(500, len(full_df))),
+            preview_df.head(500),
             use_container_width=True,
             height=400
         )
         
-        # Download option
-        csv = full_df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Download Full Dataset",
-            data=csv,
-            file_name=f"retail_sales_data_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv",
-        )
+        # Download option: the clean CSV as written, not a re-serialised frame
+        csv_path = clean_csv_path("full_dataset_clean")
+        if csv_path is not None and csv_path.exists():
+            st.download_button(
+                label="📥 Download Full Dataset",
+                data=csv_path.read_bytes(),
+                file_name=f"retail_sales_data_{datetime.now().strftime('%Y%m%d')}.csv",
+                mime="text/csv",
+            )
     else:
         st.info("⚠️ No data available. Please run the ETL pipeline to generate clean datasets.")
         st.markdown("""
@@ -773,29 +1191,35 @@ with tabs[0]:
 # ---------------------------
 # Advanced Analytics Tab
 # ---------------------------
-with tabs[1]:
+if active_tab == TAB_LABELS[1]:
+    trend_df = get_dataset("full", PANEL_COLUMNS["store_trend"])
     st.markdown("### 📈 Advanced Analytics")
     
-    if full_df is None:
+    if trend_df is None:
         st.warning("⚠️ No data available. Run the ETL pipeline first.")
     else:
-        # Convert dates safely
-        if 'sale_date' in full_df.columns:
-            if not np.issubdtype(full_df["sale_date"].dtype, np.datetime64):
-                full_df["sale_date"] = pd.to_datetime(full_df["sale_date"], errors="coerce")
-        else:
+        # sale_date arrives as datetime64 from the clean dataset readers
+        if 'sale_date' not in trend_df.columns:
             # add placeholder column to avoid crashing visual code paths
-            full_df['sale_date'] = pd.to_datetime(pd.Series([None]*len(full_df)))
+            trend_df['sale_date'] = pd.to_datetime(pd.Series([None]*len(trend_df)))
         
         # Time Series Analysis
         st.markdown("#### 📅 Time Series Analysis")
         
         col1, col2 = st.columns([2, 1])
         
+        # store -> row range of the store-sorted dataset (None for older artifacts)
+        trend_fp = clean_dataset_fingerprint("full_dataset_clean")
+        store_index = read_store_index("full_dataset_clean", trend_fp) if ARCHIVE_RUN is None else None
+        if store_index is not None and store_index[0] != len(trend_df):
+            store_index = None
+        
         with col2:
             # protect unique stores
-            if 'store' in full_df.columns:
-                stores = sorted(full_df["store"].fillna("Unknown").unique().tolist())
+            if store_index is not None:
+                stores = sorted(store_index[1])
+            elif 'store' in trend_df.columns:
+                stores = sorted(trend_df["store"].fillna("Unknown").unique().tolist())
             else:
                 stores = ["Unknown"]
             selected_store = st.selectbox("🏪 Select Store:", stores, index=0)
@@ -813,7 +1237,11 @@ with tabs[1]:
             )
         
         with col1:
-            store_df = full_df[full_df.get("store", "Unknown") == selected_store].sort_values("sale_date")
+            if store_index is not None and selected_store in store_index[1]:
+                start, stop = store_index[1][selected_store]
+                store_df = get_store_slice(trend_df, trend_fp, PANEL_COLUMNS["store_trend"], selected_store, start, stop)
+            else:
+                store_df = trend_df[trend_df.get("store", "Unknown") == selected_store].sort_values("sale_date")
             
             # Apply time range filter
             if time_range != "All Time" and not store_df.empty:
@@ -888,14 +1316,22 @@ with tabs[1]:
         
         with col1:
             # Top performing stores (protect missing columns)
-            if 'store' in full_df.columns and 'weekly_sales' in full_df.columns:
-                top_stores = full_df.groupby("store", as_index=False)["weekly_sales"].agg([
-                    ('total_sales', 'sum'),
-                    ('avg_sales', 'mean'),
-                    ('max_sales', 'max')
-                ]).reset_index()
-                top_stores = top_stores.sort_values('total_sales', ascending=False).head(10)
-                
+            ranking = get_ranking_index()
+            top_stores = None
+            if ranking is not None:
+                top_stores = top(ranking, "stores", 10).copy()
+            else:
+                # no ranking index (older run): aggregate the dataset
+                top_df = get_dataset("full", PANEL_COLUMNS["top_stores"])
+                if 'store' in top_df.columns and 'weekly_sales' in top_df.columns:
+                    top_stores = top_df.groupby("store", as_index=False)["weekly_sales"].agg([
+                        ('total_sales', 'sum'),
+                        ('avg_sales', 'mean'),
+                        ('max_sales', 'max')
+                    ]).reset_index()
+                    top_stores = top_stores.sort_values('total_sales', ascending=False).head(10)
+            
+            if top_stores is not None:
                 # Convert to native Python types
                 top_stores['store'] = top_stores['store'].astype(str)
                 top_stores['total_sales'] = top_stores['total_sales'].astype(float)
@@ -914,31 +1350,70 @@ with tabs[1]:
                 st.info("Not enough data to compute top stores.")
         
         with col2:
-            # Sales distribution - sample for performance
-            if 'weekly_sales' in full_df.columns:
-                sample_df = full_df.head(10000).copy()
-                sample_df['weekly_sales'] = sample_df['weekly_sales'].astype(float)
-                
-                fig = px.box(
-                    sample_df,
-                    y='weekly_sales',
-                    title='Sales Distribution Across All Stores',
-                    color_discrete_sequence=['#667eea']
+            # Sales distribution - from the quantile sketches transform.py saved
+            sketch_path = CLEAN_DIR / "full_dataset_clean.sales_sketches.json"
+            summaries = read_sales_box_summaries(
+                "full_dataset_clean",
+                file_fingerprint(sketch_path) if sketch_path.exists() else None
+            ) if ARCHIVE_RUN is None else None
+            if summaries is not None:
+                group_labels = {"All Stores": "overall", "By Store": "store", "By Department": "dept"}
+                group_label = st.selectbox("Distribution", list(group_labels), key="dist_group")
+                boxes = summaries[group_labels[group_label]]
+                fig = go.Figure(go.Box(
+                    x=list(boxes),
+                    q1=[b['q1'] for b in boxes.values()],
+                    median=[b['median'] for b in boxes.values()],
+                    q3=[b['q3'] for b in boxes.values()],
+                    lowerfence=[b['lowerfence'] for b in boxes.values()],
+                    upperfence=[b['upperfence'] for b in boxes.values()],
+                    mean=[b['mean'] for b in boxes.values()],
+                    marker_color='#667eea',
+                    name='weekly_sales'
+                ))
+                fig.update_layout(
+                    title=f'Sales Distribution ({group_label}, all {sum(b["count"] for b in boxes.values()):,} rows)',
+                    yaxis_title='weekly_sales',
+                    height=400
                 )
-                fig.update_layout(height=400)
                 st.plotly_chart(fig, use_container_width=True)
             else:
-                st.info("No 'weekly_sales' column available for distribution plot.")
+                # no sketches (older run): fall back to the pre-built uniform sample
+                dist_df = read_sample("full_dataset_clean", "reservoir")
+                if dist_df is None:
+                    dist_df = get_dataset("full", PANEL_COLUMNS["sales_distribution"]).head(10000)
+                if 'weekly_sales' in dist_df.columns:
+                    sample_df = dist_df[['weekly_sales']].copy()
+                    sample_df['weekly_sales'] = sample_df['weekly_sales'].astype(float)
+                    
+                    fig = px.box(
+                        sample_df,
+                        y='weekly_sales',
+                        title='Sales Distribution Across All Stores',
+                        color_discrete_sequence=['#667eea']
+                    )
+                    fig.update_layout(height=400)
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.info("No 'weekly_sales' column available for distribution plot.")
         
         st.markdown("---")
         
         # Correlation Analysis
         st.markdown("#### 🔗 Feature Correlation Matrix")
         
-        numeric = full_df.select_dtypes(include=[np.number]).fillna(0)
-        if numeric.shape[1] > 1:
-            corr = numeric.corr()
-            
+        stats_path = CLEAN_DIR / "full_dataset_clean.corr_stats.json"
+        corr = read_correlation_matrix(
+            "full_dataset_clean",
+            file_fingerprint(stats_path) if stats_path.exists() else None
+        ) if ARCHIVE_RUN is None else None
+        if corr is None:
+            # no precomputed statistics (older run): compute from the data
+            corr_df = get_dataset("full", PANEL_COLUMNS["correlation"])
+            numeric = corr_df.select_dtypes(include=[np.number]).fillna(0)
+            corr = numeric.corr() if numeric.shape[1] > 1 else None
+        
+        if corr is not None:
             # Convert to native Python types for JSON serialization
             corr_values = corr.values.tolist()
             corr_columns = corr.columns.tolist()
@@ -959,16 +1434,14 @@ with tabs[1]:
         st.markdown("---")
         
         # Seasonal Analysis
-        if 'sale_date' in full_df.columns and 'weekly_sales' in full_df.columns:
+        seasonal_df = get_dataset("full", PANEL_COLUMNS["seasonal"])
+        if {'month', 'quarter', 'weekly_sales'}.issubset(seasonal_df.columns):
             st.markdown("#### 📆 Seasonal Analysis")
             
-            full_df['month'] = pd.to_datetime(full_df['sale_date']).dt.month
-            full_df['quarter'] = pd.to_datetime(full_df['sale_date']).dt.quarter
-            
             col1, col2 = st.columns(2)
             
             with col1:
-                monthly_avg = full_df.groupby('month')['weekly_sales'].mean().reset_index()
+                monthly_avg = seasonal_df.groupby('month')['weekly_sales'].mean().reset_index()
                 # Convert to native Python types
                 monthly_avg['month'] = monthly_avg['month'].astype(int)
                 monthly_avg['weekly_sales'] = monthly_avg['weekly_sales'].astype(float)
@@ -985,7 +1458,7 @@ with tabs[1]:
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
-                quarterly_sales = full_df.groupby('quarter')['weekly_sales'].sum().reset_index()
+                quarterly_sales = seasonal_df.groupby('quarter')['weekly_sales'].sum().reset_index()
                 # Convert to native Python types - CRITICAL for pie charts
                 quarterly_sales['quarter'] = quarterly_sales['quarter'].astype(int).astype(str)
                 quarterly_sales['weekly_sales'] = quarterly_sales['weekly_sales'].round(2).astype(float)
@@ -1000,12 +1473,16 @@ with tabs[1]:
                 fig.update_layout(height=350)
                 st.plotly_chart(fig, use_container_width=True)
         else:
-            st.info("Seasonal analysis requires 'sale_date' and 'weekly_sales' columns.")
+            st.info("Seasonal analysis requires the 'month', 'quarter' and 'weekly_sales' columns — re-run the ETL pipeline.")
 
 # ---------------------------
 # Data Quality Tab
 # ---------------------------
-with tabs[2]:
+if active_tab == TAB_LABELS[2]:
+    sales_df = get_dataset("sales")
+    features_df = get_dataset("features")
+    stores_df = get_dataset("stores")
+    profile = get_dataset_profile()
     st.markdown("### 🎯 Data Quality Assessment")
     
     if sales_df is None and features_df is None and stores_df is None:
@@ -1018,27 +1495,31 @@ with tabs[2]:
             "Sales": sales_df,
             "Features": features_df,
             "Stores": stores_df,
-            "Full Dataset": full_df
         }
         
         quality_data = []
         for name, df in datasets.items():
             if df is not None:
-                score = calculate_data_quality_score(df)
-                missing = df.isnull().sum().sum()
-                duplicates = df.duplicated().sum()
-                rows = len(df)
-                cols = len(df.columns)
-                
                 quality_data.append({
                     "Dataset": name,
-                    "Rows": rows,
-                    "Columns": cols,
-                    "Quality Score": score,
-                    "Missing Values": missing,
-                    "Duplicates": duplicates,
-                    "Status": "✅" if score >= 80 else "⚠️" if score >= 60 else "❌"
+                    "Rows": len(df),
+                    "Columns": len(df.columns),
+                    "Quality Score": calculate_data_quality_score(df),
+                    "Missing Values": df.isnull().sum().sum(),
+                    "Duplicates": df.duplicated().sum(),
                 })
+        if profile is not None:
+            quality_data.append({
+                "Dataset": "Full Dataset",
+                "Rows": profile["rows"],
+                "Columns": profile["columns"],
+                "Quality Score": profile["score"],
+                "Missing Values": profile["missing"],
+                "Duplicates": profile["duplicates"],
+            })
+        for row in quality_data:
+            score = row["Quality Score"]
+            row["Status"] = "✅" if score >= 80 else "⚠️" if score >= 60 else "❌"
         
         quality_df = pd.DataFrame(quality_data) if quality_data else pd.DataFrame([])
         
@@ -1157,8 +1638,8 @@ with tabs[2]:
         # Data type analysis
         st.markdown("#### 🔤 Data Type Distribution")
         
-        if full_df is not None:
-            dtype_counts = full_df.dtypes.value_counts().reset_index()
+        if profile is not None:
+            dtype_counts = profile["dtype_counts"].reset_index()
             dtype_counts.columns = ['Data Type', 'Count']
             
             # Convert to native Python types
@@ -1182,12 +1663,8 @@ with tabs[2]:
         # Statistical summary
         st.markdown("#### 📊 Statistical Summary")
         
-        if full_df is not None:
-            summary = full_df.describe(include='all').T
-            summary['null_count'] = full_df.isnull().sum()
-            summary['null_pct'] = (summary['null_count'] / len(full_df) * 100).round(2)
-            
-            st.dataframe(summary, use_container_width=True, height=400)
+        if profile is not None:
+            st.dataframe(profile["summary"], use_container_width=True, height=400)
             
             # Download quality report
             report_csv = quality_df.to_csv(index=False).encode('utf-8')
@@ -1207,7 +1684,7 @@ with tabs[2]:
 # Detect Streamlit Cloud environment
 IS_CLOUD = "STREAMLIT_SERVER" in os.environ
 
-with tabs[3]:
+if active_tab == TAB_LABELS[3]:
     st.markdown("### 🗄️ Database Management")
 
     # --- Cloud Blocker (prevents MySQL error on Streamlit Cloud) ---
@@ -1396,7 +1873,7 @@ with tabs[3]:
 # ---------------------------
 # Upload Tab
 # ---------------------------
-with tabs[4]:
+if active_tab == TAB_LABELS[4]:
     st.markdown("### 📤 Data Upload Center")
     
     st.markdown("""
@@ -1423,43 +1900,78 @@ with tabs[4]:
             accept_multiple_files=False,
             help="Upload raw CSV files for ETL processing"
         )
-        
-        if uploaded:
+        sweep_upload_parts()
+        
+        if not uploaded:
+            # uploader cleared: the spooled copy will never be saved
+            discard_upload_part()
+            st.session_state.pop("upload_rejected", None)
+        elif st.session_state.get("upload_rejected", (None,))[0] == uploaded.file_id:
+            # validation already failed and the .part file is gone; keep showing why
+            st.error(st.session_state["upload_rejected"][1])
+        else:
             target_path = RAW_DIR / uploaded.name
+            part_path = upload_part_path(target_path)
             
             # File preview
             try:
-                preview_df = pd.read_csv(uploaded)
+                # spool to disk once per upload; reruns reuse the .part file
+                if st.session_state.get("upload_part") != (uploaded.file_id, str(part_path)) or not part_path.exists():
+                    discard_upload_part()
+                    with st.spinner("Writing upload to disk..."):
+                        stream_upload(uploaded, part_path)
+                    st.session_state["upload_part"] = (uploaded.file_id, str(part_path))
+                
+                with st.spinner("Scanning file..."):
+                    profile = profile_csv(str(part_path), file_fingerprint(part_path), uploaded.name)
                 
                 st.markdown("##### 👀 File Preview")
-                st.dataframe(preview_df.head(100), use_container_width=True)
+                st.caption(f"First {len(profile['preview'])} rows")
+                st.dataframe(profile['preview'], use_container_width=True)
                 
                 # File statistics
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("Rows", f"{len(preview_df):,}")
+                    st.metric("Rows", f"{profile['rows']:,}")
                 with col2:
-                    st.metric("Columns", len(preview_df.columns))
+                    st.metric("Columns", len(profile['columns']))
                 with col3:
                     file_size = uploaded.size / 1024  # KB
                     st.metric("Size", f"{file_size:.1f} KB")
                 with col4:
-                    missing = preview_df.isnull().sum().sum()
+                    missing = sum(profile['nulls'].values())
                     st.metric("Missing Values", f"{missing:,}")
                 
+                # Schema validation
+                if not profile['schema_checked']:
+                    st.info(f"No expected schema for `{uploaded.name}`; columns were not validated.")
+                elif profile['problems']:
+                    st.warning("⚠️ Schema check failed:\n\n" + "\n".join(f"- {p}" for p in profile['problems']))
+                else:
+                    st.success(f"✅ Columns match the expected `{uploaded.name}` layout")
+                
+                if profile['problems']:
+                    # a file that fails validation is not saved: drop the spooled copy now
+                    discard_upload_part()
+                    st.session_state["upload_rejected"] = (
+                        uploaded.file_id, f"❌ `{uploaded.name}` failed validation and was not saved. Fix the file and upload it again."
+                    )
+                    st.error(st.session_state["upload_rejected"][1])
                 # Save button
-                if st.button("💾 Save to Raw Directory", type="primary", use_container_width=True):
+                elif st.button("💾 Save to Raw Directory", type="primary", use_container_width=True):
                     with st.spinner("Saving file..."):
-                        uploaded.seek(0)  # Reset file pointer
-                        with open(target_path, "wb") as f:
-                            f.write(uploaded.getbuffer())
+                        # the upload is already on disk: just move it into place
+                        os.replace(part_path, target_path)
+                        st.session_state.pop("upload_part", None)
                         st.success(f"✅ File saved successfully to: `{target_path}`")
                         st.balloons()
                         time.sleep(1)
                         st.rerun()
                 
             except Exception as e:
-                st.error(f"❌ Failed to read file: {e}")
+                discard_upload_part()
+                st.session_state["upload_rejected"] = (uploaded.file_id, f"❌ Failed to read file: {e}")
+                st.error(st.session_state["upload_rejected"][1])
     
     with col2:
         st.markdown("#### 📊 Upload Statistics")
@@ -1524,7 +2036,7 @@ with tabs[4]:
 # ---------------------------
 # Logs Tab
 # ---------------------------
-with tabs[5]:
+if active_tab == TAB_LABELS[5]:
     st.markdown("### 📋 System Logs")
     
     log_files = sorted([p for p in LOG_DIR.glob("*") if p.is_file()], 
@@ -1637,7 +2149,10 @@ with tabs[5]:
 # ---------------------------
 # Insights Tab
 # ---------------------------
-with tabs[6]:
+if active_tab == TAB_LABELS[6]:
+    full_df = get_dataset("full", PANEL_COLUMNS["insights"])
+    profile = get_dataset_profile()
+    ranking = get_ranking_index()
     st.markdown("### 🔍 AI-Powered Insights")
     
     if full_df is None:
@@ -1660,14 +2175,20 @@ with tabs[6]:
         with col1:
             # Top performing store
             try:
-                top_store = full_df.groupby('store')['weekly_sales'].sum().idxmax()
-                top_store_sales = full_df.groupby('store')['weekly_sales'].sum().max()
+                if ranking is not None:
+                    best = top(ranking, "stores", 1).iloc[0]
+                    top_store, top_store_sales = int(best['store']), best['total_sales']
+                    revenue = ranking['total_sales']
+                else:
+                    store_totals = full_df.groupby('store')['weekly_sales'].sum()
+                    top_store, top_store_sales = store_totals.idxmax(), store_totals.max()
+                    revenue = full_df['weekly_sales'].sum()
                 st.markdown(f"""
                 <div class="info-card">
                     <h5>🏆 Best Performing Store</h5>
                     <p style="font-size: 2em; font-weight: bold; color: #667eea;">Store #{top_store}</p>
                     <p>Total Sales: <strong>${top_store_sales:,.2f}</strong></p>
-                    <p>This store accounts for {(top_store_sales/full_df['weekly_sales'].sum()*100):.1f}% of total revenue</p>
+                    <p>This store accounts for {(top_store_sales/revenue*100):.1f}% of total revenue</p>
                 </div>
                 """, unsafe_allow_html=True)
             except Exception:
@@ -1676,8 +2197,12 @@ with tabs[6]:
         with col2:
             # Sales trend
             try:
-                recent_sales = full_df.nlargest(1000, 'sale_date')['weekly_sales'].mean()
-                older_sales = full_df.nsmallest(1000, 'sale_date')['weekly_sales'].mean()
+                if ranking is not None:
+                    recent_sales = ranking['windows']['recent']['avg_sales']
+                    older_sales = ranking['windows']['older']['avg_sales']
+                else:
+                    recent_sales = full_df.nlargest(1000, 'sale_date')['weekly_sales'].mean()
+                    older_sales = full_df.nsmallest(1000, 'sale_date')['weekly_sales'].mean()
                 trend = ((recent_sales - older_sales) / older_sales * 100)
                 
                 trend_emoji = "📈" if trend > 0 else "📉"
@@ -1703,7 +2228,7 @@ with tabs[6]:
         
         # Check for missing data
         try:
-            missing_pct = (full_df.isnull().sum().sum() / (full_df.shape[0] * full_df.shape[1])) * 100
+            missing_pct = profile["missing"] / (profile["rows"] * profile["columns"]) * 100
             if missing_pct > 5:
                 recommendations.append({
                     "priority": "High",
@@ -1716,7 +2241,10 @@ with tabs[6]:
         
         # Check for low-performing stores
         try:
-            store_sales = full_df.groupby('store')['weekly_sales'].sum()
+            if ranking is not None:
+                store_sales = ranking['stores'].set_index('store')['total_sales']
+            else:
+                store_sales = full_df.groupby('store')['weekly_sales'].sum()
             low_performers = store_sales[store_sales < store_sales.quantile(0.25)]
             if len(low_performers) > 0:
                 recommendations.append({
@@ -1731,7 +2259,7 @@ with tabs[6]:
         # Check data freshness
         if 'sale_date' in full_df.columns:
             try:
-                latest_date = pd.to_datetime(full_df['sale_date']).max()
+                latest_date = full_df['sale_date'].max()
                 days_old = (datetime.now() - latest_date).days
                 if days_old > 30:
                     recommendations.append({
@@ -1745,7 +2273,7 @@ with tabs[6]:
         
         # Add positive recommendations
         try:
-            if calculate_data_quality_score(full_df) > 85:
+            if profile["score"] > 85:
                 recommendations.append({
                     "priority": "Info",
                     "category": "Data Quality",
@@ -1788,15 +2316,15 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 EXECUTIVE SUMMARY
 {'-'*60}
 Total Records: {len(full_df):,}
-Date Range: {pd.to_datetime(full_df['sale_date']).min().strftime('%Y-%m-%d')} to {pd.to_datetime(full_df['sale_date']).max().strftime('%Y-%m-%d')}
+Date Range: {full_df['sale_date'].min().strftime('%Y-%m-%d')} to {full_df['sale_date'].max().strftime('%Y-%m-%d')}
 Total Revenue: ${full_df['weekly_sales'].sum():,.2f}
 Average Weekly Sales: ${full_df['weekly_sales'].mean():,.2f}
 
 DATA QUALITY
 {'-'*60}
-Overall Quality Score: {calculate_data_quality_score(full_df):.2f}%
-Missing Values: {full_df.isnull().sum().sum():,}
-Duplicate Records: {full_df.duplicated().sum():,}
+Overall Quality Score: {profile["score"] if profile else 0:.2f}%
+Missing Values: {profile["missing"] if profile else 0:,}
+Duplicate Records: {profile["duplicates"] if profile else 0:,}
 
 TOP PERFORMING STORES
 {'-'*60}
@@ -1805,7 +2333,10 @@ TOP PERFORMING STORES
                 
                 # Add top stores to report
                 try:
-                    top_10_stores = full_df.groupby('store')['weekly_sales'].sum().sort_values(ascending=False).head(10)
+                    if ranking is not None:
+                        top_10_stores = top(ranking, "stores", 10).set_index('store')['total_sales']
+                    else:
+                        top_10_stores = full_df.groupby('store')['weekly_sales'].sum().sort_values(ascending=False).head(10)
                     for idx, (store, sales) in enumerate(top_10_stores.items(), 1):
                         report_content += f"{idx}. Store #{store}: ${sales:,.2f}\n"
                 except Exception:
@@ -1838,7 +2369,7 @@ RECOMMENDATIONS
 # ---------------------------
 # Big Data Technologies Tab (NEW)
 # ---------------------------
-with tabs[7]:
+if active_tab == TAB_LABELS[7]:
     st.markdown("### 🔥 Big Data Technologies Integration")
     
     st.markdown("""
@@ -2067,7 +2598,7 @@ pandas_df = result_df.toPandas()
         st.markdown("---")
         
         # Performance visualization
-        if full_df is not None:
+        if (CLEAN_DIR / "full_dataset_clean.csv").exists():
             st.markdown("##### ⚡ Processing Time Comparison")
             
             comparison_data = pd.DataFrame({
@@ -2345,7 +2876,7 @@ query.awaitTermination()
 # ---------------------------
 # SQL Database Design Tab (NEW)
 # ---------------------------
-with tabs[8]:
+if active_tab == TAB_LABELS[8]:
     st.markdown("### 🗂️ SQL Database Design & Management")
     
     st.markdown("""
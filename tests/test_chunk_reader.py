@@ -0,0 +1,46 @@
+import io
+
+import pandas as pd
+import pytest
+
+import chunk_reader
+
+
+def read_chunks(path, **kwargs):
+    stats = {}
+    chunks = list(chunk_reader.read_csv_chunks(str(path), stats=stats, log=lambda msg: None, **kwargs))
+    return chunks, stats
+
+
+def test_c_reader_rejects_bad_lines_across_blocks(tmp_path, monkeypatch):
+    # blocks of a few bytes, so records and quoted fields straddle block ends
+    monkeypatch.setattr(chunk_reader, "C_BLOCK_SIZE", 7)
+    good = 'id,name,val\n1,a,1.5\n2,"b\nc, d",2.5\n4,e,4.5\n6,f,6.5\n7,g,7.5\n'
+    raw = 'id,name,val\n1,a,1.5\n2,"b\nc, d",2.5\n3,x\n\n4,e,4.5\n5,y,5,9\n6,f,6.5\n7,g,7.5'
+    path = tmp_path / "sales.csv"
+    path.write_text(raw)
+    rejects = tmp_path / "sales.rejects.csv"
+
+    chunks, stats = read_chunks(path, chunksize=2, reject_path=str(rejects))
+
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), pd.read_csv(io.StringIO(good)))
+    assert pd.read_csv(rejects)["line"].tolist() == [5, 8]
+    assert (stats["rows"], stats["rejected"], stats["lines"]) == (5, 2, 9)
+
+
+@pytest.mark.parametrize("raw", [
+    "name,store,val\na,1,1.5\n\nb,2,2.5\n",  # string first column: the blank line reads as ""
+    "store,name,val\n1,a,1.5\n\n2,b,2.5\n",
+])
+def test_blank_line_reads_the_same_with_both_engines(tmp_path, raw):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "stores.csv"
+    path.write_text(raw)
+
+    c_chunks, c_stats = read_chunks(path, engine="c")
+    arrow_chunks, arrow_stats = read_chunks(path, engine="pyarrow")
+
+    pd.testing.assert_frame_equal(arrow_chunks[0], c_chunks[0])
+    assert c_chunks[0]["store"].dtype == "int64"
+    assert arrow_stats["lines"] == c_stats["lines"] == 3
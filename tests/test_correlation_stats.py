@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from correlation_stats import (
+    CORRELATION_COLUMNS, compute_stats, correlation_matrix, load_stats, save_stats, update_stats_file,
+)
+
+
+def test_incremental_update_matches_full_recompute(tmp_path):
+    rng = np.random.default_rng(7)
+    full = pd.DataFrame(rng.normal(1e5, 5e4, size=(500, len(CORRELATION_COLUMNS))), columns=CORRELATION_COLUMNS)
+    full.loc[rng.choice(500, 40), "markdown1"] = np.nan
+    old, new = full.iloc[:420], full.iloc[420:]
+    path = tmp_path / "full_dataset_clean.corr_stats.json"
+    save_stats(compute_stats(old, chunksize=100), path, dataset="full_dataset_clean", rows=len(old))
+
+    merged = update_stats_file(path, new)
+
+    expected = compute_stats(full)
+    saved = load_stats(path)
+    assert saved["n"] == merged["n"] == saved["rows"] == len(full)
+    assert saved["dataset"] == "full_dataset_clean"
+    np.testing.assert_allclose(saved["mean"], expected["mean"])
+    np.testing.assert_allclose(saved["comoment"], expected["comoment"], rtol=1e-9)
+    pd.testing.assert_frame_equal(correlation_matrix(saved), full.fillna(0).corr(), rtol=1e-9)
@@ -0,0 +1,56 @@
+import csv
+from functools import partial
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import extract
+
+
+def staged_extract(tmp_path, monkeypatch, fail_at=None):
+    """extract_source over a small file in 2-row chunks, optionally dying before commit `fail_at`."""
+    monkeypatch.setattr(extract, "REJECT_DIR", str(tmp_path / "rejects"))
+    monkeypatch.setattr(extract, "log", lambda msg: None)
+    monkeypatch.setattr(extract, "advance", lambda *args, **kwargs: None)
+    monkeypatch.setattr(extract, "read_csv_chunks", partial(extract.read_csv_chunks, chunksize=2))
+    monkeypatch.setattr(extract, "load_etl_config", lambda: {})
+    commits = {"n": 0}
+    commit_chunk = extract.commit_chunk
+
+    def commit_or_die(*args):
+        commits["n"] += 1
+        if commits["n"] == fail_at:
+            raise RuntimeError("connection lost")
+        commit_chunk(*args)
+
+    monkeypatch.setattr(extract, "commit_chunk", commit_or_die)
+    return commits
+
+
+def test_resume_does_not_duplicate_rejects(tmp_path, monkeypatch):
+    raw = tmp_path / "stores.csv"
+    raw.write_text("Store,Type,Size\n1,A,10\n2,B\n3,C,30\n4,A,40\n5,B,50,9\n6,C,60\n7,A,70\n")
+    engine = create_engine(f"sqlite:///{tmp_path / 'staging.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("""CREATE TABLE extract_checkpoints (source_file TEXT, target_table TEXT,
+                             rows_committed INT DEFAULT 0, chunks_committed INT DEFAULT 0)"""))
+        conn.execute(text("INSERT INTO extract_checkpoints (source_file, target_table) VALUES ('stores.csv', 'stores_staging')"))
+
+    def checkpoint():
+        with engine.connect() as conn:
+            row = conn.execute(text("SELECT rows_committed FROM extract_checkpoints")).one()
+        return {"rows_committed": row[0], "completed": False}
+
+    staged_extract(tmp_path, monkeypatch, fail_at=2)
+    with pytest.raises(RuntimeError):
+        extract.extract_source(engine, "stores.csv", "stores_staging", str(raw), {}, checkpoint())
+
+    monkeypatch.setattr(extract, "mark_completed", lambda *args: None)
+    staged_extract(tmp_path, monkeypatch)
+    extract.extract_source(engine, "stores.csv", "stores_staging", str(raw), {}, checkpoint())
+
+    with open(extract.reject_path("stores.csv"), encoding="utf-8", newline="") as f:
+        rejects = list(csv.reader(f))[1:]
+    assert [row[0] for row in rejects] == ["3", "6"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM stores_staging")).scalar() == 5
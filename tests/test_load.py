@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+
+import load
+from load import load_shadow_table, parallel_pool_size
+
+
+def load_concurrently(tmp_path, workers, ranges, pool_size):
+    """load_shadow_table x `workers` at once, each split into `ranges` appends.
+
+    Each append's first INSERT waits until workers * ranges appends hold a
+    connection at the same time, so a pool that cannot serve them all times out.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}", poolclass=QueuePool, pool_size=pool_size,
+                           max_overflow=0, pool_timeout=3, connect_args={"check_same_thread": False, "timeout": 30})
+    all_appending = threading.Barrier(workers * ranges, timeout=10)
+    waited = threading.local()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def hold_first_insert(conn, cursor, statement, *args):
+        if statement.startswith("INSERT") and not getattr(waited, "done", False):
+            waited.done = True
+            all_appending.wait()
+
+    frame = pd.DataFrame({"store": [s for s in range(1, 10) for _ in range(200)], "weekly_sales": 1.0})
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(load_shadow_table, engine, f"fact_shadow_{i}", frame, ranges) for i in range(workers)]
+            metrics = [f.result() for f in futures]
+        with engine.connect() as conn:
+            counts = [conn.execute(text(f"SELECT COUNT(*) FROM fact_shadow_{i}")).scalar() for i in range(workers)]
+    finally:
+        engine.dispose()
+    return metrics, counts, len(frame)
+
+
+def test_parallel_pool_serves_every_store_range_at_once(tmp_path):
+    workers, ranges = 3, 3
+    metrics, counts, rows = load_concurrently(tmp_path, workers, ranges, parallel_pool_size(workers, ranges))
+    assert [m["parts"] for m in metrics] == [ranges] * workers
+    assert counts == [rows] * workers
+
+
+def test_recreated_fact_table_forgets_old_partition_checksums(tmp_path, monkeypatch):
+    # SQLite stand-ins for fact_sales.sql and information_schema.PARTITIONS
+    monkeypatch.setattr(load, "read_sql_script", lambda name: [
+        "CREATE TABLE IF NOT EXISTS fact_sales (store INT, dept INT, sale_date DATE, store_type VARCHAR(10))",
+        "CREATE TABLE IF NOT EXISTS fact_sales_partitions (partition_name VARCHAR(16) PRIMARY KEY, "
+        "row_count INT NOT NULL, checksum VARCHAR(20) NOT NULL)",
+    ])
+    monkeypatch.setattr(load, "get_fact_partitions", lambda conn: [("pmax", None)])
+    monkeypatch.setattr(load, "log", lambda msg: None)
+    engine = create_engine(f"sqlite:///{tmp_path / 'fact.db'}")
+
+    def checksums():
+        with engine.begin() as conn:
+            load.ensure_fact_table(conn)
+            return conn.execute(text("SELECT partition_name FROM fact_sales_partitions")).scalars().all()
+
+    checksums()
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO fact_sales_partitions VALUES ('p2012', 10, 'abc')"))
+    assert checksums() == ["p2012"]
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE fact_sales"))
+    assert checksums() == []
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from ranking_index import build_index, load_index, save_index, update_index_file
+
+
+def weekly_sales(weeks, seed):
+    rng = np.random.default_rng(seed)
+    keys = pd.MultiIndex.from_product([range(1, 6), range(1, 4), weeks], names=["store", "dept", "sale_date"])
+    df = keys.to_frame(index=False)
+    df["weekly_sales"] = rng.gamma(2.0, 5000.0, len(df)).round(2)
+    return df
+
+
+def assert_same_index(actual, expected):
+    for key in ("top_k", "window_weeks", "rows", "windows"):
+        assert actual[key] == expected[key]
+    assert np.isclose(actual["total_sales"], expected["total_sales"])
+    for group in ("stores", "depts"):
+        pd.testing.assert_frame_equal(actual[group], expected[group])
+    for group in ("store", "dept"):
+        pd.testing.assert_frame_equal(actual["weekly"][group], expected["weekly"][group])
+
+
+def test_update_matches_build_on_combined_data(tmp_path):
+    weeks = pd.date_range("2012-01-06", periods=10, freq="W-FRI")
+    old = weekly_sales(weeks[:8], seed=1)
+    # weeks 8-9 are new; week 7 arrives again with revised figures
+    new = weekly_sales(weeks[7:], seed=2)
+    combined = pd.concat([old[old["sale_date"] != weeks[7]], new], ignore_index=True)
+    path = tmp_path / "full_dataset_clean.ranking.json"
+    save_index(build_index(old, top_k=3, window_weeks=2), path, dataset="full_dataset_clean")
+
+    updated = update_index_file(path, new)
+
+    expected = build_index(combined, top_k=3, window_weeks=2)
+    assert_same_index(updated, expected)
+    saved = load_index(path)
+    assert saved["dataset"] == "full_dataset_clean"
+    assert_same_index(saved, expected)